@@ -1,15 +1,28 @@
 
 # Register your models here.
 from django.contrib import admin
-from .models import Book, Loan
+from .models import Book, Loan, PatronCirculation
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'author', 'isbn', 'is_available', 'created_at')
     search_fields = ('title', 'author', 'isbn')
 
+    def get_queryset(self, request):
+        # Annotate availability so the changelist doesn't query once per row
+        return super().get_queryset(request).with_availability()
+
 @admin.register(Loan)
 class LoanAdmin(admin.ModelAdmin):
     list_display = ('id', 'book', 'user', 'borrowed_at', 'due_date', 'returned_at', 'is_active')
+    list_select_related = ('book', 'user')
     #list_filter = ('is_active',)
     search_fields = ('book__title', 'user__username')
+
+@admin.register(PatronCirculation)
+class PatronCirculationAdmin(admin.ModelAdmin):
+    list_display = ('user', 'active_loans', 'earliest_due')
+    list_select_related = ('user',)
+    search_fields = ('user__username',)
+    # Derived from Loan; fix drift with `manage.py repair_circulation`
+    readonly_fields = ('user', 'active_loans', 'earliest_due')
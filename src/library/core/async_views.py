@@ -0,0 +1,204 @@
+"""
+Async variants of the hot read endpoints, served by the ASGI entry point.
+
+`AsyncRoutesMiddleware` routes ASGI requests through `library.urls_async`,
+which maps the same URLs to the views below. They authenticate, check
+permissions and render exactly like their DRF counterparts, but every query
+goes through the async ORM, so a slow database call parks a coroutine
+instead of a worker thread. Like the viewsets, they read from a replica
+when `core.routers` allows it. Methods they do not implement (writes,
+OPTIONS) are handed to the sync view for the URL.
+
+The book views borrow querysets, ordering, pagination and serializers from
+a `BookViewSet` instance and only replace the parts that execute queries.
+"""
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse
+from django.core.exceptions import ValidationError
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .authentication import CachedJWTAuthentication
+from .caching import (acached_response, acached_validators,
+                      versioned_validators)
+from .conditional import (aloan_state, make_validators, not_modified,
+                          set_validator_headers)
+from .fieldsets import parse_fieldset, project_loans
+from .models import Book, Loan
+from .permissions import IsAdminOrReadOnly
+from .renderers import FastJSONRenderer
+from .routers import aroute_reads, routing_scope
+from .serializers import LoanDetailSerializer
+from .views import BOOK_STATE, BookViewSet, me_payload
+
+ITERATOR_CHUNK_SIZE = 100
+
+
+class AsyncAPIView(View):
+    """
+    The slice of `APIView` the read endpoints need, with async handlers.
+
+    GET and HEAD run `get()`; any other method goes to `fallback`, the sync
+    view for the same URL, so writes keep their existing implementation.
+    """
+
+    authentication_class = CachedJWTAuthentication
+    permission_classes = ()
+    fallback = None
+    renderer = FastJSONRenderer()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        # Like DRF views, these use token auth and never read the CSRF cookie
+        return csrf_exempt(super().as_view(**initkwargs))
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            if self.fallback is None:
+                return await self.http_method_not_allowed(request, *args, **kwargs)
+            return await sync_to_async(self.fallback)(request, *args, **kwargs)
+
+        self.authenticator = self.authentication_class()
+        request = Request(request, authenticators=(self.authenticator,))
+        with routing_scope():
+            try:
+                await self.initial(request)
+                await aroute_reads(request)
+                response = await self.get(request, *args, **kwargs)
+            except Exception as exc:
+                response = self.handle_exception(request, exc)
+        return self.finalize_response(request, response)
+
+    async def initial(self, request):
+        """Authenticate eagerly and check permissions, as `APIView.initial` does."""
+        try:
+            result = await self.authenticator.aauthenticate(request)
+        except exceptions.APIException:
+            request._not_authenticated()
+            raise
+        if result is None:
+            request._not_authenticated()
+        else:
+            request._authenticator = self.authenticator
+            request.user, request.auth = result
+
+        for permission in (cls() for cls in self.permission_classes):
+            if not permission.has_permission(request, self):
+                if request.successful_authenticator is None:
+                    raise exceptions.NotAuthenticated()
+                raise exceptions.PermissionDenied(
+                    getattr(permission, "message", None),
+                    code=getattr(permission, "code", None),
+                )
+
+    def handle_exception(self, request, exc):
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            exc.auth_header = self.authenticator.authenticate_header(request)
+        response = api_settings.EXCEPTION_HANDLER(exc, {"view": self, "request": request})
+        if response is None:
+            raise exc
+        return response
+
+    def finalize_response(self, request, response):
+        """Render a DRF `Response` here, so Django has nothing left to render."""
+        if not isinstance(response, Response):
+            return response
+        body = self.renderer.render(
+            response.data,
+            self.renderer.media_type,
+            {"view": self, "request": request, "response": response},
+        )
+        rendered = HttpResponse(
+            body, status=response.status_code, content_type=self.renderer.media_type
+        )
+        for name, value in response.items():
+            if name.lower() != "content-type":
+                rendered[name] = value
+        return rendered
+
+
+class AsyncMeView(AsyncAPIView):
+    permission_classes = (IsAuthenticated,)
+
+    async def get(self, request):
+        return Response(me_payload(request.user))
+
+
+class AsyncMyActiveLoansView(AsyncAPIView):
+    permission_classes = (IsAuthenticated,)
+
+    async def get(self, request):
+        fieldset = parse_fieldset(request.query_params, LoanDetailSerializer)
+        loans = project_loans(Loan.objects.all(), fieldset).active().filter(user=request.user)
+        rows = [
+            loan async for loan in loans.aiterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        ]
+        return Response(LoanDetailSerializer(rows, many=True, fieldset=fieldset).data)
+
+
+class AsyncBookView(AsyncAPIView):
+    """`GET /api/books/` and `GET /api/books/<pk>/`, cached and conditional."""
+
+    permission_classes = (IsAdminOrReadOnly,)
+
+    def get_viewset(self, request, pk):
+        return BookViewSet(
+            request=request,
+            args=(),
+            kwargs={} if pk is None else {"pk": pk},
+            format_kwarg=None,
+            action="list" if pk is None else "retrieve",
+            detail=pk is not None,
+            basename="books",
+        )
+
+    async def get(self, request, pk=None):
+        viewset = self.get_viewset(request, pk)
+        if pk is None:
+            validators = versioned_validators(request)
+        else:
+            validators = await acached_validators(
+                request, viewset.action, pk, lambda: self.compute_validators(viewset, pk)
+            )
+        cached = not_modified(request, validators)
+        if cached is not None:
+            return cached
+
+        if pk is None:
+            build = lambda: self.list(viewset)  # noqa: E731
+        else:
+            build = lambda: self.retrieve(viewset, pk)  # noqa: E731
+        response = await acached_response(request, viewset.action, pk, build)
+        return set_validator_headers(response, validators)
+
+    async def compute_validators(self, viewset, pk):
+        querysets = viewset.get_validator_querysets(pk)
+        if querysets is None:
+            return None
+        book, loans = querysets
+        book_state = await book.order_by().aaggregate(**BOOK_STATE)
+        if not book_state["count"]:
+            return None
+        return make_validators(viewset.request, book_state, await aloan_state(loans))
+
+    async def list(self, viewset):
+        paginator = viewset.paginator
+        page = await paginator.apaginate_queryset(
+            viewset.get_queryset(), viewset.request, view=viewset
+        )
+        return paginator.get_paginated_response(
+            viewset.get_serializer(page, many=True).data
+        )
+
+    async def retrieve(self, viewset, pk):
+        try:
+            book = await viewset.get_queryset().aget(pk=pk)
+        except (Book.DoesNotExist, ValueError, TypeError, ValidationError):
+            # Same message as `get_object_or_404()`
+            raise Http404(f"No {Book._meta.object_name} matches the given query.")
+        return Response(viewset.get_serializer(book).data)
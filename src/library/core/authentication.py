@@ -0,0 +1,170 @@
+"""
+JWT authentication without a user query per request.
+
+`CachedJWTAuthentication` serves the token's user from a per-process LRU
+with a TTL. Entries are dropped in every worker as soon as a saved or
+deleted user changes one of `CACHED_USER_FIELDS` (the `users_version`
+stamp, bumped from `core.signals`), so deactivation, staff changes and
+password changes apply on the next request rather than when the TTL runs
+out. Other saves (signups, logins, name edits) leave the cache alone.
+
+`QuerySet.update()` sends no signals: a bulk deactivation such as
+`User.objects.filter(...).update(is_active=False)` only applies once the
+cached entries expire, after `LIBRARY_AUTH_USER_CACHE_TTL` seconds.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .caching import CacheStats
+from .stamps import users_version
+
+DEFAULT_USER_CACHE_SIZE = 10_000
+DEFAULT_USER_CACHE_TTL = 60
+
+# What a cached user is trusted for: the auth checks and `/api/me/`
+CACHED_USER_FIELDS = (
+    "username", "email", "password", "is_active", "is_staff", "is_superuser", "date_joined",
+)
+
+user_cache_stats = CacheStats()
+
+
+class UserCache:
+    """Thread-safe LRU of user instances with a TTL, keyed by user id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._version = None
+
+    @property
+    def maxsize(self):
+        return getattr(settings, "LIBRARY_AUTH_USER_CACHE_SIZE", DEFAULT_USER_CACHE_SIZE)
+
+    @property
+    def ttl(self):
+        return getattr(settings, "LIBRARY_AUTH_USER_CACHE_TTL", DEFAULT_USER_CACHE_TTL)
+
+    def get(self, user_id):
+        """
+        Return `(user, version)`. `user` is a private copy, or None on a miss;
+        pass `version` back to `set()` so a user loaded before a concurrent
+        change is never stored under the new version.
+        """
+        version = users_version.get()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] < time.monotonic():
+                del self._entries[user_id]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+        user_cache_stats.record(hit=entry is not None)
+        # Copies, so per-request state (cached relations...) never leaks
+        return (copy.copy(entry[0]) if entry else None), version
+
+    def set(self, user_id, user, version):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[user_id] = (copy.copy(user), time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def __len__(self):
+        return len(self._entries)
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` that looks users up in `user_cache` first.
+
+    Misses go through the stock lookup (including its active-user and
+    revoke-token checks) and are cached; hits repeat the token-specific
+    checks, since one cached user serves many tokens. `aauthenticate()` is
+    the same for the async views in `core.async_views`.
+    """
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user, version = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache.set(user_id, user, version)
+            return user
+        self.check_user(validated_token, user)
+        return user
+
+    async def aauthenticate(self, request):
+        """`authenticate()` for async views, loading cache misses with `aget()`."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user, version = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(
+                    **{api_settings.USER_ID_FIELD: user_id}
+                )
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(
+                    _("User not found"), code="user_not_found"
+                ) from e
+            self.check_user(validated_token, user)
+            user_cache.set(user_id, user, version)
+            return user
+        self.check_user(validated_token, user)
+        return user
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            ) from e
+
+    @staticmethod
+    def check_user(validated_token, user):
+        """The stock per-token checks, for users that skipped `super().get_user()`."""
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
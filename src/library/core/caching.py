@@ -0,0 +1,152 @@
+"""
+Versioned response cache for the public book catalogue.
+
+Cache keys embed the current `catalogue_version` stamp, which is bumped
+whenever a Book or Loan changes (see `core.signals`). A bump makes every
+older entry unreachable in every worker at once; stale entries simply
+expire from the cache backend. Nothing is stored while the request reads
+from a replica that may not have caught up with the latest bump.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+from .conditional import make_validators
+from .routers import replica_may_lag
+from .stamps import catalogue_version
+
+DEFAULT_TIMEOUT = 300
+
+
+class CacheStats:
+    """Thread-safe hit/miss counters for this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def reset(self):
+        with self._lock:
+            self.hits = self.misses = 0
+
+
+catalogue_cache_stats = CacheStats()
+
+
+def get_cache():
+    return caches[getattr(settings, "LIBRARY_CATALOGUE_CACHE", "default")]
+
+
+def catalogue_cache_key(request, action, lookup=None):
+    params = sorted(request.query_params.lists())
+    raw = "|".join(
+        [request.get_host(), action, str(lookup or ""), repr(params)]
+    )
+    digest = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    return f"catalogue:{catalogue_version.get()}:{digest}"
+
+
+def versioned_validators(request, *state, scope=""):
+    """
+    Conditional-GET validators derived from the catalogue version stamp, with
+    no query: every Book and Loan write bumps it, so an ETag can't outlive a
+    change to any list, and Last-Modified is the time of the last bump.
+    None while a lagging replica may still serve the pre-bump rows. Hosts
+    only see each other's writes through a shared `LIBRARY_STATE_DIR`,
+    which `core.checks` insists on for multi-host and replica setups.
+    """
+    if replica_may_lag():
+        return None
+    # mtime first: a bump in between makes Last-Modified older, never newer
+    bumped_at = catalogue_version.modified()
+    version = {"catalogue": catalogue_version.get(), "bumped_at": bumped_at}
+    return make_validators(request, version, *state, scope=scope)
+
+
+def cached_validators(request, action, lookup, compute):
+    """Memoize conditional-GET validators under the same versioned key scheme."""
+    cache = get_cache()
+    key = catalogue_cache_key(request, f"{action}:validators", lookup)
+    validators = cache.get(key)
+    if validators is None:
+        validators = compute()
+        if validators is not None and not replica_may_lag():
+            cache.set(key, validators, get_timeout())
+    return validators
+
+
+async def acached_validators(request, action, lookup, acompute):
+    cache = get_cache()
+    key = catalogue_cache_key(request, f"{action}:validators", lookup)
+    validators = await cache.aget(key)
+    if validators is None:
+        validators = await acompute()
+        if validators is not None and not replica_may_lag():
+            await cache.aset(key, validators, get_timeout())
+    return validators
+
+
+async def acached_response(request, action, lookup, abuild):
+    """`CatalogueCacheMixin.cached_response()` for the async views."""
+    cache = get_cache()
+    key = catalogue_cache_key(request, action, lookup)
+    data = await cache.aget(key)
+    if data is not None:
+        return hit_response(data)
+
+    catalogue_cache_stats.record(hit=False)
+    response = await abuild()
+    if response.status_code == 200 and not replica_may_lag():
+        await cache.aset(key, response.data, get_timeout())
+    response["X-Cache"] = "MISS"
+    return response
+
+
+def hit_response(data):
+    catalogue_cache_stats.record(hit=True)
+    response = Response(data)
+    response["X-Cache"] = "HIT"
+    return response
+
+
+def get_timeout():
+    return getattr(settings, "LIBRARY_CATALOGUE_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+class CatalogueCacheMixin:
+    """Serve `list`/`retrieve` from the versioned cache when possible."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, build, *args, **kwargs):
+        cache = get_cache()
+        key = catalogue_cache_key(request, self.action, kwargs.get(self.lookup_field))
+        data = cache.get(key)
+        if data is not None:
+            return hit_response(data)
+
+        catalogue_cache_stats.record(hit=False)
+        response = build(request, *args, **kwargs)
+        if response.status_code == 200 and not replica_may_lag():
+            cache.set(key, response.data, get_timeout())
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,35 @@
+"""
+System checks for settings that are only wrong together.
+
+Version stamps (`core.stamps`) invalidate the response cache, the cached
+users and conditional-GET validators, and pin writers to the primary. They
+are files, so they only reach processes that share `LIBRARY_STATE_DIR`.
+Its default is a per-host temporary directory: fine for one host, but with
+several hosts a write on one never reaches the others, which keep serving
+stale lists (and 304s for them).
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+
+@register()
+def check_shared_state_dir(app_configs, **kwargs):
+    if getattr(settings, "LIBRARY_STATE_DIR", None):
+        return []
+    reasons = []
+    if getattr(settings, "LIBRARY_MULTI_HOST", False):
+        reasons.append("LIBRARY_MULTI_HOST is set")
+    if getattr(settings, "LIBRARY_READ_REPLICAS", ()):
+        reasons.append("read replicas are configured")
+    if not reasons:
+        return []
+    return [
+        Error(
+            f"LIBRARY_STATE_DIR is not set, but {' and '.join(reasons)}.",
+            hint=(
+                "Point LIBRARY_STATE_DIR at a directory every web host mounts "
+                "(e.g. a shared volume), so version stamps reach all of them."
+            ),
+            id="core.E001",
+        )
+    ]
@@ -0,0 +1,236 @@
+"""
+Borrowing rules, evaluated in as few round trips as possible.
+
+The rules read the patron's `PatronCirculation` row (active loan count and
+earliest due date) under a row lock instead of counting their loans, so a
+borrow costs the same for a patron with five loans or five thousand.
+"""
+from datetime import timedelta
+
+from django.db.models import Count, Exists, F, Min, OuterRef, Q
+from django.utils import timezone
+
+from .models import Book, Loan, PatronCirculation
+from .signals import bump_catalogue_version
+
+MAX_ACTIVE_LOANS = 5
+MAX_BATCH_SIZE = 50
+
+BOOK_UNAVAILABLE = "This book is currently not available for borrowing."
+OVERDUE_BLOCKED = "You have overdue loans. Return them first or contact staff."
+ALREADY_RETURNED = "This book is already returned."
+BATCH_CONFLICT = "A book in this batch was borrowed concurrently; nothing was borrowed. Try again."
+
+
+def max_loans_message():
+    return f"You can borrow at most {MAX_ACTIVE_LOANS} books at a time. Return some first."
+
+
+def lock_patron(user, **annotations):
+    """
+    `SELECT ... FOR UPDATE` on the user's circulation row, creating it from
+    `Loan` first if it's missing (users bulk-created or predating the table).
+    """
+    locked = PatronCirculation.objects.select_for_update().filter(user=user)
+    try:
+        return locked.annotate(**annotations).get()
+    except PatronCirculation.DoesNotExist:
+        PatronCirculation.objects.sync([user.pk])
+        return locked.annotate(**annotations).get()
+
+
+def lock_borrow_state(user, book, now=None):
+    """
+    Every fact the borrow rules need, in one locked query:
+    - book_taken: the book has an active loan
+    - user_active: the user's active loan count
+    - user_overdue: the user has an active loan past its due date
+
+    The book row itself isn't locked; `unique_active_loan_per_book` rejects
+    a concurrent borrow of the same book at INSERT time.
+    """
+    now = now or timezone.now()
+    patron = lock_patron(
+        user,
+        book_taken=Exists(Loan.objects.filter(book=book, returned_at__isnull=True)),
+    )
+    return {
+        "book_taken": patron.book_taken,
+        "user_active": patron.active_loans,
+        "user_overdue": patron.has_overdue(now),
+    }
+
+
+# Whole days overdue, as [start, end) ranges for `?group=days`
+OVERDUE_BUCKETS = [(0, 7), (7, 14), (14, 30), (30, None)]
+
+
+def overdue_loans(now=None):
+    """Active loans past due; a range scan on `loan_active_due_idx`."""
+    now = now or timezone.now()
+    return Loan.objects.filter(returned_at__isnull=True, due_date__lt=now)
+
+
+def days_overdue(due_date, now):
+    return (now - due_date).days
+
+
+def overdue_rows(loans):
+    """Flat `values()` rows for the overdue list, without the nested serializers."""
+    return loans.values(
+        "id",
+        "user_id",
+        "book_id",
+        "borrowed_at",
+        "due_date",
+        username=F("user__username"),
+        book_title=F("book__title"),
+        book_isbn=F("book__isbn"),
+    )
+
+
+def overdue_by_user(loans):
+    return (
+        loans.order_by()
+        .values("user", username=F("user__username"))
+        .annotate(overdue_loans=Count("id"), oldest_due_date=Min("due_date"))
+    )
+
+
+def overdue_by_days(loans, now):
+    """Overdue counts per `OVERDUE_BUCKETS` range, in one aggregate query."""
+    buckets = {}
+    for start, end in OVERDUE_BUCKETS:
+        condition = Q(due_date__lte=now - timedelta(days=start))
+        if end is None:
+            label = f"{start}+"
+        else:
+            label = f"{start}-{end - 1}"
+            condition &= Q(due_date__gt=now - timedelta(days=end))
+        buckets[label] = Count("id", filter=condition)
+    counts = loans.order_by().aggregate(**buckets)
+    return [{"days_overdue": label, "loans": counts[label]} for label in buckets]
+
+
+class BatchBorrowBlocked(Exception):
+    """The whole batch is refused (e.g. the user has overdue loans)."""
+
+    def __init__(self, detail):
+        super().__init__(detail)
+        self.detail = detail
+
+
+def borrow_many(user, items, now=None):
+    """
+    Borrow several books in the caller's transaction.
+
+    `items` is a list of {"book": id, "due_date": datetime}. Returns one result
+    per item, in order: {"book", "status": "created", "loan"} or
+    {"book", "status": "error", "errors"}.
+    """
+    now = now or timezone.now()
+    book_ids = sorted({item["book"] for item in items})
+
+    # Patron first, then books in primary-key order, so concurrent batches
+    # can't deadlock
+    patron = lock_patron(user)
+    books = {
+        book.pk: book
+        for book in Book.objects.select_for_update(of=("self",))
+        .filter(pk__in=book_ids)
+        .annotate(
+            book_taken=Exists(
+                Loan.objects.filter(book=OuterRef("pk"), returned_at__isnull=True)
+            )
+        )
+        .order_by("pk")
+    }
+    if patron.has_overdue(now):
+        raise BatchBorrowBlocked(OVERDUE_BLOCKED)
+
+    capacity = MAX_ACTIVE_LOANS - patron.active_loans
+    results, loans, seen = [], [], set()
+    for item in items:
+        book_id, due_date = item["book"], item["due_date"]
+        book = books.get(book_id)
+        if book is None:
+            errors = {"book": [f'Invalid pk "{book_id}" - object does not exist.']}
+        elif book_id in seen:
+            errors = {"book": ["This book appears more than once in the batch."]}
+        elif book.book_taken:
+            errors = {"book": [BOOK_UNAVAILABLE]}
+        elif due_date <= now:
+            errors = {"due_date": ["Due date must be in the future."]}
+        elif len(loans) >= capacity:
+            errors = {"detail": [max_loans_message()]}
+        else:
+            errors = None
+        seen.add(book_id)
+
+        if errors:
+            results.append({"book": book_id, "status": "error", "errors": errors})
+            continue
+        loan = Loan(user=user, book=book, borrowed_at=now, due_date=due_date)
+        loan.full_clean(exclude=["book", "user"], validate_constraints=False)
+        book.annotated_is_available = False
+        loans.append(loan)
+        results.append({"book": book_id, "status": "created", "loan": loan})
+
+    if loans:
+        Loan.objects.bulk_create(loans)
+        # bulk_create sends no post_save, so update the counters and cache here
+        PatronCirculation.objects.record_borrows(
+            user.pk, [loan.due_date for loan in loans]
+        )
+        bump_catalogue_version()
+    return results
+
+
+def return_many(loans, loan_ids, now=None):
+    """
+    Return several loans from the `loans` queryset in one UPDATE.
+
+    Loans outside `loans` are reported as not found. Returns one result per id:
+    {"loan": id, "status": "returned", "instance"} or {"loan": id, "status": "error", "errors"}.
+    """
+    now = now or timezone.now()
+    locked = {
+        loan.pk: loan
+        for loan in loans.select_for_update(of=("self",))
+        .filter(pk__in=loan_ids)
+        .order_by("pk")
+    }
+
+    results, returning = [], []
+    for loan_id in loan_ids:
+        loan = locked.get(loan_id)
+        if loan is None:
+            results.append(
+                {"loan": loan_id, "status": "error", "errors": {"detail": ["Not found."]}}
+            )
+        elif loan.returned_at is not None or loan_id in returning:
+            results.append(
+                {"loan": loan_id, "status": "error", "errors": {"detail": [ALREADY_RETURNED]}}
+            )
+        else:
+            returning.append(loan_id)
+            results.append({"loan": loan_id, "status": "returned", "instance": loan})
+
+    if returning:
+        Loan.objects.filter(pk__in=returning, returned_at__isnull=True).update(
+            returned_at=now
+        )
+        users = {
+            result["instance"].user_id
+            for result in results
+            if result["status"] == "returned"
+        }
+        PatronCirculation.objects.refresh(users)
+        bump_catalogue_version()
+        for result in results:
+            if result["status"] == "returned":
+                loan = result["instance"]
+                loan.returned_at = now
+                # Only one active loan per book, so returning it frees the book
+                loan.book.annotated_is_available = True
+    return results
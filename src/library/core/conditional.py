@@ -0,0 +1,106 @@
+"""
+Conditional GET (ETag / Last-Modified) for list and detail endpoints.
+
+Validators come from the catalogue version stamp (lists, see
+`core.caching.versioned_validators`) or from aggregate queries over one row
+(details: `MAX(updated_at)` and the loan state) rather than from the
+serialized body, so a matching `If-None-Match` / `If-Modified-Since` returns
+304 before any serializer runs.
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime
+
+from django.db.models import Count, Max, Q
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str
+    last_modified: datetime | None
+
+    @property
+    def last_modified_timestamp(self):
+        if self.last_modified is None:
+            return None
+        return int(self.last_modified.timestamp())
+
+
+def make_validators(request, *state, scope=""):
+    """Strong ETag over the request URL plus every aggregate that shapes the body."""
+    raw = "|".join([request.get_full_path(), scope, *(repr(part) for part in state)])
+    etag = '"%s"' % hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+    timestamps = [
+        value
+        for part in state
+        if isinstance(part, dict)
+        for value in part.values()
+        if isinstance(value, datetime)
+    ]
+    return Validators(etag=etag, last_modified=max(timestamps, default=None))
+
+
+LOAN_STATE = {
+    "last_id": Max("id"),
+    "active": Count("id", filter=Q(returned_at__isnull=True)),
+    "last_borrowed": Max("borrowed_at"),
+    "last_returned": Max("returned_at"),
+}
+
+
+def loan_state(loans):
+    """Everything about `loans` that changes when a book is borrowed or returned."""
+    return loans.order_by().aggregate(**LOAN_STATE)
+
+
+async def aloan_state(loans):
+    return await loans.order_by().aaggregate(**LOAN_STATE)
+
+
+def not_modified(request, validators):
+    """A 304 response if the client's copy is current, else None."""
+    if validators is None:
+        return None
+    return get_conditional_response(
+        request,
+        etag=validators.etag,
+        last_modified=validators.last_modified_timestamp,
+    )
+
+
+def set_validator_headers(response, validators):
+    if validators is not None and response.status_code == 200:
+        response["ETag"] = validators.etag
+        if validators.last_modified is not None:
+            response["Last-Modified"] = http_date(validators.last_modified_timestamp)
+    return response
+
+
+class ConditionalGetMixin:
+    """
+    Emit ETag/Last-Modified on `list`/`retrieve` and answer 304 early.
+
+    Views implement `get_validators(request, pk=None)`, returning
+    `Validators` or None when there is nothing to validate (e.g. a 404).
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, None, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        return self.conditional_response(
+            request, super().retrieve, lookup, *args, **kwargs
+        )
+
+    def get_validators(self, request, pk=None):
+        raise NotImplementedError
+
+    def conditional_response(self, request, build, lookup, *args, **kwargs):
+        validators = self.get_validators(request, lookup)
+        cached = not_modified(request, validators)
+        if cached is not None:
+            return cached
+        return set_validator_headers(build(request, *args, **kwargs), validators)
@@ -0,0 +1,23 @@
+"""
+DRF exception handler that also answers Django's `ValidationError`.
+
+Models raise it from `save()` (`full_clean()`, or a constraint violation
+the database caught in fast validation mode, see `core.integrity`). DRF
+would let it through as a 500; it's a 400 with the same body a serializer
+error has, with non-field errors under `NON_FIELD_ERRORS_KEY`.
+"""
+from django.core.exceptions import NON_FIELD_ERRORS
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+from rest_framework.settings import api_settings
+from rest_framework.views import exception_handler as drf_exception_handler
+
+
+def exception_handler(exc, context):
+    if isinstance(exc, DjangoValidationError):
+        detail = as_serializer_error(exc)
+        if NON_FIELD_ERRORS in detail:
+            detail[api_settings.NON_FIELD_ERRORS_KEY] = detail.pop(NON_FIELD_ERRORS)
+        exc = ValidationError(detail)
+    return drf_exception_handler(exc, context)
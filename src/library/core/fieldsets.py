@@ -0,0 +1,225 @@
+"""
+Sparse fieldsets: `?fields=` and `?expand=` on the book and loan endpoints.
+
+`?fields=id,title,is_available` keeps only those fields of each object; for
+loans, `book.<name>` picks fields of the embedded book (and implies
+`expand=book`). `?expand=book` embeds the loan's book. Once either parameter
+is given, a book that isn't expanded is rendered as its id. Without them,
+responses are unchanged.
+
+Queries are narrowed to match: `only()` the columns behind the requested
+fields (plus the ordering the cursor needs), and no availability subquery,
+borrower join or book prefetch unless something renders them.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+
+from .models import Book
+
+FIELDS_PARAM = "fields"
+EXPAND_PARAM = "expand"
+
+# Columns behind serializer fields that aren't a column of the same name
+BOOK_COLUMNS = {"is_available": ()}
+LOAN_COLUMNS = {
+    "user": ("user", "user__username"),
+    "is_active": ("returned_at",),
+    "is_overdue": ("returned_at", "due_date"),
+}
+
+
+class Fieldset:
+    """The fields requested of one serializer; `fields` None means all of them."""
+
+    def __init__(self, fields=None, expand=(), nested=None):
+        self.fields = None if fields is None else frozenset(fields)
+        self.expand = frozenset(expand)
+        # Fieldsets of expanded relations that were trimmed too
+        self.nested = dict(nested or {})
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return name in self.expand and self.includes(name)
+
+    def key(self):
+        return (
+            None if self.fields is None else tuple(sorted(self.fields)),
+            tuple(sorted(self.expand)),
+            tuple(sorted((name, nested.key()) for name, nested in self.nested.items())),
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, Fieldset) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return f"Fieldset{self.key()!r}"
+
+
+# ── Parsing ─────────────────────────────────────
+
+def split_names(value):
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+def field_names(serializer_class):
+    return list(serializer_class().fields)
+
+
+def parse_fieldset(params, serializer_class):
+    """The `Fieldset` asked for in `params`, or None for the full representation."""
+    fields_value = params.get(FIELDS_PARAM)
+    expand_value = params.get(EXPAND_PARAM)
+    if fields_value is None and expand_value is None:
+        return None
+
+    available = field_names(serializer_class)
+    expandable = getattr(serializer_class, "expandable_fields", {})
+    errors = {}
+
+    expand = set(split_names(expand_value or ""))
+    unknown = sorted(expand - expandable.keys())
+    if unknown:
+        errors[EXPAND_PARAM] = [f"Unknown relation(s): {', '.join(unknown)}."]
+
+    fields = None
+    nested_names = {}
+    if fields_value is not None:
+        fields = set()
+        unknown = []
+        for name in split_names(fields_value):
+            head, _, rest = name.partition(".")
+            if not rest:
+                if head in available:
+                    fields.add(head)
+                else:
+                    unknown.append(name)
+            elif head in expandable and rest in field_names(expandable[head]):
+                fields.add(head)
+                expand.add(head)
+                nested_names.setdefault(head, set()).add(rest)
+            else:
+                unknown.append(name)
+        if unknown:
+            errors[FIELDS_PARAM] = [f"Unknown field(s): {', '.join(sorted(unknown))}."]
+        elif not fields:
+            errors[FIELDS_PARAM] = ["Name at least one field."]
+
+    if errors:
+        raise ValidationError(errors)
+    nested = {name: Fieldset(names) for name, names in nested_names.items()}
+    return Fieldset(fields, expand, nested)
+
+
+# ── Serializers ─────────────────────────────────
+
+class SparseFieldsMixin:
+    """
+    Serializer taking a `fieldset=` argument: drops the fields it excludes
+    and, for `expandable_fields`, embeds the related object or just its id.
+    """
+
+    # Relation name -> serializer embedding it when expanded
+    expandable_fields = {}
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fieldset = fieldset
+        if fieldset is None:
+            return
+        for name in list(self.fields):
+            if not fieldset.includes(name):
+                del self.fields[name]
+        for name, serializer_class in self.expandable_fields.items():
+            if name not in self.fields:
+                continue
+            if fieldset.expands(name):
+                self.fields[name] = serializer_class(
+                    read_only=True, fieldset=fieldset.nested.get(name)
+                )
+            else:
+                self.fields[name] = serializers.IntegerField(source=f"{name}_id", read_only=True)
+
+    def representation_options(self):
+        return () if self.fieldset is None else (("fieldset", self.fieldset),)
+
+
+# ── Querysets ───────────────────────────────────
+
+def is_column(model, name):
+    try:
+        return model._meta.get_field(name).concrete
+    except FieldDoesNotExist:
+        return False
+
+
+def columns(model, fieldset, derived, ordering=()):
+    """What `only()` must load to render `fieldset` and order by `ordering`."""
+    names = {"id"}
+    for name in fieldset.fields:
+        names.update(derived.get(name, (name,)))
+    names.update(
+        name.lstrip("-") for name in ordering if is_column(model, name.lstrip("-"))
+    )
+    return sorted(names)
+
+
+def needs_availability(fieldset):
+    return fieldset is None or fieldset.includes("is_available")
+
+
+def project_books(queryset, fieldset, ordering=()):
+    """Narrow a Book queryset to `fieldset` (None: unchanged)."""
+    if fieldset is None or fieldset.fields is None:
+        return queryset
+    return queryset.only(*columns(Book, fieldset, BOOK_COLUMNS, ordering))
+
+
+def project_loans(queryset, fieldset, ordering=()):
+    """`queryset.for_detail()`, loading only what `fieldset` renders."""
+    if fieldset is None:
+        return queryset.for_detail()
+    if fieldset.includes("user"):
+        queryset = queryset.select_related("user")
+    if fieldset.expands("book"):
+        nested = fieldset.nested.get("book")
+        books = Book.objects.all()
+        if needs_availability(nested):
+            books = books.with_availability()
+        queryset = queryset.prefetch_related(
+            Prefetch("book", queryset=project_books(books, nested))
+        )
+    if fieldset.fields is None:
+        return queryset
+    return queryset.only(*columns(queryset.model, fieldset, LOAN_COLUMNS, ordering))
+
+
+# ── Views ───────────────────────────────────────
+
+class FieldsetMixin:
+    """
+    Viewset side: parse the fieldset for `fieldset_actions` (400 on unknown
+    names) and hand it to the serializer. `get_queryset()` projects with
+    `get_fieldset()`.
+    """
+
+    fieldset_actions = ("list", "retrieve")
+
+    def get_fieldset(self):
+        if self.action not in self.fieldset_actions:
+            return None
+        if "fieldset" not in self.__dict__:
+            self.fieldset = parse_fieldset(self.request.query_params, self.get_serializer_class())
+        return self.fieldset
+
+    def get_serializer(self, *args, **kwargs):
+        fieldset = self.get_fieldset()
+        if fieldset is not None:
+            kwargs.setdefault("fieldset", fieldset)
+        return super().get_serializer(*args, **kwargs)
@@ -0,0 +1,202 @@
+"""
+Streaming bulk import for the book catalogue.
+
+Rows are read lazily from CSV or NDJSON, validated in memory with the same
+field rules as `Book` (including `isbn_validator`), and upserted on `isbn`
+in chunks with `bulk_create(update_conflicts=True)`. Bad rows are reported
+and skipped; they never abort the rest of the import. That includes lines
+that aren't valid UTF-8 and malformed CSV records, which become error rows
+like any other.
+"""
+import csv
+import json
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import Book
+from .signals import bump_catalogue_version
+
+IMPORT_FIELDS = ("title", "author", "isbn", "description")
+UPDATE_FIELDS = ["title", "author", "description", "updated_at"]
+DEFAULT_BATCH_SIZE = 1000
+
+
+class UndecodableLine:
+    """Stands in for a line of the body that isn't valid in its encoding."""
+
+    def __init__(self, error):
+        self.error = error
+
+    def validation_error(self):
+        return ValidationError(
+            f"Not valid {self.error.encoding} (byte {self.error.start}): {self.error.reason}."
+        )
+
+
+def iter_text_lines(stream, encoding="utf-8"):
+    """
+    Decode a binary stream line by line without buffering the whole body.
+    A line that doesn't decode is yielded as an `UndecodableLine`, and a
+    leading byte order mark (Excel's CSV export writes one) is dropped.
+    """
+    first = True
+    for line in stream:
+        if isinstance(line, bytes):
+            try:
+                line = line.decode(encoding)
+            except UnicodeDecodeError as exc:
+                line = UndecodableLine(exc)
+        if first and isinstance(line, str):
+            line = line.removeprefix("\ufeff")
+        first = False
+        yield line
+
+
+def read_csv_rows(lines):
+    """
+    Yield `(row_number, row)` pairs from CSV text with a header line.
+    Undecodable lines and records the csv module rejects are numbered as
+    rows of their own and yielded as `ValidationError`s.
+    """
+    skipped = []
+
+    def decoded():
+        for line in lines:
+            if isinstance(line, UndecodableLine):
+                skipped.append(line.validation_error())
+            else:
+                yield line
+
+    reader = csv.DictReader(decoded())
+    number = 0
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            row = None
+        except csv.Error as exc:
+            row = ValidationError(f"Malformed CSV: {exc}")
+        # Lines skipped while reading this record came before it
+        for error in skipped:
+            number += 1
+            yield number, error
+        skipped.clear()
+        if row is None:
+            return
+        number += 1
+        yield number, row
+
+
+def read_ndjson_rows(lines):
+    """Yield `(row_number, row)` pairs from newline-delimited JSON objects."""
+    number = 0
+    for line in lines:
+        if isinstance(line, str) and not line.strip():
+            continue
+        number += 1
+        if isinstance(line, UndecodableLine):
+            yield number, line.validation_error()
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            row = ValidationError(f"Invalid JSON: {exc}")
+        else:
+            if not isinstance(row, dict):
+                row = ValidationError("Each line must be a JSON object.")
+        yield number, row
+
+
+READERS = {
+    "csv": read_csv_rows,
+    "ndjson": read_ndjson_rows,
+}
+
+
+def clean_row(row):
+    """Validate one row against the Book field rules without touching the DB."""
+    cleaned, errors = {}, {}
+    for name in IMPORT_FIELDS:
+        field = Book._meta.get_field(name)
+        value = row.get(name)
+        if value is None:
+            value = ""
+        if not isinstance(value, str):
+            value = str(value)
+        try:
+            cleaned[name] = field.clean(value.strip(), None)
+        except ValidationError as exc:
+            errors[name] = exc.messages
+    return cleaned, errors
+
+
+class BookImporter:
+    """Validates and upserts rows in chunks, collecting a per-row error report."""
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+        self.seen_isbns = {}
+
+    def run(self, rows):
+        batch = []
+        for number, row in rows:
+            book = self.validate(number, row)
+            if book is None:
+                continue
+            batch.append(book)
+            if len(batch) >= self.batch_size:
+                self.flush(batch)
+                batch = []
+        if batch:
+            self.flush(batch)
+        return self.report()
+
+    def validate(self, number, row):
+        if isinstance(row, ValidationError):
+            self.errors.append({"row": number, "errors": {"detail": row.messages}})
+            return None
+        cleaned, errors = clean_row(row)
+        isbn = cleaned.get("isbn")
+        if isbn and isbn in self.seen_isbns:
+            errors["isbn"] = [
+                f"Duplicate ISBN in this import (first seen on row {self.seen_isbns[isbn]})."
+            ]
+        if errors:
+            self.errors.append({"row": number, "errors": errors})
+            return None
+        self.seen_isbns[isbn] = number
+        return Book(**cleaned)
+
+    def flush(self, batch):
+        isbns = [book.isbn for book in batch]
+        with transaction.atomic():
+            existing = set(
+                Book.objects.filter(isbn__in=isbns).values_list("isbn", flat=True)
+            )
+            Book.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=["isbn"],
+                update_fields=UPDATE_FIELDS,
+            )
+            # bulk_create sends no post_save, so invalidate the cache here
+            bump_catalogue_version()
+        self.updated += len(existing)
+        self.created += len(batch) - len(existing)
+
+    def report(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "failed": len(self.errors),
+            "errors": self.errors,
+        }
+
+
+def import_books(lines, file_format, batch_size=DEFAULT_BATCH_SIZE):
+    """Import text `lines` in `file_format` ("csv" or "ndjson") and return the report."""
+    return BookImporter(batch_size=batch_size).run(READERS[file_format](lines))
@@ -0,0 +1,97 @@
+"""
+`IntegrityError` -> the `ValidationError` `full_clean()` would have raised.
+
+`save(validation="fast")` leaves uniqueness, constraints and foreign keys to
+the database instead of checking each with a SELECT first. When the database
+rejects a row, `validation_error_for()` finds the rule it broke from the
+error text and builds the same message dict the full checks produce:
+
+- unique fields and `UniqueConstraint`s: PostgreSQL names the constraint and
+  the key columns (`Key (isbn)=(...)`), SQLite the columns
+  (`UNIQUE constraint failed: core_book.isbn`); no query needed
+- foreign keys: neither database says which one, so each is checked with
+  `field.validate()`. Foreign keys are deferred, so this only happens on
+  saves outside a transaction; inside one they fail at COMMIT
+"""
+from contextlib import contextmanager
+
+from django.core.exceptions import NON_FIELD_ERRORS, ValidationError
+from django.db import IntegrityError
+from django.db.models import UniqueConstraint
+
+
+def names_columns(text, table, columns):
+    """Whether a unique violation message is about exactly `columns`."""
+    sqlite = ", ".join(f"{table}.{column}" for column in columns)
+    postgres = ", ".join(columns)
+    return f"constraint failed: {sqlite}" in text or f"Key ({postgres})=" in text
+
+
+def constraint_error(instance, constraint):
+    """What `validate_constraints()` raises for `constraint`."""
+    if (
+        not constraint.condition
+        and constraint.fields
+        and constraint.violation_error_message == constraint.default_violation_error_message
+    ):
+        error = instance.unique_error_message(type(instance), constraint.fields)
+    else:
+        error = ValidationError(
+            constraint.get_violation_error_message(), code=constraint.violation_error_code
+        )
+    if error.code == "unique" and len(constraint.fields) == 1:
+        return ValidationError({constraint.fields[0]: [error]})
+    return ValidationError({NON_FIELD_ERRORS: [error]})
+
+
+def unique_violation(instance, text):
+    meta = instance._meta
+    for constraint in meta.constraints:
+        if not isinstance(constraint, UniqueConstraint) or not constraint.fields:
+            continue
+        columns = [meta.get_field(name).column for name in constraint.fields]
+        if f'"{constraint.name}"' in text or names_columns(text, meta.db_table, columns):
+            return constraint_error(instance, constraint)
+    for field in meta.local_fields:
+        if field.unique and not field.primary_key and names_columns(
+            text, meta.db_table, [field.column]
+        ):
+            error = instance.unique_error_message(type(instance), (field.name,))
+            return ValidationError({field.name: [error]})
+    return None
+
+
+def foreign_key_violation(instance):
+    errors = {}
+    for field in instance._meta.local_fields:
+        if field.many_to_one:
+            try:
+                field.validate(getattr(instance, field.attname), instance)
+            except ValidationError as exc:
+                errors[field.name] = exc.error_list
+    return ValidationError(errors) if errors else None
+
+
+def validation_error_for(instance, exc):
+    """The `ValidationError` behind `exc`, or None if it isn't one we model."""
+    text = str(exc)
+    if "foreign key" in text.lower():
+        return foreign_key_violation(instance)
+    return unique_violation(instance, text)
+
+
+@contextmanager
+def integrity_errors_as_validation(instance):
+    try:
+        yield
+    except IntegrityError as exc:
+        error = validation_error_for(instance, exc)
+        if error is None:
+            raise
+        raise error from exc
+
+
+def violates(error, model, name):
+    """Whether `error` reports `model`'s constraint `name` being violated."""
+    constraint = next(c for c in model._meta.constraints if c.name == name)
+    return constraint.get_violation_error_message() in error.messages
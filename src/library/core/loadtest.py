@@ -0,0 +1,124 @@
+"""
+Minimal closed-loop HTTP load generator for comparing deployments.
+
+`concurrency` keep-alive connections each send requests back to back until
+`total` have completed. It runs on asyncio streams rather than threads, so
+the client stays cheap at the concurrency levels where WSGI workers run out
+of threads. Only what this API needs is supported: plain HTTP/1.1 and
+`Content-Length` or chunked response bodies.
+"""
+import asyncio
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+class LoadTestError(Exception):
+    pass
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def read_response(reader):
+    """Read one response; return its status code."""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    status = int(status_line.split()[1])
+    length, chunked, close = 0, False, False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name, value = name.strip().lower(), value.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value:
+            chunked = True
+        elif name == "connection" and value == "close":
+            close = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return status, close
+
+
+class LoadTest:
+    def __init__(self, url, total, concurrency, headers=None, timeout=30.0):
+        parts = urlsplit(url)
+        if parts.scheme != "http":
+            raise LoadTestError("Only http:// URLs are supported")
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += f"?{parts.query}"
+        self.total = total
+        self.concurrency = min(concurrency, total)
+        self.timeout = timeout
+        lines = [f"GET {self.path} HTTP/1.1", f"Host: {parts.netloc}"]
+        lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        self.request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    def run(self):
+        return asyncio.run(self.arun())
+
+    async def arun(self):
+        self.remaining = self.total
+        self.latencies = []
+        self.statuses = {}
+        self.errors = 0
+        started = time.perf_counter()
+        await asyncio.gather(*(self.worker() for _ in range(self.concurrency)))
+        return self.report(time.perf_counter() - started)
+
+    async def worker(self):
+        reader = writer = None
+        while self.remaining > 0:
+            self.remaining -= 1
+            begun = time.perf_counter()
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(self.host, self.port)
+                writer.write(self.request)
+                status, close = await asyncio.wait_for(read_response(reader), self.timeout)
+            except (OSError, ConnectionError, asyncio.TimeoutError, ValueError, IndexError):
+                self.errors += 1
+                writer = self.close(writer)
+                continue
+            self.latencies.append(time.perf_counter() - begun)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if close:
+                writer = self.close(writer)
+        self.close(writer)
+
+    @staticmethod
+    def close(writer):
+        if writer is not None:
+            writer.close()
+        return None
+
+    def report(self, elapsed):
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "statuses": dict(sorted(self.statuses.items())),
+            "elapsed_s": round(elapsed, 3),
+            "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+            "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        }
@@ -0,0 +1,45 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import (DEFAULT_BATCH_SIZE, READERS, import_books,
+                            iter_text_lines)
+
+
+class Command(BaseCommand):
+    help = "Stream books from a CSV or NDJSON file and upsert them on ISBN."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import, or '-' for stdin")
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=sorted(READERS),
+            help="Input format (default: guessed from the file extension)",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, path, file_format, batch_size, **options):
+        file_format = file_format or ("csv" if path.endswith(".csv") else "ndjson")
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        # Read bytes, so undecodable lines become error rows (see `iter_text_lines`)
+        if path == "-":
+            stdin = getattr(sys.stdin, "buffer", sys.stdin)
+            report = import_books(iter_text_lines(stdin), file_format, batch_size)
+        else:
+            try:
+                with open(path, "rb") as handle:
+                    report = import_books(iter_text_lines(handle), file_format, batch_size)
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+        for error in report["errors"]:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"created={report['created']} updated={report['updated']} "
+                f"failed={report['failed']}"
+            )
+        )
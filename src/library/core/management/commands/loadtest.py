@@ -0,0 +1,70 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.loadtest import LoadTest, LoadTestError
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer one GET endpoint of a running server with N concurrent "
+        "keep-alive connections and report throughput and latency percentiles. "
+        "Run it against the WSGI and the ASGI deployment to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("url", help="e.g. http://127.0.0.1:8000/api/books/")
+        parser.add_argument("--requests", type=int, default=5000)
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument(
+            "--user", help="Send a freshly minted access token for this username"
+        )
+        parser.add_argument(
+            "--header",
+            action="append",
+            default=[],
+            metavar="NAME:VALUE",
+            help="Extra request header (repeatable)",
+        )
+        parser.add_argument("--timeout", type=float, default=30.0)
+        parser.add_argument("--json", action="store_true", help="Print the raw report")
+
+    def handle(self, *args, url, requests, concurrency, user, header, timeout, **options):
+        if requests < 1 or concurrency < 1:
+            raise CommandError("--requests and --concurrency must be at least 1")
+
+        headers = {}
+        for item in header:
+            name, sep, value = item.partition(":")
+            if not sep:
+                raise CommandError(f"--header must look like NAME:VALUE, got {item!r}")
+            headers[name.strip()] = value.strip()
+        if user:
+            try:
+                account = get_user_model().objects.get(username=user)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No user named {user!r}")
+            headers["Authorization"] = f"Bearer {AccessToken.for_user(account)}"
+
+        try:
+            report = LoadTest(url, requests, concurrency, headers, timeout).run()
+        except LoadTestError as exc:
+            raise CommandError(str(exc))
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report))
+            return
+        statuses = " ".join(f"{code}={count}" for code, count in report["statuses"].items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{report['requests']} requests in {report['elapsed_s']}s "
+                f"({report['rps']} req/s) at concurrency {concurrency}"
+            )
+        )
+        self.stdout.write(
+            f"latency ms: p50={report['p50_ms']} p95={report['p95_ms']} "
+            f"p99={report['p99_ms']} mean={report['mean_ms']}"
+        )
+        self.stdout.write(f"statuses: {statuses or '-'} errors={report['errors']}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from core.revocation import revocation_store
+
+
+class Command(BaseCommand):
+    help = "Delete revoked refresh tokens whose expiry has passed."
+
+    def handle(self, *args, **options):
+        deleted = revocation_store.purge()
+        self.stdout.write(self.style.SUCCESS(f"purged={deleted}"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.models import PatronCirculation
+
+
+class Command(BaseCommand):
+    help = "Recompute every patron's active loan count and earliest due date from Loan."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, batch_size, database, **options):
+        changed = PatronCirculation.objects.using(database).sync(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"repaired={changed}"))
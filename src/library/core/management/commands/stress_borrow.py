@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.stress import BorrowStress
+
+
+class Command(BaseCommand):
+    help = (
+        "Race N threads to borrow the same book, round after round, through "
+        "the borrow view and report throughput, outcomes and lock wait. Every "
+        "round should have exactly one 201 and no 5xx or exceptions. Creates a "
+        "stress book and patrons, and removes them afterwards unless --keep."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--rounds", type=int, default=50)
+        parser.add_argument("--keep", action="store_true", help="Keep the stress book and patrons")
+        parser.add_argument("--json", action="store_true", help="Print the raw report")
+
+    def handle(self, *args, threads, rounds, keep, **options):
+        if threads < 2 or rounds < 1:
+            raise CommandError("--threads must be at least 2 and --rounds at least 1")
+
+        stress = BorrowStress(threads, rounds)
+        try:
+            report = stress.run()
+        finally:
+            if not keep:
+                stress.teardown()
+
+        if options["json"]:
+            self.stdout.write(json.dumps(report))
+            return
+        outcomes = " ".join(f"{name}={count}" for name, count in report["outcomes"].items())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{report['requests']} borrows in {report['elapsed_s']}s ({report['rps']} req/s), "
+                f"{threads} threads x {rounds} rounds on {report['vendor']}"
+            )
+        )
+        self.stdout.write(f"outcomes: {outcomes}")
+        self.stdout.write(
+            f"latency ms: p50={report['p50_ms']} p95={report['p95_ms']} max={report['max_ms']}"
+        )
+        self.stdout.write(
+            f"lock wait ms: mean={report['lock_wait_mean_ms']} "
+            f"p95={report['lock_wait_p95_ms']} max={report['lock_wait_max_ms']}"
+        )
+        won = f"{report['rounds_won']}/{rounds} rounds won, {report['double_borrows']} double borrows"
+        if report["double_borrows"] or report["rounds_won"] != rounds:
+            self.stdout.write(self.style.ERROR(won))
+        else:
+            self.stdout.write(won)
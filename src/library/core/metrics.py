@@ -0,0 +1,488 @@
+"""
+Per-route request metrics in Prometheus text format.
+
+`MetricsMiddleware` records, for each resolved route name (`books-list`,
+`loan-return`, ...), method and status: a latency histogram, a histogram of
+DB queries per request, DB time, serializer time (models' serializers use
+`TimedSerializerMixin`) and response bytes.
+
+Each worker process keeps its own totals and writes them, with its cache
+hit/miss counters, to `<LIBRARY_STATE_DIR>/metrics/<pid>-<id>.json` at most
+every `LIBRARY_METRICS_FLUSH_SECONDS`. `/metrics` sums every process's file,
+so scraping any worker sees the whole host without an external service.
+Files of processes that have exited are folded into `retired.json` on the
+next scrape, so worker restarts neither leave files behind nor make the
+host's counters go backwards.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .stamps import state_dir
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, and no signal-0 liveness check
+    fcntl = None
+
+DEFAULT_FLUSH_SECONDS = 5
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+UNMATCHED_ROUTE = "unmatched"
+
+# Totals of exited processes, plus the names of the files merged into them
+RETIRED_FILE = "retired.json"
+
+
+def metrics_dir():
+    return state_dir() / "metrics"
+
+
+def get_flush_seconds():
+    return getattr(settings, "LIBRARY_METRICS_FLUSH_SECONDS", DEFAULT_FLUSH_SECONDS)
+
+
+# ── Per-request sample ──────────────────────────
+
+class RequestSample:
+    """What one request spent; filled in from wherever its context runs."""
+
+    __slots__ = ("queries", "db_seconds", "serializer_seconds", "serializing", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+        # `(alias, sql, seconds)` per query when a profiler asks for them
+        self.statements = None
+
+
+# The sample of the request being handled, or None outside a request.
+# sync_to_async copies the context, so the async ORM's queries count too.
+current_sample = ContextVar("current_sample", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    sample = current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        sample.db_seconds += elapsed
+        sample.queries += 1
+        if sample.statements is not None:
+            sample.statements.append((context["connection"].alias, sql, elapsed))
+
+
+def instrument_connection(connection):
+    # Runs on every (re)connect of the same wrapper; install the hook once
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+@contextmanager
+def serializer_timer():
+    """Add the enclosed time to the request's serializer time (outermost only)."""
+    sample = current_sample.get()
+    if sample is None or sample.serializing:
+        yield
+        return
+    sample.serializing = True
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        sample.serializer_seconds += time.perf_counter() - start
+        sample.serializing = False
+
+
+class TimedSerializerMixin:
+    """Count `to_representation` towards the request's serializer time."""
+
+    def to_representation(self, instance):
+        with serializer_timer():
+            return super().to_representation(instance)
+
+
+def write_json(path, data):
+    """Replace `path` atomically, so a scrape never reads a partial file."""
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.")
+    try:
+        with os.fdopen(fd, "w") as handle:
+            json.dump(data, handle)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# ── Process registry ────────────────────────────
+
+def empty_series():
+    return {
+        "count": 0,
+        "duration_sum": 0.0,
+        "duration_buckets": [0] * len(DURATION_BUCKETS),
+        "queries_sum": 0,
+        "queries_buckets": [0] * len(QUERY_BUCKETS),
+        "db_seconds": 0.0,
+        "serializer_seconds": 0.0,
+        "response_bytes": 0,
+    }
+
+
+def observe(buckets, bounds, value):
+    """Count `value` in the first bucket that holds it (none: only +Inf)."""
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            buckets[index] += 1
+            return
+
+
+def merge_series(total, series):
+    for name, value in series.items():
+        if isinstance(value, list):
+            total[name] = [a + b for a, b in zip(total[name], value)]
+        else:
+            total[name] += value
+
+
+class MetricsRegistry:
+    """This process's totals, keyed by (route, method, status)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self.pid = os.getpid()
+        self.name = f"{self.pid}-{uuid.uuid4().hex[:8]}"
+        self.series = {}
+        self.last_flush = None
+
+    def _check_fork(self):
+        # A forked worker must not write over (or double count) its parent
+        if os.getpid() != self.pid:
+            self._start()
+
+    def record(self, key, duration, sample, size):
+        with self._lock:
+            self._check_fork()
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = empty_series()
+            series["count"] += 1
+            series["duration_sum"] += duration
+            observe(series["duration_buckets"], DURATION_BUCKETS, duration)
+            series["queries_sum"] += sample.queries
+            observe(series["queries_buckets"], QUERY_BUCKETS, sample.queries)
+            series["db_seconds"] += sample.db_seconds
+            series["serializer_seconds"] += sample.serializer_seconds
+            series["response_bytes"] += size
+
+    def add_bytes(self, key, size):
+        """Bytes of a streamed response, counted once it has been sent."""
+        with self._lock:
+            self._check_fork()
+            series = self.series.get(key)
+            if series is not None:
+                series["response_bytes"] += size
+
+    def snapshot(self):
+        from .authentication import user_cache_stats
+        from .caching import catalogue_cache_stats
+
+        with self._lock:
+            self._check_fork()
+            series = [
+                [*key, {name: list(value) if isinstance(value, list) else value
+                        for name, value in stats.items()}]
+                for key, stats in self.series.items()
+            ]
+        return {
+            "series": series,
+            "caches": {
+                "catalogue": catalogue_cache_stats.snapshot(),
+                "users": user_cache_stats.snapshot(),
+            },
+        }
+
+    def flush(self, force=False):
+        """Write this process's totals for `/metrics` if due (or `force`)."""
+        now = time.monotonic()
+        with self._lock:
+            if not force and self.last_flush is not None and (
+                now - self.last_flush < get_flush_seconds()
+            ):
+                return
+            self.last_flush = now
+        snapshot = self.snapshot()
+        directory = metrics_dir()
+        directory.mkdir(parents=True, exist_ok=True)
+        write_json(directory / f"{self.name}.json", snapshot)
+
+    def clear(self):
+        with self._lock:
+            self._start()
+
+
+registry = MetricsRegistry()
+
+
+def collect():
+    """Totals of every process on this host, this one's fresh."""
+    registry.flush(force=True)
+    directory = metrics_dir()
+    with collect_lock(directory):
+        retire_dead_processes(directory)
+        totals = {"series": {}, "caches": {}}
+        for path in directory.glob("*.json"):
+            data = read_totals(path)
+            if data is not None:
+                add_totals(totals, data)
+    return totals
+
+
+# ── Exited processes ────────────────────────────
+
+@contextmanager
+def collect_lock(directory):
+    """Serialize scrapes, so none reads a file while another retires it."""
+    if fcntl is None:
+        yield
+        return
+    with open(directory / ".collect.lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def read_totals(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def add_totals(totals, data):
+    series, caches = totals["series"], totals["caches"]
+    if isinstance(data["series"], list):
+        data = {**data, "series": {tuple(row[:3]): row[3] for row in data["series"]}}
+    for key, stats in data["series"].items():
+        merge_series(series.setdefault(key, empty_series()), stats)
+    for cache, counts in data["caches"].items():
+        merge_series(caches.setdefault(cache, {"hits": 0, "misses": 0}), counts)
+
+
+def file_pid(path):
+    """The pid in a `<pid>-<id>.json` file name, or None."""
+    pid = path.stem.split("-", 1)[0]
+    return int(pid) if pid.isdigit() else None
+
+
+def process_exists(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def retire_dead_processes(directory):
+    """Fold the files of exited processes into `RETIRED_FILE` and delete them."""
+    if fcntl is None:
+        return
+    retired_path = directory / RETIRED_FILE
+    retired = read_totals(retired_path) or {"series": [], "caches": {}, "merged": []}
+    merged = set(retired.get("merged", []))
+    dead = [
+        path
+        for path in directory.glob("*.json")
+        if (pid := file_pid(path)) is not None
+        and pid != os.getpid()
+        and not process_exists(pid)
+    ]
+    # Merged by a scrape that died before deleting them: just delete them
+    fresh = [path for path in dead if path.name not in merged]
+    if fresh:
+        totals = {"series": {}, "caches": {}}
+        add_totals(totals, retired)
+        for path in fresh:
+            data = read_totals(path)
+            if data is not None:
+                add_totals(totals, data)
+        write_json(retired_path, {
+            "series": [[*key, stats] for key, stats in totals["series"].items()],
+            "caches": totals["caches"],
+            # Written before the files are deleted, so a crash in between
+            # can't count them twice
+            "merged": sorted(path.name for path in fresh),
+        })
+    for path in dead:
+        path.unlink(missing_ok=True)
+
+
+# ── Prometheus text format ──────────────────────
+
+def escape(value):
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+def labels(**values):
+    return "{" + ",".join(f'{name}="{escape(value)}"' for name, value in values.items()) + "}"
+
+
+def histogram_lines(name, label_values, buckets, bounds, total, count):
+    cumulative = 0
+    for bound, bucket in zip(bounds, buckets):
+        cumulative += bucket
+        yield f"{name}_bucket{labels(**label_values, le=bound)} {cumulative}"
+    yield f'{name}_bucket{labels(**label_values, le="+Inf")} {count}'
+    yield f"{name}_sum{labels(**label_values)} {total}"
+    yield f"{name}_count{labels(**label_values)} {count}"
+
+
+def render(totals):
+    series = sorted(totals["series"].items())
+    lines = [
+        "# HELP library_http_request_duration_seconds Time to build the response.",
+        "# TYPE library_http_request_duration_seconds histogram",
+    ]
+    for (route, method, status), stats in series:
+        lines.extend(histogram_lines(
+            "library_http_request_duration_seconds",
+            {"route": route, "method": method, "status": status},
+            stats["duration_buckets"], DURATION_BUCKETS,
+            stats["duration_sum"], stats["count"],
+        ))
+    lines += [
+        "# HELP library_http_request_db_queries Database queries per request.",
+        "# TYPE library_http_request_db_queries histogram",
+    ]
+    for (route, method, status), stats in series:
+        lines.extend(histogram_lines(
+            "library_http_request_db_queries",
+            {"route": route, "method": method, "status": status},
+            stats["queries_buckets"], QUERY_BUCKETS,
+            stats["queries_sum"], stats["count"],
+        ))
+    for name, field, help_text in (
+        ("library_http_request_db_seconds_total", "db_seconds",
+         "Time spent executing database queries."),
+        ("library_http_request_serializer_seconds_total", "serializer_seconds",
+         "Time spent in serializers' to_representation (includes their queries)."),
+        ("library_http_response_bytes_total", "response_bytes",
+         "Response body bytes, streamed bodies once fully sent."),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (route, method, status), stats in series:
+            lines.append(
+                f"{name}{labels(route=route, method=method, status=status)} {stats[field]}"
+            )
+    lines += [
+        "# HELP library_cache_requests_total In-process cache lookups.",
+        "# TYPE library_cache_requests_total counter",
+    ]
+    for cache, counts in sorted(totals["caches"].items()):
+        lines.append(f'library_cache_requests_total{labels(cache=cache, result="hit")} {counts["hits"]}')
+        lines.append(f'library_cache_requests_total{labels(cache=cache, result="miss")} {counts["misses"]}')
+    return "\n".join(lines) + "\n"
+
+
+# ── Middleware ──────────────────────────────────
+
+def route_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    return match.view_name or match.route
+
+
+def count_streamed_bytes(response, key):
+    if response.is_async:
+        async def counted(content):
+            size = 0
+            try:
+                async for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                registry.add_bytes(key, size)
+    else:
+        def counted(content):
+            size = 0
+            try:
+                for chunk in content:
+                    size += len(chunk)
+                    yield chunk
+            finally:
+                registry.add_bytes(key, size)
+
+    response.streaming_content = counted(response.streaming_content)
+
+
+class MetricsMiddleware:
+    """Record each request's metrics under its route; keep it first in MIDDLEWARE."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        self.finish(request, response, sample, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_sample.reset(token)
+        self.finish(request, response, sample, time.perf_counter() - start)
+        return response
+
+    def finish(self, request, response, sample, duration):
+        key = (route_name(request), request.method, str(response.status_code))
+        if response.streaming:
+            size = 0
+            count_streamed_bytes(response, key)
+        else:
+            size = len(response.content)
+        registry.record(key, duration, sample, size)
+        registry.flush()
@@ -0,0 +1,27 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+
+
+class AsyncRoutesMiddleware:
+    """
+    Resolve ASGI requests against `LIBRARY_ASYNC_URLCONF`.
+
+    That urlconf swaps the hot read endpoints for the async views in
+    `core.async_views`; WSGI requests, which would run them in a fresh event
+    loop per request, keep the sync `ROOT_URLCONF`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.urlconf = getattr(settings, "LIBRARY_ASYNC_URLCONF", None)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.urlconf and isinstance(request, ASGIRequest):
+            request.urlconf = self.urlconf
+        return self.get_response(request)
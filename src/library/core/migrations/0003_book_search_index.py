@@ -0,0 +1,77 @@
+from django.db import migrations
+
+# Names and SQL are literals so this migration never changes with app code.
+# `core.search.POSTGRES_DOCUMENT` must stay identical to the GIN index
+# expression below for PostgreSQL to use the index (see test_search.py).
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE core_book_fts USING fts5(
+        title, author, description, isbn,
+        content='core_book', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER core_book_fts_ai AFTER INSERT ON core_book BEGIN
+        INSERT INTO core_book_fts(rowid, title, author, description, isbn)
+        VALUES (new.id, new.title, new.author, new.description, new.isbn);
+    END
+    """,
+    """
+    CREATE TRIGGER core_book_fts_ad AFTER DELETE ON core_book BEGIN
+        INSERT INTO core_book_fts(core_book_fts, rowid, title, author, description, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.description, old.isbn);
+    END
+    """,
+    """
+    CREATE TRIGGER core_book_fts_au AFTER UPDATE ON core_book BEGIN
+        INSERT INTO core_book_fts(core_book_fts, rowid, title, author, description, isbn)
+        VALUES ('delete', old.id, old.title, old.author, old.description, old.isbn);
+        INSERT INTO core_book_fts(rowid, title, author, description, isbn)
+        VALUES (new.id, new.title, new.author, new.description, new.isbn);
+    END
+    """,
+    "INSERT INTO core_book_fts(core_book_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS core_book_fts_au",
+    "DROP TRIGGER IF EXISTS core_book_fts_ad",
+    "DROP TRIGGER IF EXISTS core_book_fts_ai",
+    "DROP TABLE IF EXISTS core_book_fts",
+]
+
+POSTGRES_FORWARD = [
+    "CREATE INDEX IF NOT EXISTS core_book_search_gin ON core_book USING GIN (("
+    "to_tsvector('english'::regconfig, "
+    "coalesce(\"core_book\".\"title\", '') || ' ' || "
+    "coalesce(\"core_book\".\"author\", '') || ' ' || "
+    "coalesce(\"core_book\".\"description\", '') || ' ' || "
+    "coalesce(\"core_book\".\"isbn\", ''))))",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS core_book_search_gin",
+]
+
+
+def run_for_vendor(statements_by_vendor):
+    def run(apps, schema_editor):
+        for statement in statements_by_vendor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_alter_book_isbn"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD}),
+            run_for_vendor({"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 6.0.1 on 2026-10-18 02:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def populate(apps, schema_editor):
+    """One row per user, from their active loans."""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split("."))
+    Loan = apps.get_model("core", "Loan")
+    PatronCirculation = apps.get_model("core", "PatronCirculation")
+    state = {
+        row["user"]: row
+        for row in Loan.objects.filter(returned_at__isnull=True)
+        .order_by()
+        .values("user")
+        .annotate(total=Count("id"), due=Min("due_date"))
+    }
+    PatronCirculation.objects.bulk_create(
+        (
+            PatronCirculation(
+                user_id=pk,
+                active_loans=state.get(pk, {}).get("total", 0),
+                earliest_due=state.get(pk, {}).get("due"),
+            )
+            for pk in User.objects.values_list("pk", flat=True).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0004_loan_book_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PatronCirculation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='circulation', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('active_loans', models.PositiveIntegerField(default=0)),
+                ('earliest_due', models.DateTimeField(blank=True, help_text='Earliest due date among active loans', null=True)),
+            ],
+            options={
+                'verbose_name': 'Patron circulation',
+                'verbose_name_plural': 'Patron circulation',
+            },
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
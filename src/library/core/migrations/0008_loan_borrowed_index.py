@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-18 04:42
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_revoked_token'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loan',
+            index=models.Index(fields=['-borrowed_at', '-id'], name='loan_borrowed_idx'),
+        ),
+    ]
@@ -1,9 +1,14 @@
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import (Count, Exists, F, Min, OuterRef, Prefetch,
+                              Subquery, Value)
+from django.db.models.functions import Coalesce, Least
 # from django.conf import settings
 from django.utils import timezone
 
+from .integrity import integrity_errors_as_validation
+
 isbn_validator = RegexValidator(
     regex=r"^(?:\d{10}|\d{13})$",
     message="ISBN must be 10 or 13 digits (no hyphens allowed here)",
@@ -11,7 +16,37 @@ isbn_validator = RegexValidator(
 )
 
 
-class Book(models.Model):
+class BookQuerySet(models.QuerySet):
+    def with_availability(self):
+        """Annotate availability so `is_available` needs no per-row query."""
+        active_loan = Loan.objects.filter(book=OuterRef("pk"), returned_at__isnull=True)
+        return self.annotate(annotated_is_available=~Exists(active_loan))
+
+
+class ValidatedModel(models.Model):
+    """
+    Runs `full_clean()` on every save.
+
+    `save(validation="fast")` runs only the in-memory part: field validators
+    and `clean()`. Uniqueness, `Meta.constraints` and foreign key existence
+    (a SELECT each) are left to the database, and a violation is raised as
+    the same `ValidationError` the full checks give (see `core.integrity`).
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, validation="full", **kwargs):
+        if validation != "fast":
+            self.full_clean()
+            return super().save(*args, **kwargs)
+        foreign_keys = [field.name for field in self._meta.local_fields if field.many_to_one]
+        self.full_clean(exclude=foreign_keys, validate_unique=False, validate_constraints=False)
+        with integrity_errors_as_validation(self):
+            return super().save(*args, **kwargs)
+
+
+class Book(ValidatedModel):
     title = models.CharField(max_length=255, blank=False, null=False)
     author = models.CharField(max_length=255, blank=False, null=False)
     isbn = models.CharField(
@@ -26,21 +61,27 @@ class Book(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BookQuerySet.as_manager()
+
     class Meta:
         ordering = ["title"]
         verbose_name = "Book"
         verbose_name_plural = "Books"
+        # One per `BookViewSet.ordering_choices`, ending in the keyset tiebreaker
+        indexes = [
+            models.Index(fields=["title", "id"], name="book_title_id_idx"),
+            models.Index(fields=["author", "id"], name="book_author_id_idx"),
+            models.Index(fields=["created_at", "id"], name="book_created_id_idx"),
+        ]
 
     def __str__(self):
         return f"{self.title} by {self.author}"
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
-
     @property
     def is_available(self) -> bool:
         """Derived: True if no active loan exists for this book."""
+        if hasattr(self, "annotated_is_available"):
+            return self.annotated_is_available
         return not self.loans.filter(returned_at__isnull=True).exists()
 
     @property
@@ -49,7 +90,18 @@ class Book(models.Model):
         return self.loans.filter(returned_at__isnull=True).first()
 
 
-class Loan(models.Model):
+class LoanQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(returned_at__isnull=True)
+
+    def for_detail(self):
+        """Load everything `LoanDetailSerializer` touches in O(1) queries."""
+        return self.select_related("user").prefetch_related(
+            Prefetch("book", queryset=Book.objects.with_availability())
+        )
+
+
+class Loan(ValidatedModel):
     book = models.ForeignKey(
         Book,
         on_delete=models.PROTECT,
@@ -66,6 +118,8 @@ class Loan(models.Model):
     due_date = models.DateTimeField()
     returned_at = models.DateTimeField(null=True, blank=True, editable=False)
 
+    objects = LoanQuerySet.as_manager()
+
     class Meta:
         ordering = ["-borrowed_at"]
         verbose_name = "Loan"
@@ -78,6 +132,26 @@ class Loan(models.Model):
                 name="unique_active_loan_per_book",
             )
         ]
+        indexes = [
+            # Active loans per user: borrow rules, my-active, overdue checks
+            models.Index(
+                fields=["user", "due_date"],
+                condition=models.Q(returned_at__isnull=True),
+                name="loan_active_user_due_idx",
+            ),
+            # A user's loan history in `LoanViewSet` order
+            models.Index(
+                fields=["user", "-borrowed_at", "-id"], name="loan_user_borrowed_idx"
+            ),
+            # The staff loan list (every user's loans) in `LoanViewSet` order
+            models.Index(fields=["-borrowed_at", "-id"], name="loan_borrowed_idx"),
+            # Staff overdue scan: `due_date < now` over active loans, oldest first
+            models.Index(
+                fields=["due_date", "id"],
+                condition=models.Q(returned_at__isnull=True),
+                name="loan_active_due_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.user.username} borrowed {self.book.title} on {self.borrowed_at.date()}"
@@ -87,11 +161,6 @@ class Loan(models.Model):
         if self.due_date <= self.borrowed_at:
             raise ValidationError("Due date must be after borrow date.")
 
-    def save(self, *args, **kwargs):
-        """Auto validate on save"""
-        self.full_clean()
-        super().save(*args, **kwargs)
-
     @property
     def is_active(self) -> bool:
         return self.returned_at is None
@@ -101,3 +170,140 @@ class Loan(models.Model):
         if not self.is_active:
             return False
         return timezone.now() > self.due_date
+
+
+class PatronCirculationQuerySet(models.QuerySet):
+    def record_borrows(self, user_id, due_dates):
+        """Count new active loans for `user_id` with one UPDATE (no Loan scan)."""
+        earliest = Value(min(due_dates))
+        return self.filter(user_id=user_id).update(
+            active_loans=F("active_loans") + len(due_dates),
+            # LEAST() is NULL on SQLite/MySQL when either side is NULL
+            earliest_due=Coalesce(Least("earliest_due", earliest), earliest),
+        )
+
+    def refresh(self, user_ids):
+        """
+        Recompute existing rows for `user_ids` in one UPDATE. Active loans per
+        user are bounded, so the subqueries stay on `loan_active_user_due_idx`.
+        """
+        active = Loan.objects.using(self.db).filter(
+            user=OuterRef("user"), returned_at__isnull=True
+        ).order_by().values("user")
+        with transaction.atomic(using=self.db, savepoint=False):
+            # Lock the rows first, as `sync()` does. Under READ COMMITTED an
+            # UPDATE that waits for a concurrent borrow's row lock keeps the
+            # COUNT it took before that borrow committed; after the lock the
+            # UPDATE's snapshot includes it. (SQLite's writer already holds
+            # the database lock, so there's nothing to wait for.)
+            if connections[self.db].features.has_select_for_update:
+                list(
+                    self.select_for_update()
+                    .filter(user__in=user_ids)
+                    .order_by("user")
+                    .values_list("pk", flat=True)
+                )
+            return self.filter(user__in=user_ids).update(
+                active_loans=Coalesce(
+                    Subquery(active.annotate(total=Count("id")).values("total")), 0
+                ),
+                earliest_due=Subquery(active.annotate(due=Min("due_date")).values("due")),
+            )
+
+    def sync(self, user_ids=None, batch_size=1000):
+        """
+        Recompute from `Loan`, creating missing rows; with no `user_ids`, every
+        user with an active loan or an existing row. Returns the rows changed.
+        """
+        active = Loan.objects.using(self.db).filter(returned_at__isnull=True).order_by()
+        stored = self.select_for_update()
+        if user_ids is not None:
+            active = active.filter(user__in=user_ids)
+            stored = stored.filter(user__in=user_ids)
+
+        with transaction.atomic(using=self.db):
+            # Lock the rows before reading Loan so a concurrent borrow or
+            # return waits for us instead of being overwritten
+            current = {
+                row.user_id: (row.active_loans, row.earliest_due)
+                for row in stored.iterator()
+            }
+            computed = {
+                row["user"]: (row["total"], row["due"])
+                for row in active.values("user").annotate(
+                    total=Count("id"), due=Min("due_date")
+                )
+            }
+            users = set(current) | set(computed) if user_ids is None else set(user_ids)
+            changed = []
+            for user in users:
+                state = computed.get(user, (0, None))
+                if current.get(user) != state:
+                    changed.append(
+                        PatronCirculation(
+                            user_id=user, active_loans=state[0], earliest_due=state[1]
+                        )
+                    )
+            self.bulk_create(
+                changed,
+                batch_size=batch_size,
+                update_conflicts=True,
+                unique_fields=["user"],
+                update_fields=["active_loans", "earliest_due"],
+            )
+        return len(changed)
+
+
+class PatronCirculation(models.Model):
+    """
+    Denormalized loan state per user, so the borrow rules read one locked row
+    instead of counting the user's loans.
+
+    Kept current by the `Loan` signals and explicitly by the bulk paths in
+    `circulation` and `seeding`; `manage.py repair_circulation` rebuilds it.
+    """
+
+    user = models.OneToOneField(
+        "auth.User",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="circulation",
+    )
+    active_loans = models.PositiveIntegerField(default=0)
+    earliest_due = models.DateTimeField(
+        null=True, blank=True, help_text="Earliest due date among active loans"
+    )
+
+    objects = PatronCirculationQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Patron circulation"
+        verbose_name_plural = "Patron circulation"
+
+    def __str__(self):
+        return f"{self.user_id}: {self.active_loans} active"
+
+    def has_overdue(self, now=None) -> bool:
+        if self.earliest_due is None:
+            return False
+        return self.earliest_due < (now or timezone.now())
+
+
+class RevokedToken(models.Model):
+    """
+    A refresh token that may no longer be used, keyed on its `jti`.
+
+    Rows are only needed until the token's own `exp`; `manage.py
+    purge_revoked_tokens` deletes the expired ones.
+    """
+
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Revoked token"
+        verbose_name_plural = "Revoked tokens"
+
+    def __str__(self):
+        return self.jti
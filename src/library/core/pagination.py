@@ -0,0 +1,205 @@
+"""
+Keyset (cursor) pagination.
+
+Unlike `PageNumberPagination`, pages are located with a `WHERE` on the
+ordering columns instead of `OFFSET`, and no `COUNT(*)` runs unless the
+client asks for one with `?count=exact` or `?count=approximate`.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over any multi-column ordering.
+
+    The view provides `get_ordering()`, a list like `["-created_at", "-id"]`
+    whose last column must be unique so every row has a stable position.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    count_query_param = "count"
+    invalid_cursor_message = "Invalid cursor"
+    default_ordering = ["-id"]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = self.get_count(queryset, request)
+        page = self.page_queryset(queryset, request, view)
+        return self.finish_page(list(page))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """`paginate_queryset()` for async views, on the async ORM API."""
+        self.count = await self.aget_count(queryset, request)
+        page = self.page_queryset(queryset, request, view)
+        return self.finish_page([row async for row in page])
+
+    def page_queryset(self, queryset, request, view):
+        """The lazy query for this page: one extra row tells us if there is more."""
+        self.request = request
+        self.ordering = self.get_ordering(view)
+        self.position, self.reverse = self.decode_cursor(request, queryset.model)
+        ordering = self.flip(self.ordering) if self.reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.after(ordering, self.position))
+        return queryset[: self.page_size + 1]
+
+    def finish_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        # Walking backwards we just came from the next page, and vice versa
+        self.has_next = has_more if not self.reverse else True
+        self.has_previous = (self.position is not None) if not self.reverse else has_more
+        self.first_row = rows[0] if rows else None
+        self.last_row = rows[-1] if rows else None
+        if not rows and self.position is not None:
+            self.has_next = self.has_previous = False
+        return rows
+
+    def get_paginated_response(self, data):
+        payload = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        if self.count is not None:
+            payload = {"count": self.count[0], "count_type": self.count[1], **payload}
+        return Response(payload)
+
+    def get_ordering(self, view):
+        if view is not None and hasattr(view, "get_ordering"):
+            return list(view.get_ordering())
+        return list(self.default_ordering)
+
+    # ── Counting ────────────────────────────────────
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == "exact":
+            return queryset.count(), "exact"
+        if mode == "approximate":
+            return self.estimate_count(queryset)
+        return None
+
+    async def aget_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == "exact":
+            return await queryset.acount(), "exact"
+        if mode == "approximate":
+            return await self.aestimate_count(queryset)
+        return None
+
+    def estimate_count(self, queryset):
+        """Planner row estimate on PostgreSQL; other databases count exactly."""
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return queryset.count(), "exact"
+        plan = json.loads(queryset.order_by().explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"]), "approximate"
+
+    async def aestimate_count(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return await queryset.acount(), "exact"
+        plan = json.loads(await queryset.order_by().aexplain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"]), "approximate"
+
+    # ── Keyset filtering ────────────────────────────
+
+    @staticmethod
+    def flip(ordering):
+        return [name[1:] if name.startswith("-") else f"-{name}" for name in ordering]
+
+    @staticmethod
+    def after(ordering, position):
+        """
+        Rows strictly after `position` in `ordering`, i.e.
+        (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+        """
+        condition = Q()
+        equal_so_far = Q()
+        for name, value in zip(ordering, position):
+            field = name.lstrip("-")
+            lookup = "lt" if name.startswith("-") else "gt"
+            condition |= equal_so_far & Q(**{f"{field}__{lookup}": value})
+            equal_so_far &= Q(**{field: value})
+        return condition
+
+    @staticmethod
+    def row_value(row, name):
+        field = name.lstrip("-")
+        return row[field] if isinstance(row, dict) else getattr(row, field)
+
+    # ── Cursor encoding ─────────────────────────────
+
+    def encode_cursor(self, row, reverse):
+        position = []
+        for name in self.ordering:
+            value = self.row_value(row, name)
+            if isinstance(value, (datetime, date)):
+                value = value.isoformat()
+            position.append(value)
+        payload = json.dumps({"p": position, "r": reverse}, separators=(",", ":"))
+        encoded = base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request, model):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            position = payload["p"]
+            reverse = bool(payload.get("r", False))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            position = [
+                self.parse_value(model, name, value)
+                for name, value in zip(self.ordering, position)
+            ]
+        except (
+            TypeError, ValueError, KeyError, UnicodeError, binascii.Error, ValidationError
+        ):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    @staticmethod
+    def parse_value(model, name, value):
+        try:
+            field = model._meta.get_field(name.lstrip("-"))
+        except FieldDoesNotExist:
+            # Annotations (e.g. search_rank) round-trip through JSON as-is
+            return value
+        if field.get_internal_type() == "DateTimeField" and isinstance(value, str):
+            parsed = parse_datetime(value)
+            if parsed is None:
+                raise ValueError(value)
+            return parsed
+        return field.to_python(value)
+
+    def get_next_link(self):
+        if not self.has_next or self.last_row is None:
+            return None
+        return self.encode_cursor(self.last_row, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.first_row is None:
+            return None
+        return self.encode_cursor(self.first_row, reverse=True)
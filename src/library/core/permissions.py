@@ -1,6 +1,11 @@
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 
+def is_staff_user(user):
+    """Whether `user` (possibly None or anonymous) may use staff-only features."""
+    return bool(user and user.is_authenticated and user.is_staff)
+
+
 class IsAdminOrReadOnly(BasePermission):
     """
     Allows read-only access (GET, HEAD, OPTIONS) to anyone,
@@ -12,7 +17,7 @@ class IsAdminOrReadOnly(BasePermission):
         if request.method in SAFE_METHODS:
             return True
         # Write methods require staff
-        return request.user and request.user.is_staff
+        return is_staff_user(request.user)
 
 
 class IsBorrowerOrAdmin(BasePermission):
@@ -28,7 +33,7 @@ class IsBorrowerOrAdmin(BasePermission):
             return True
 
         # Write/return: only the borrower or staff
-        return request.user == obj.user or request.user.is_staff
+        return request.user == obj.user or is_staff_user(request.user)
 
 
 class IsBorrowerOrAdminForLoan(BasePermission):
@@ -36,4 +41,4 @@ class IsBorrowerOrAdminForLoan(BasePermission):
         if request.method in SAFE_METHODS:
             return True
 
-        return request.user == obj.user or request.user.is_staff
+        return request.user == obj.user or is_staff_user(request.user)
@@ -0,0 +1,114 @@
+"""
+Connection pool visibility.
+
+`pool_report()` summarizes every database alias: for pooled PostgreSQL
+aliases the live psycopg pool statistics (connections in use, requests
+waiting, cumulative wait time), otherwise how connections are kept. The
+same summary is logged from `request_finished` at most once every
+`LIBRARY_DB_POOL_LOG_INTERVAL` seconds per process, and as a warning
+whenever requests are queued for a connection.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOG_INTERVAL = 60
+
+
+def get_pool(connection):
+    """The alias's psycopg pool, or None (not PostgreSQL, or pooling off)."""
+    return getattr(connection, "pool", None)
+
+
+def summarize(stats):
+    """Derived gauges from `ConnectionPool.get_stats()`, which omits zero counters."""
+    size = stats.get("pool_size", 0)
+    available = stats.get("pool_available", 0)
+    requests = stats.get("requests_num", 0)
+    wait_ms = stats.get("requests_wait_ms", 0)
+    return {
+        "min_size": stats.get("pool_min", 0),
+        "max_size": stats.get("pool_max", 0),
+        "size": size,
+        "in_use": size - available,
+        "idle": available,
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": requests,
+        "queued": stats.get("requests_queued", 0),
+        "wait_ms_total": wait_ms,
+        "wait_ms_avg": round(wait_ms / requests, 2) if requests else 0.0,
+        "timeouts": stats.get("requests_errors", 0),
+        "connections_opened": stats.get("connections_num", 0),
+        "connections_lost": stats.get("connections_lost", 0),
+    }
+
+
+def alias_report(alias):
+    connection = connections[alias]
+    report = {"alias": alias, "vendor": connection.vendor}
+    pool = get_pool(connection)
+    if pool is None:
+        report["pooled"] = False
+        report["conn_max_age"] = connection.settings_dict.get("CONN_MAX_AGE")
+        return report
+    report["pooled"] = True
+    report.update(summarize(pool.get_stats()))
+    return report
+
+
+def pool_report():
+    return [alias_report(alias) for alias in connections]
+
+
+class PoolLogger:
+    """Rate-limited logging of `pool_report()` for pooled aliases."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last = None
+
+    @property
+    def interval(self):
+        return getattr(settings, "LIBRARY_DB_POOL_LOG_INTERVAL", DEFAULT_LOG_INTERVAL)
+
+    def due(self, now):
+        with self._lock:
+            if self._last is not None and now - self._last < self.interval:
+                return False
+            self._last = now
+            return True
+
+    def log(self, now=None):
+        if self.interval <= 0 or not self.due(now or time.monotonic()):
+            return
+        for report in pool_report():
+            if not report["pooled"]:
+                continue
+            level = logging.WARNING if report["waiting"] else logging.INFO
+            logger.log(
+                level,
+                "db pool %s: in_use=%d idle=%d size=%d/%d waiting=%d "
+                "requests=%d queued=%d wait_ms_avg=%.2f timeouts=%d",
+                report["alias"],
+                report["in_use"],
+                report["idle"],
+                report["size"],
+                report["max_size"],
+                report["waiting"],
+                report["requests"],
+                report["queued"],
+                report["wait_ms_avg"],
+                report["timeouts"],
+            )
+
+    def reset(self):
+        with self._lock:
+            self._last = None
+
+
+pool_logger = PoolLogger()
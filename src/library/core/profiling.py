@@ -0,0 +1,234 @@
+"""
+Opt-in profiling of single requests, for staff.
+
+A request carrying `X-Profile: <mode>` or `?profile=<mode>` from a staff
+user (session or JWT, see `is_staff_user`) runs under cProfile with its SQL
+statements captured:
+
+- `json`: the response is replaced by the profile report.
+- anything else (`1`, `file`...): the report and the raw cProfile stats
+  (`.json` and `.prof`, for pstats/snakeviz) are written to
+  `LIBRARY_PROFILE_DIR`; the response carries `X-Profile-Id`.
+
+Requests without the flag only pay for the header/query lookup, and the flag
+from anyone else is ignored. Streamed bodies are produced after the profile
+ends. One request per process is profiled at a time (others get
+`X-Profile-Id: busy`). Under ASGI the profile of the event loop thread also
+sees other requests' coroutines, and work handed to `sync_to_async` shows up
+as its SQL only.
+"""
+import cProfile
+import json
+import pstats
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from .authentication import CachedJWTAuthentication
+from .metrics import RequestSample, current_sample
+from .permissions import is_staff_user
+from .stamps import state_dir
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_PARAM = "profile"
+INLINE_MODE = "json"
+OFF_MODES = {"", "0", "false", "off"}
+BUSY_PROFILE_ID = "busy"
+
+DEFAULT_TOP_FUNCTIONS = 40
+DEFAULT_TOP_CALLERS = 5
+
+
+def profile_dir():
+    path = getattr(settings, "LIBRARY_PROFILE_DIR", None)
+    return Path(path) if path else state_dir() / "profiles"
+
+
+def get_top_functions():
+    return getattr(settings, "LIBRARY_PROFILE_TOP_FUNCTIONS", DEFAULT_TOP_FUNCTIONS)
+
+
+def requested_mode(request):
+    """The requested profile mode, or None (the only cost of an unflagged request)."""
+    mode = request.headers.get(PROFILE_HEADER) or request.GET.get(PROFILE_PARAM)
+    if mode is None or mode.lower() in OFF_MODES:
+        return None
+    return mode.lower()
+
+
+# ── Staff detection ─────────────────────────────
+
+def staff_from_jwt(request):
+    try:
+        result = CachedJWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and is_staff_user(result[0])
+
+
+async def astaff_from_jwt(request):
+    try:
+        result = await CachedJWTAuthentication().aauthenticate(request)
+    except AuthenticationFailed:
+        return False
+    return result is not None and is_staff_user(result[0])
+
+
+def is_staff_request(request):
+    return is_staff_user(getattr(request, "user", None)) or staff_from_jwt(request)
+
+
+async def ais_staff_request(request):
+    if hasattr(request, "auser") and is_staff_user(await request.auser()):
+        return True
+    return await astaff_from_jwt(request)
+
+
+# ── Report ──────────────────────────────────────
+
+def function_name(function):
+    filename, line, name = function
+    return f"{filename}:{line}({name})" if line else name
+
+
+def function_rows(profiler):
+    """The most expensive functions by cumulative time, with their top callers."""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)
+    report = []
+    for function, (primitive, calls, own, cumulative, callers) in rows[:get_top_functions()]:
+        top_callers = sorted(callers.items(), key=lambda item: item[1][3], reverse=True)
+        report.append({
+            "function": function_name(function),
+            "calls": calls,
+            "primitive_calls": primitive,
+            "own_ms": round(own * 1000, 3),
+            "cumulative_ms": round(cumulative * 1000, 3),
+            "callers": [function_name(caller) for caller, _ in top_callers[:DEFAULT_TOP_CALLERS]],
+        })
+    return report
+
+
+def build_report(profile_id, request, response, duration, sample, profiler):
+    statements = sample.statements
+    return {
+        "id": profile_id,
+        "method": request.method,
+        "path": request.get_full_path(),
+        "status": response.status_code,
+        "duration_ms": round(duration * 1000, 3),
+        "sql": {
+            "count": len(statements),
+            "duration_ms": round(sum(seconds for *_, seconds in statements) * 1000, 3),
+            "statements": [
+                {"alias": alias, "sql": sql, "duration_ms": round(seconds * 1000, 3)}
+                for alias, sql, seconds in statements
+            ],
+        },
+        "functions": function_rows(profiler),
+    }
+
+
+def save_report(profile_id, report, profiler):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(directory / f"{profile_id}.prof")
+    (directory / f"{profile_id}.json").write_text(json.dumps(report, indent=2))
+
+
+# ── Middleware ──────────────────────────────────
+
+class RequestProfile:
+    """One profiled request: cProfile plus the SQL it runs."""
+
+    # cProfile hooks the whole thread; one profiled request at a time keeps
+    # concurrent ones (in threads or on the event loop) from colliding
+    lock = threading.Lock()
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        if not self.lock.acquire(blocking=False):
+            return False
+        self.sample = current_sample.get()
+        self.token = None
+        if self.sample is None:
+            self.sample = RequestSample()
+            self.token = current_sample.set(self.sample)
+        self.sample.statements = []
+        self.started = time.perf_counter()
+        self.profiler.enable()
+        return True
+
+    def stop(self):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self.started
+        if self.token is not None:
+            current_sample.reset(self.token)
+        self.lock.release()
+
+    def finish(self, request, response):
+        report = build_report(
+            self.id, request, response, self.duration, self.sample, self.profiler
+        )
+        self.sample.statements = None
+        if self.mode == INLINE_MODE:
+            return JsonResponse(report, headers={"X-Profile-Id": self.id})
+        save_report(self.id, report, self.profiler)
+        response["X-Profile-Id"] = self.id
+        return response
+
+
+class ProfilerMiddleware:
+    """Profile flagged staff requests (see module docstring); after authentication."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        mode = requested_mode(request)
+        if mode is None or not is_staff_request(request):
+            return self.get_response(request)
+        profile = RequestProfile(mode)
+        if not profile.start():
+            return self.busy(self.get_response(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.stop()
+        return profile.finish(request, response)
+
+    async def __acall__(self, request):
+        mode = requested_mode(request)
+        if mode is None or not await ais_staff_request(request):
+            return await self.get_response(request)
+        profile = RequestProfile(mode)
+        if not profile.start():
+            return self.busy(await self.get_response(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            profile.stop()
+        return profile.finish(request, response)
+
+    @staticmethod
+    def busy(response):
+        response["X-Profile-Id"] = BUSY_PROFILE_ID
+        return response
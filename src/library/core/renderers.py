@@ -0,0 +1,38 @@
+"""
+`JSONRenderer` on orjson, when it is installed.
+
+Output matches DRF's compact JSON byte for byte: UTF-8 rather than `\\u`
+escapes, U+2028/U+2029 escaped, and anything orjson doesn't encode the same
+way (datetimes, lazy strings, Decimal...) handed to DRF's encoder. Values
+orjson refuses (integers beyond 64 bits, say), indented output and
+`UNICODE_JSON`/`COMPACT_JSON` turned off fall back to DRF's renderer. Only
+float exponents are spelled differently (`1e16` rather than `1e+16`); none
+of our payloads has those.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else 0
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact or self.get_indent(
+            accepted_media_type, renderer_context or {}
+        ) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same strict-javascript-subset escaping as DRF
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
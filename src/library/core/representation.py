@@ -0,0 +1,190 @@
+"""
+Compiled `to_representation` for the read-heavy serializers.
+
+DRF's `Serializer.to_representation` re-walks the bound field objects for
+every row: the `_readable_fields` generator, `get_attribute()` with its
+generic source traversal and error handling, then each field's
+`to_representation()`. `CompiledRepresentationMixin` does that walk once per
+serializer class (and set of field-shaping options, such as a sparse
+fieldset) and keeps a plan of `(name, getter, formatter)` per field:
+
+- getter: `attrgetter` for plain model fields, relations and properties;
+  anything else (dotted sources, methods, `*`) keeps `field.get_attribute`,
+  which a fast getter also falls back to if it raises `AttributeError`
+- formatter: `str`/`int` for exactly `CharField`/`IntegerField`, the value
+  itself for `ReadOnlyField`, `str` for `StringRelatedField`, ISO 8601
+  datetimes in the current timezone (looked up once per list or object
+  rather than per value, see `CompiledListSerializer`), otherwise the
+  field's own `to_representation` (nested serializers recurse into their
+  own plan)
+
+Output is identical to DRF's (see test_representation.py). Serializers with
+context-dependent fields (method fields, hyperlinks) keep DRF's path.
+"""
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from operator import attrgetter
+
+from django.conf import settings
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor
+from django.db.models.query_utils import DeferredAttribute
+from django.utils import timezone
+from rest_framework import ISO_8601, fields, relations, serializers
+from rest_framework.fields import SkipField
+from rest_framework.settings import api_settings
+
+# Field types whose `to_representation` is exactly one builtin call
+FAST_FORMATTERS = {
+    fields.CharField: str,
+    fields.IntegerField: int,
+    relations.StringRelatedField: str,
+}
+
+# Fields that read the serializer's context, which a class-level plan lacks
+CONTEXT_FIELDS = (fields.SerializerMethodField, relations.HyperlinkedRelatedField)
+
+# Model class attributes an `attrgetter` reads exactly like `get_attribute()`
+PLAIN_ATTRIBUTES = (DeferredAttribute, ForwardManyToOneDescriptor, property)
+
+
+# Timezone for the datetimes of the list/object being represented
+representation_timezone = ContextVar("representation_timezone", default=None)
+
+
+@contextmanager
+def timezone_scope():
+    """Look the current timezone up once for everything represented inside."""
+    if representation_timezone.get() is not None or not settings.USE_TZ:
+        yield
+        return
+    token = representation_timezone.set(timezone.get_current_timezone())
+    try:
+        yield
+    finally:
+        representation_timezone.reset(token)
+
+
+def identity(value):
+    return value
+
+
+def compile_datetime_formatter(field):
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    if hasattr(field, "timezone") or output_format is None or output_format.lower() != ISO_8601:
+        return field.to_representation
+
+    def formatter(value):
+        tz = representation_timezone.get()
+        if tz is None or isinstance(value, str) or not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        if value.endswith("+00:00"):
+            value = value[:-6] + "Z"
+        return value
+
+    return formatter
+
+
+def compile_getter(field, model):
+    attrs = field.source_attrs
+    if model is None or len(attrs) != 1:
+        return field.get_attribute
+    if not isinstance(getattr(model, attrs[0], None), PLAIN_ATTRIBUTES):
+        return field.get_attribute
+    fast = attrgetter(attrs[0])
+
+    def getter(instance):
+        try:
+            return fast(instance)
+        except AttributeError:
+            # Defaults, allow_null and SkipField exactly as DRF handles them
+            return field.get_attribute(instance)
+
+    return getter
+
+
+def compile_formatter(field):
+    formatter = FAST_FORMATTERS.get(type(field))
+    if formatter is not None:
+        return formatter
+    if type(field) is fields.ReadOnlyField:
+        return identity
+    if type(field) is fields.DateTimeField:
+        return compile_datetime_formatter(field)
+    return field.to_representation
+
+
+def compile_plan(serializer_class, options=None):
+    """`(name, getter, formatter)` per readable field, or None if not compilable."""
+    prototype = serializer_class(**(options or {}))
+    model = getattr(getattr(serializer_class, "Meta", None), "model", None)
+    plan = []
+    for field in prototype._readable_fields:
+        if isinstance(field, CONTEXT_FIELDS):
+            return None
+        if isinstance(field, relations.RelatedField) and field.use_pk_only_optimization():
+            # PKOnlyObject needs DRF's own None check
+            return None
+        if isinstance(field, serializers.BaseSerializer) and not isinstance(
+            field, CompiledRepresentationMixin
+        ):
+            return None
+        plan.append((field.field_name, compile_getter(field, model), compile_formatter(field)))
+    return tuple(plan)
+
+
+def represent(plan, instance):
+    ret = {}
+    for name, getter, formatter in plan:
+        try:
+            attribute = getter(instance)
+        except SkipField:
+            continue
+        ret[name] = None if attribute is None else formatter(attribute)
+    return ret
+
+
+class CompiledListSerializer(serializers.ListSerializer):
+    """`many=True` for compiled serializers: one timezone lookup per list."""
+
+    def to_representation(self, data):
+        with timezone_scope():
+            return super().to_representation(data)
+
+
+class CompiledRepresentationMixin:
+    """
+    Serialize rows from a per-class plan (see module docstring). Set
+    `Meta.list_serializer_class = CompiledListSerializer` as well.
+    Serializers whose fields depend on constructor arguments return those
+    from `representation_options()` and get one plan per distinct set.
+    """
+
+    _plans = {}
+    _plans_lock = threading.Lock()
+
+    def representation_options(self):
+        """Hashable `(kwarg, value)` pairs that shape this instance's fields."""
+        return ()
+
+    def representation_plan(self):
+        key = (type(self), self.representation_options())
+        try:
+            return self._plans[key]
+        except KeyError:
+            pass
+        with self._plans_lock:
+            if key not in self._plans:
+                self._plans[key] = compile_plan(type(self), dict(key[1]))
+        return self._plans[key]
+
+    def to_representation(self, instance):
+        plan = self.representation_plan()
+        if plan is None:
+            return super().to_representation(instance)
+        if representation_timezone.get() is None:
+            # A single object, not a row of a `CompiledListSerializer`
+            with timezone_scope():
+                return represent(plan, instance)
+        return represent(plan, instance)
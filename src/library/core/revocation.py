@@ -0,0 +1,121 @@
+"""
+Refresh-token revocation without a per-refresh blacklist lookup.
+
+`RevokedToken` rows are the source of truth; every process also keeps the
+revoked `jti`s in memory as 64-bit fingerprints, bucketed by the hour the
+token expires so whole buckets can be dropped once they are past. A miss
+is answered from memory; a fingerprint hit is confirmed against the
+database, so a collision can never revoke a valid token.
+
+Revoking bumps the `revocations_version` stamp and other processes load
+just the rows added since their last sync. With rotation on, the final
+authority is the unique `jti` INSERT made when a token is used: replaying
+a rotated token fails it even if a process's memory is momentarily behind.
+"""
+import hashlib
+import threading
+from datetime import datetime, timezone as dt_timezone
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import RevokedToken
+from .stamps import revocations_version
+
+SYNC_CHUNK_SIZE = 10_000
+
+
+def fingerprint(jti):
+    return int.from_bytes(
+        hashlib.blake2b(jti.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+def expiry_hour(expires_at):
+    return int(expires_at.timestamp()) // 3600
+
+
+class RevocationStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = {}  # expiry hour -> set of fingerprints
+        self._version = None
+        self._last_id = 0
+
+    # ── Memory ──────────────────────────────────────
+
+    def _add(self, jti, expires_at):
+        self._buckets.setdefault(expiry_hour(expires_at), set()).add(fingerprint(jti))
+
+    def _maybe_revoked(self, jti, now):
+        current, key = expiry_hour(now), fingerprint(jti)
+        with self._lock:
+            return any(
+                key in bucket for hour, bucket in self._buckets.items() if hour >= current
+            )
+
+    def sync(self, now=None):
+        """Load rows added since the last sync if any process revoked since."""
+        version = revocations_version.get()
+        if version == self._version:
+            return
+        now = now or timezone.now()
+        with self._lock:
+            if version == self._version:
+                return
+            rows = RevokedToken.objects.filter(id__gt=self._last_id, expires_at__gt=now)
+            for pk, jti, expires_at in rows.values_list("id", "jti", "expires_at").iterator(
+                chunk_size=SYNC_CHUNK_SIZE
+            ):
+                self._add(jti, expires_at)
+                self._last_id = max(self._last_id, pk)
+            current = expiry_hour(now)
+            for hour in [hour for hour in self._buckets if hour < current]:
+                del self._buckets[hour]
+            self._version = version
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._version = None
+            self._last_id = 0
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(bucket) for bucket in self._buckets.values())
+
+    # ── API ─────────────────────────────────────────
+
+    def is_revoked(self, jti, now=None):
+        now = now or timezone.now()
+        self.sync(now)
+        if not self._maybe_revoked(jti, now):
+            return False
+        return RevokedToken.objects.filter(jti=jti, expires_at__gt=now).exists()
+
+    def revoke(self, jti, exp):
+        """
+        Revoke `jti` (expiring at the `exp` timestamp). Returns False if it
+        was already revoked, which makes it safe as a use-once check.
+        """
+        expires_at = datetime.fromtimestamp(exp, tz=dt_timezone.utc)
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        with self._lock:
+            self._add(jti, expires_at)
+        revocations_version.bump()
+        transaction.on_commit(revocations_version.bump)
+        return True
+
+    def purge(self, now=None):
+        """Delete rows whose token has expired; returns how many."""
+        deleted, _ = RevokedToken.objects.filter(
+            expires_at__lte=now or timezone.now()
+        ).delete()
+        return deleted
+
+
+revocation_store = RevocationStore()
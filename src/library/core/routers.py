@@ -0,0 +1,170 @@
+"""
+Primary/replica routing with read-your-writes stickiness.
+
+Reads go to a replica only inside a routing scope whose request chose one
+(`ReplicaReadMixin` for the API viewsets, `AsyncAPIView` for the async
+views); everything else, including every write and every read inside a
+`transaction.atomic` block, uses the primary.
+
+A request gets a replica when it is a safe method, replicas are configured
+(`LIBRARY_READ_REPLICAS`) and its user is not pinned. Any write request pins
+its user to the primary for `LIBRARY_REPLICA_PIN_SECONDS`, the longest
+replication lag we expect, so e.g. `my-active` right after a borrow can
+never miss the new loan. The pin is a per-user stamp under
+`LIBRARY_STATE_DIR` (see `core.stamps`), so it holds whichever worker
+process serves the next request. Pins are filed in windows one pin period
+wide; readers look in the current and previous window only, and writers
+delete older windows, so pins never pile up.
+"""
+import os
+import random
+import shutil
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+from .stamps import VersionStamp, catalogue_version, state_dir
+
+DEFAULT_PIN_SECONDS = 5
+PINS_DIR = "replica-pins"
+
+# Replica alias for the current request's reads, or None for the primary
+read_alias = ContextVar("read_alias", default=None)
+
+
+def get_replicas():
+    return list(getattr(settings, "LIBRARY_READ_REPLICAS", ()))
+
+
+def get_pin_seconds():
+    return getattr(settings, "LIBRARY_REPLICA_PIN_SECONDS", DEFAULT_PIN_SECONDS)
+
+
+def pin_window(now=None):
+    """The pin window holding `now`; a pin outlives its window by at most one."""
+    return int((now or time.time()) // max(get_pin_seconds(), 1))
+
+
+def pin_stamp(user, window):
+    return VersionStamp(f"{PINS_DIR}/{window}/{user.pk}")
+
+
+def prune_pins(window):
+    """Delete the windows no reader looks at any more (before the previous one)."""
+    try:
+        entries = list(os.scandir(state_dir() / PINS_DIR))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if not entry.name.isdigit():
+            continue
+        if int(entry.name) < window - 1:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+
+# ── Stickiness ──────────────────────────────────
+
+def pin_to_primary(user):
+    if user is not None and user.is_authenticated and get_replicas():
+        window = pin_window()
+        pin_stamp(user, window).bump()
+        prune_pins(window)
+
+
+def is_pinned(user):
+    if user is None or not user.is_authenticated:
+        return False
+    window = pin_window()
+    for stamp in (pin_stamp(user, window), pin_stamp(user, window - 1)):
+        age = stamp.age()
+        if age is not None and age < get_pin_seconds():
+            return True
+    return False
+
+
+async def ais_pinned(user):
+    # At most two stat()s of local files: cheap enough not to need a thread
+    return is_pinned(user)
+
+
+def choose_replica(pinned):
+    replicas = get_replicas()
+    if pinned or not replicas:
+        return None
+    return random.choice(replicas)
+
+
+# ── Request scope ───────────────────────────────
+
+@contextmanager
+def routing_scope():
+    """Reads go to the primary unless `route_reads()` runs inside this scope."""
+    token = read_alias.set(None)
+    try:
+        yield
+    finally:
+        read_alias.reset(token)
+
+
+def route_reads(request):
+    """Pick where the rest of this (authenticated) request reads from."""
+    if request.method in SAFE_METHODS and get_replicas():
+        read_alias.set(choose_replica(is_pinned(request.user)))
+
+
+async def aroute_reads(request):
+    if request.method in SAFE_METHODS and get_replicas():
+        read_alias.set(choose_replica(await ais_pinned(request.user)))
+
+
+def replica_may_lag():
+    """
+    True if this request reads from a replica and the catalogue changed too
+    recently for the replica to be trusted; responses built now must not be
+    cached under the new catalogue version.
+    """
+    if read_alias.get() is None:
+        return False
+    age = catalogue_version.age()
+    return age is not None and age < get_pin_seconds()
+
+
+class ReplicaReadMixin:
+    """Route a DRF view's safe requests to a replica and pin writers."""
+
+    def dispatch(self, request, *args, **kwargs):
+        with routing_scope():
+            response = super().dispatch(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            pin_to_primary(getattr(self.request, "user", None))
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        route_reads(request)
+
+
+# ── Router ──────────────────────────────────────
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
@@ -0,0 +1,134 @@
+"""
+Pluggable full-text search for the book catalogue.
+
+`get_search_backend()` picks an engine for the active database:
+- PostgreSQL: `tsvector` expression + GIN index, ranked with `ts_rank`
+- SQLite: FTS5 external-content table kept in sync by triggers
+- anything else: the old `icontains` scan
+
+Set `LIBRARY_SEARCH_BACKEND` to a dotted path to force a specific backend.
+All backends search title, author, description and isbn with prefix matching.
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+SEARCH_TERM_RE = re.compile(r"\w+")
+
+# The GIN index built by migration 0003 freezes a copy of this expression;
+# PostgreSQL only uses an expression index if the query repeats it exactly.
+POSTGRES_DOCUMENT = (
+    "to_tsvector('english'::regconfig, "
+    "coalesce(\"core_book\".\"title\", '') || ' ' || "
+    "coalesce(\"core_book\".\"author\", '') || ' ' || "
+    "coalesce(\"core_book\".\"description\", '') || ' ' || "
+    "coalesce(\"core_book\".\"isbn\", ''))"
+)
+POSTGRES_INDEX_NAME = "core_book_search_gin"
+
+SQLITE_FTS_TABLE = "core_book_fts"
+
+
+def search_terms(query):
+    """Split a raw `?search=` value into safe word tokens."""
+    return SEARCH_TERM_RE.findall(query or "")
+
+
+class BaseSearchBackend:
+    """Filters a Book queryset and annotates `search_rank` (higher is better)."""
+
+    ranked = False
+
+    def search(self, queryset, query):
+        raise NotImplementedError
+
+    def no_match(self, queryset):
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).none()
+
+
+class IContainsSearchBackend(BaseSearchBackend):
+    """Sequential-scan fallback for databases without a full-text engine."""
+
+    def search(self, queryset, query):
+        condition = Q()
+        for term in search_terms(query) or [query]:
+            condition &= (
+                Q(title__icontains=term)
+                | Q(author__icontains=term)
+                | Q(description__icontains=term)
+                | Q(isbn__icontains=term)
+            )
+        return queryset.filter(condition)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """`tsvector @@ tsquery` served by the `core_book_search_gin` index."""
+
+    ranked = True
+
+    def build_query(self, terms):
+        return " & ".join(f"{term}:*" for term in terms)
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_match(queryset)
+        tsquery = self.build_query(terms)
+        matches = RawSQL(
+            f"{POSTGRES_DOCUMENT} @@ to_tsquery('english'::regconfig, %s)",
+            [tsquery],
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"ts_rank({POSTGRES_DOCUMENT}, to_tsquery('english'::regconfig, %s))",
+            [tsquery],
+            output_field=FloatField(),
+        )
+        return queryset.filter(matches).annotate(search_rank=rank)
+
+
+class SQLiteFTS5SearchBackend(BaseSearchBackend):
+    """FTS5 `MATCH` over the `core_book_fts` shadow table."""
+
+    ranked = True
+
+    def build_query(self, terms):
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query):
+        terms = search_terms(query)
+        if not terms:
+            return self.no_match(queryset)
+        match = self.build_query(terms)
+        matching_ids = RawSQL(
+            f"SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s",
+            [match],
+        )
+        # bm25() is negative; flip it so that, like ts_rank, higher ranks first
+        rank = RawSQL(
+            f"SELECT -bm25({SQLITE_FTS_TABLE}) FROM {SQLITE_FTS_TABLE} "
+            f"WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid = \"core_book\".\"id\"",
+            [match],
+            output_field=FloatField(),
+        )
+        return queryset.filter(pk__in=matching_ids).annotate(search_rank=rank)
+
+
+VENDOR_BACKENDS = {
+    "postgresql": PostgresSearchBackend,
+    "sqlite": SQLiteFTS5SearchBackend,
+}
+
+
+def get_search_backend():
+    """Return the configured backend, or the best one for the active database."""
+    backend_path = getattr(settings, "LIBRARY_SEARCH_BACKEND", None)
+    if backend_path:
+        return import_string(backend_path)()
+    return VENDOR_BACKENDS.get(connection.vendor, IContainsSearchBackend)()
@@ -0,0 +1,280 @@
+"""
+Deterministic synthetic data for load and scaling tests.
+
+Everything is derived from one `random.Random(seed)`, so the same arguments
+produce the same library. Rows are generated as plain tuples and written in
+chunks, with `COPY ... FROM STDIN` on PostgreSQL and `bulk_create` elsewhere;
+neither path runs `Model.save()` / `full_clean()`, which is what makes
+millions of rows feasible.
+
+The shape is deliberately skewed: book popularity and patron activity both
+follow a Zipf distribution, and loans are a mix of returned, active and
+overdue. Active loans respect the same invariants as the API (one active
+loan per book, at most `MAX_ACTIVE_LOANS` per patron).
+"""
+import bisect
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .circulation import MAX_ACTIVE_LOANS
+from .models import Book, Loan, PatronCirculation
+from .signals import bump_catalogue_version
+
+DEFAULT_SEED = 42
+DEFAULT_BATCH_SIZE = 10_000
+SEED_USERNAME_PREFIX = "patron"
+SEED_PASSWORD = "library-seed"
+
+LOAN_PERIOD = timedelta(days=14)
+HISTORY_DAYS = 730
+# Share of loans that are still out; a third of those are overdue
+ACTIVE_SHARE = 0.08
+OVERDUE_SHARE = 0.03
+ZIPF_EXPONENT = 1.1
+
+BOOK_FIELDS = ("title", "author", "isbn", "description", "created_at", "updated_at")
+USER_FIELDS = (
+    "username", "email", "password", "first_name", "last_name",
+    "is_staff", "is_superuser", "is_active", "date_joined",
+)
+LOAN_FIELDS = ("book_id", "user_id", "borrowed_at", "due_date", "returned_at")
+
+TITLE_WORDS = (
+    "Silent", "Hidden", "Clean", "Deep", "Lost", "Northern", "Paper", "Glass",
+    "River", "Garden", "Machine", "Winter", "Code", "Empire", "Light", "Stone",
+    "Ocean", "Night", "Pattern", "City", "Memory", "Signal", "Forest", "Star",
+)
+FIRST_NAMES = (
+    "Ada", "Alan", "Grace", "Linus", "Ursula", "Frank", "Octavia", "Isaac",
+    "Mary", "Jorge", "Toni", "Haruki", "Chinua", "Zadie", "Italo", "Doris",
+)
+LAST_NAMES = (
+    "Lovelace", "Turing", "Hopper", "Le Guin", "Herbert", "Butler", "Asimov",
+    "Shelley", "Borges", "Morrison", "Murakami", "Achebe", "Smith", "Calvino",
+)
+
+
+def isbn13(body):
+    """ISBN-13 from its first 12 digits."""
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def isbn10(body):
+    """ISBN-10 from its first 9 digits, or None when the check digit is 'X'."""
+    check = (11 - sum(int(d) * (10 - i) for i, d in enumerate(body)) % 11) % 11
+    return None if check == 10 else body + str(check)
+
+
+def make_isbn(number):
+    """
+    A valid, unique ISBN for the `number`-th seeded book. Roughly one in five
+    is an ISBN-10 (lengths differ, so the two ranges never collide).
+    """
+    if number % 5 == 0:
+        isbn = isbn10(f"{number:09d}")
+        if isbn is not None:
+            return isbn
+    return isbn13(f"979{number:09d}")
+
+
+def zipf_cum_weights(n, exponent=ZIPF_EXPONENT):
+    """Cumulative Zipf weights: rank r has weight 1 / r**s."""
+    return list(itertools.accumulate(1 / rank**exponent for rank in range(1, n + 1)))
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class Seeder:
+    """Generates and writes books, patrons and loans for one seed."""
+
+    def __init__(
+        self, seed=DEFAULT_SEED, batch_size=DEFAULT_BATCH_SIZE, using="default", now=None
+    ):
+        self.random = random.Random(seed)
+        self.batch_size = batch_size
+        self.using = using
+        self.connection = connections[using]
+        self.now = now or timezone.now()
+        self.counts = {"books": 0, "users": 0, "loans": 0}
+
+    # ── Writing ─────────────────────────────────────
+
+    def write(self, model, fields, rows):
+        """Insert `rows` (tuples in `fields` order) in chunks; returns the row count."""
+        written = 0
+        for chunk in chunked(rows, self.batch_size):
+            with transaction.atomic(using=self.using):
+                if self.connection.vendor == "postgresql":
+                    self.copy(model, fields, chunk)
+                else:
+                    model.objects.using(self.using).bulk_create(
+                        [model(**dict(zip(fields, row))) for row in chunk],
+                        batch_size=self.batch_size,
+                    )
+            written += len(chunk)
+        return written
+
+    def copy(self, model, fields, rows):
+        quote = self.connection.ops.quote_name
+        columns = ", ".join(quote(model._meta.get_field(name).column) for name in fields)
+        sql = f"COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN"
+        with self.connection.cursor() as cursor:
+            with cursor.cursor.copy(sql) as copy:
+                for row in rows:
+                    copy.write_row(row)
+
+    def new_ids(self, model, after):
+        """Primary keys created since `after` (COPY doesn't return them)."""
+        queryset = model.objects.using(self.using).filter(pk__gt=after).order_by("pk")
+        return list(queryset.values_list("pk", flat=True))
+
+    def max_id(self, model):
+        queryset = model.objects.using(self.using).order_by("-pk")
+        return queryset.values_list("pk", flat=True).first() or 0
+
+    # ── Generators ──────────────────────────────────
+
+    def book_rows(self, count, start):
+        rng, now = self.random, self.now
+        for number in range(start, start + count):
+            words = rng.sample(TITLE_WORDS, rng.randint(1, 3))
+            author = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            title = " ".join(words) + f" {number}"
+            created = now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+            yield (
+                title,
+                author,
+                make_isbn(number),
+                f"A synthetic book about {' and '.join(w.lower() for w in words)}.",
+                created,
+                created,
+            )
+
+    def user_rows(self, count, start):
+        rng, now = self.random, self.now
+        password = make_password(SEED_PASSWORD)
+        for number in range(start, start + count):
+            username = f"{SEED_USERNAME_PREFIX}{number:07d}"
+            joined = now - timedelta(seconds=rng.randrange(HISTORY_DAYS * 86400))
+            yield (
+                username,
+                f"{username}@example.com",
+                password,
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                False,
+                False,
+                True,
+                joined,
+            )
+
+    def loan_rows(self, count, book_ids, user_ids):
+        """
+        Loans over Zipf-ranked books and patrons. A draw that would break an
+        invariant (book already out, patron at the limit) becomes a returned loan.
+        """
+        rng, now = self.random, self.now
+        books = book_ids[:]
+        users = user_ids[:]
+        rng.shuffle(books)  # popularity rank is independent of insertion order
+        rng.shuffle(users)
+        book_weights = zipf_cum_weights(len(books))
+        user_weights = zipf_cum_weights(len(users))
+
+        # Loans already in the database count against the invariants too
+        books_out = set()
+        active_per_user = {}
+        existing = Loan.objects.using(self.using).filter(returned_at__isnull=True)
+        for book, user in existing.values_list("book_id", "user_id").iterator():
+            books_out.add(book)
+            active_per_user[user] = active_per_user.get(user, 0) + 1
+
+        def lendable(book, user):
+            return book not in books_out and active_per_user.get(user, 0) < MAX_ACTIVE_LOANS
+
+        def pick(population, cum_weights):
+            point = rng.random() * cum_weights[-1]
+            return population[min(bisect.bisect(cum_weights, point), len(population) - 1)]
+
+        for _ in range(count):
+            book = pick(books, book_weights)
+            user = pick(users, user_weights)
+            roll = rng.random()
+            can_lend = lendable(book, user)
+            if roll < ACTIVE_SHARE and not can_lend:
+                # Popular books are nearly always out; lend from the long tail
+                book, user = rng.choice(books), rng.choice(users)
+                can_lend = lendable(book, user)
+
+            if roll < OVERDUE_SHARE and can_lend:
+                late = timedelta(seconds=rng.randrange(1, 45 * 86400))
+                borrowed = now - LOAN_PERIOD - late
+                returned = None
+            elif roll < ACTIVE_SHARE and can_lend:
+                age = timedelta(seconds=rng.randrange(1, LOAN_PERIOD.days * 86400))
+                borrowed = now - age
+                returned = None
+            else:
+                age = timedelta(seconds=rng.randrange(1, HISTORY_DAYS * 86400))
+                borrowed = now - LOAN_PERIOD - age
+                # Most come back on time, some a few days late
+                returned = borrowed + timedelta(seconds=rng.randrange(3600, 21 * 86400))
+                returned = min(returned, now)
+
+            if returned is None:
+                books_out.add(book)
+                active_per_user[user] = active_per_user.get(user, 0) + 1
+            yield (book, user, borrowed, borrowed + LOAN_PERIOD, returned)
+
+    # ── Entry points ────────────────────────────────
+
+    def clear(self):
+        """Delete every loan and book, and the patrons a previous seed created."""
+        with transaction.atomic(using=self.using):
+            # Raw deletes: the ORM would load and signal every row
+            quote = self.connection.ops.quote_name
+            with self.connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {quote(Loan._meta.db_table)}")
+                cursor.execute(f"DELETE FROM {quote(Book._meta.db_table)}")
+            User.objects.using(self.using).filter(
+                username__startswith=SEED_USERNAME_PREFIX, is_staff=False
+            ).delete()
+            PatronCirculation.objects.using(self.using).sync()
+            bump_catalogue_version()
+
+    def run(self, books=0, users=0, loans=0):
+        book_start = self.max_id(Book)
+        user_start = self.max_id(User)
+
+        self.counts["books"] = self.write(
+            Book, BOOK_FIELDS, self.book_rows(books, book_start)
+        )
+        self.counts["users"] = self.write(
+            User, USER_FIELDS, self.user_rows(users, user_start)
+        )
+
+        if loans:
+            book_ids = self.new_ids(Book, book_start) or self.new_ids(Book, 0)
+            user_ids = self.new_ids(User, user_start) or self.new_ids(User, 0)
+            if not book_ids or not user_ids:
+                raise ValueError("Loans need at least one book and one user.")
+            self.counts["loans"] = self.write(
+                Loan, LOAN_FIELDS, self.loan_rows(loans, book_ids, user_ids)
+            )
+
+        # Neither bulk_create nor COPY sends post_save, so update the
+        # counters and invalidate the cache here
+        PatronCirculation.objects.using(self.using).sync(batch_size=self.batch_size)
+        bump_catalogue_version()
+        return self.counts
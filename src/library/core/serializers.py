@@ -1,11 +1,20 @@
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from rest_framework import serializers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 
+from .circulation import MAX_BATCH_SIZE
+from .fieldsets import SparseFieldsMixin
+from .metrics import TimedSerializerMixin
 from .models import Book, Loan
+from .representation import (CompiledListSerializer,
+                             CompiledRepresentationMixin)
+from .revocation import revocation_store
 
 
-class RegisterSerializer(serializers.ModelSerializer):
+class RegisterSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     password = serializers.CharField(
         write_only=True,
         required=True,
@@ -36,14 +45,16 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data.pop("password2")
-        user = User.objects.create_user(**validated_data)
-        user.is_staff = False
-        user.is_superuser = False
-        user.save()
-        return user
+        # create_user() leaves is_staff/is_superuser False; no second save
+        return User.objects.create_user(**validated_data)
 
 
-class BookSerializer(serializers.ModelSerializer):
+class BookSerializer(
+    TimedSerializerMixin,
+    SparseFieldsMixin,
+    CompiledRepresentationMixin,
+    serializers.ModelSerializer,
+):
     is_available = serializers.BooleanField(read_only=True)
 
     class Meta:
@@ -59,10 +70,28 @@ class BookSerializer(serializers.ModelSerializer):
             "is_available",
         ]
         read_only_fields = ["id", "created_at", "updated_at", "is_available"]
+        list_serializer_class = CompiledListSerializer
+
+    # The serializer's UniqueValidator already checked the ISBN; the database
+    # catches a duplicate that slips in between (see `ValidatedModel`)
+    def create(self, validated_data):
+        book = Book(**validated_data)
+        book.save(validation="fast")
+        return book
+
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(validation="fast")
+        return instance
 
 
-class LoanCreateSerializer(serializers.ModelSerializer):
-    """Serializer for creating a new loan (borrow action)"""
+class LoanCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    """
+    Serializer for creating a new loan (borrow action).
+
+    Availability is checked under a row lock in `LoanViewSet.perform_create`.
+    """
 
     class Meta:
         model = Loan
@@ -72,18 +101,38 @@ class LoanCreateSerializer(serializers.ModelSerializer):
             "due_date": {"required": True},
         }
 
-    def validate_book(self, value):
-        """Custom validation: book must be available"""
-        if not value.is_available:
-            raise serializers.ValidationError(
-                "This book is currently not available for borrowing."
-            )
-        return value
+
+class LoanBatchItemSerializer(serializers.Serializer):
+    book = serializers.IntegerField(min_value=1)
+    due_date = serializers.DateTimeField()
+
+
+class LoanBatchCreateSerializer(serializers.Serializer):
+    """Body of `POST /api/loans/batch/`"""
+
+    loans = LoanBatchItemSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_SIZE)
 
 
-class LoanDetailSerializer(serializers.ModelSerializer):
+class LoanBatchReturnSerializer(serializers.Serializer):
+    """Body of `PATCH /api/loans/batch-return/`"""
+
+    loans = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE,
+    )
+
+
+class LoanDetailSerializer(
+    TimedSerializerMixin,
+    SparseFieldsMixin,
+    CompiledRepresentationMixin,
+    serializers.ModelSerializer,
+):
     """Full serializer for reading loan details (nested book info)"""
 
+    expandable_fields = {"book": BookSerializer}
+
     book = BookSerializer(read_only=True)
     is_overdue = serializers.BooleanField(read_only=True)
     user = serializers.StringRelatedField(
@@ -102,6 +151,7 @@ class LoanDetailSerializer(serializers.ModelSerializer):
             "is_active",
             "is_overdue",
         ]
+        list_serializer_class = CompiledListSerializer
         read_only_fields = [
             "id",
             "user",
@@ -110,3 +160,26 @@ class LoanDetailSerializer(serializers.ModelSerializer):
             "is_active",
             "is_overdue",
         ]
+
+
+class RevocationTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Refresh that rejects revoked tokens and, with `BLACKLIST_AFTER_ROTATION`,
+    revokes the token it was given so it can't be used again.
+    """
+
+    revoked_message = "Token is blacklisted"
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        jti = refresh[api_settings.JTI_CLAIM]
+        if revocation_store.is_revoked(jti):
+            raise InvalidToken(self.revoked_message)
+
+        data = super().validate(attrs)
+
+        if api_settings.ROTATE_REFRESH_TOKENS and api_settings.BLACKLIST_AFTER_ROTATION:
+            # The unique INSERT also stops two concurrent refreshes of one token
+            if not revocation_store.revoke(jti, refresh["exp"]):
+                raise InvalidToken(self.revoked_message)
+        return data
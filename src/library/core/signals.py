@@ -0,0 +1,92 @@
+from django.contrib.auth.models import User
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import CACHED_USER_FIELDS
+from .metrics import instrument_connection
+from .models import Book, Loan, PatronCirculation
+from .pooling import pool_logger
+from .stamps import catalogue_version, users_version
+
+
+def bump_catalogue_version():
+    """
+    Invalidate cached catalogue responses now and again once the write commits,
+    so a response built from pre-commit state can't outlive the transaction.
+    """
+    catalogue_version.bump()
+    transaction.on_commit(catalogue_version.bump)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Loan)
+@receiver(post_delete, sender=Loan)
+def catalogue_changed(sender, **kwargs):
+    bump_catalogue_version()
+
+
+def bump_users_version():
+    """Drop every process's cached users (see `core.authentication`)."""
+    users_version.bump()
+    transaction.on_commit(users_version.bump)
+
+
+@receiver(pre_save, sender=User)
+def note_cached_user_changes(sender, instance, update_fields=None, **kwargs):
+    """Compare the stored row, so `user_changed` can skip irrelevant saves."""
+    fields = set(CACHED_USER_FIELDS)
+    if update_fields is not None:
+        fields &= set(update_fields)
+    stored = None
+    # A new user can't be cached yet, and logins only write last_login
+    if instance.pk is not None and fields:
+        stored = sender.objects.filter(pk=instance.pk).values(*fields).first()
+    instance._changes_cached_user = stored is not None and any(
+        stored[name] != getattr(instance, name) for name in fields
+    )
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created=False, **kwargs):
+    if not created and getattr(instance, "_changes_cached_user", True):
+        bump_users_version()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, **kwargs):
+    bump_users_version()
+
+
+@receiver(post_save, sender=User)
+def create_patron_circulation(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        PatronCirculation.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Loan)
+def loan_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created and instance.returned_at is None:
+        PatronCirculation.objects.record_borrows(instance.user_id, [instance.due_date])
+    elif not created:
+        PatronCirculation.objects.refresh([instance.user_id])
+
+
+@receiver(post_delete, sender=Loan)
+def loan_deleted(sender, instance, **kwargs):
+    PatronCirculation.objects.refresh([instance.user_id])
+
+
+@receiver(request_finished)
+def log_pool_stats(sender, **kwargs):
+    pool_logger.log()
+
+
+@receiver(connection_created)
+def count_queries(sender, connection, **kwargs):
+    instrument_connection(connection)
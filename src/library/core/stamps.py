@@ -0,0 +1,71 @@
+"""
+Cross-process version stamps.
+
+A stamp is a tiny file under `LIBRARY_STATE_DIR` holding an opaque token.
+Every worker process on the host reads the same file, so bumping it from
+one process invalidates whatever the others derived from the old token,
+without needing an external service.
+"""
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+
+def state_dir():
+    path = getattr(settings, "LIBRARY_STATE_DIR", None)
+    return Path(path) if path else Path(tempfile.gettempdir()) / "library-state"
+
+
+class VersionStamp:
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def path(self):
+        return state_dir() / f"{self.name}.version"
+
+    def get(self):
+        """Current token, or "0" if the stamp has never been bumped."""
+        try:
+            return self.path.read_text() or "0"
+        except FileNotFoundError:
+            return "0"
+
+    def age(self):
+        """Seconds since the last bump, or None if it has never been bumped."""
+        try:
+            return time.time() - self.path.stat().st_mtime
+        except FileNotFoundError:
+            return None
+
+    def modified(self):
+        """When the stamp was last bumped (aware datetime), or None."""
+        try:
+            return datetime.fromtimestamp(self.path.stat().st_mtime, tz=timezone.utc)
+        except FileNotFoundError:
+            return None
+
+    def bump(self):
+        """Replace the token atomically so readers never see a partial write."""
+        path = self.path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        token = uuid.uuid4().hex
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "w") as handle:
+                handle.write(token)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return token
+
+
+catalogue_version = VersionStamp("catalogue")
+users_version = VersionStamp("users")
+revocations_version = VersionStamp("revocations")
@@ -0,0 +1,177 @@
+"""
+Multi-threaded stress test of the borrow path on one hot book.
+
+Each round, `threads` patrons POST to `LoanViewSet.create` for the same book
+at the same instant (a barrier releases them together), then the winner's
+loan is returned before the next round. Every thread has its own database
+connection, so the race happens in the database, as between web workers.
+
+The report covers throughput, latency, the mix of outcomes (HTTP statuses,
+or the exception class for anything the view let escape) and lock wait:
+time spent in the statements that block on other transactions' locks
+(`BEGIN IMMEDIATE` on SQLite, `SELECT ... FOR UPDATE` and the loan INSERT
+behind the partial unique index on PostgreSQL). A correct run has exactly
+one 201 per round, and no 5xx or exceptions.
+"""
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from .circulation import return_many
+from .loadtest import percentile
+from .models import Book, Loan
+from .views import LoanViewSet
+
+PATRON_PREFIX = "stress-patron-"
+
+
+def is_lock_statement(sql):
+    sql = sql.lstrip().upper()
+    return sql.startswith("BEGIN") or " FOR UPDATE" in sql or (
+        sql.startswith("INSERT") and '"CORE_LOAN"' in sql
+    )
+
+
+class LockTimer:
+    """Execute wrapper adding up the time spent in lock-taking statements."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if not is_lock_statement(sql):
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+class BorrowStress:
+    def __init__(self, threads, rounds):
+        self.threads = threads
+        self.rounds = rounds
+        self.factory = APIRequestFactory()
+        self.view = LoanViewSet.as_view({"post": "create"})
+        # Marks everything this run creates; teardown deletes nothing else
+        self.run_id = uuid.uuid4()
+        self.book = None
+        self.patrons = []
+
+    # ── Fixtures ────────────────────────────────
+
+    def setup(self):
+        """A new hot book and patrons, never existing catalogue books or users."""
+        self.book = Book.objects.create(
+            isbn=f"979{self.run_id.int % 10**10:010d}",
+            title=f"Stress test {self.run_id.hex[:8]}",
+            author="Load",
+        )
+        User = get_user_model()
+        for index in range(self.threads):
+            self.patrons.append(
+                User.objects.create(username=f"{PATRON_PREFIX}{self.run_id.hex[:8]}-{index}")
+            )
+
+    def release_book(self):
+        """Return whatever loan holds the hot book (between rounds)."""
+        with transaction.atomic():
+            loans = Loan.objects.active().filter(book=self.book)
+            return_many(loans, list(loans.values_list("pk", flat=True)))
+
+    def teardown(self):
+        """Delete this run's loans, book and patrons (whatever setup got to)."""
+        # The book and patrons are new, so every loan of either is this run's
+        Loan.objects.filter(user__in=self.patrons).delete()
+        if self.book is not None:
+            Loan.objects.filter(book=self.book).delete()
+            self.book.delete()
+            self.book = None
+        for patron in self.patrons:
+            patron.delete()
+        self.patrons = []
+
+    # ── Run ─────────────────────────────────────
+
+    def borrow(self, patron):
+        request = self.factory.post(
+            "/api/loans/",
+            {"book": self.book.pk, "due_date": (timezone.now() + timedelta(days=14)).isoformat()},
+            format="json",
+        )
+        force_authenticate(request, user=patron)
+        try:
+            return str(self.view(request).status_code)
+        except Exception as exc:
+            return type(exc).__name__
+
+    def worker(self, patron, barrier, results):
+        timer = LockTimer()
+        try:
+            with connection.execute_wrapper(timer):
+                for round_number in range(self.rounds):
+                    barrier.wait()
+                    lock_before = timer.seconds
+                    started = time.perf_counter()
+                    outcome = self.borrow(patron)
+                    results.append((
+                        round_number,
+                        outcome,
+                        time.perf_counter() - started,
+                        timer.seconds - lock_before,
+                    ))
+        except threading.BrokenBarrierError:
+            pass
+        finally:
+            connection.close()
+
+    def run(self):
+        self.setup()
+        results = []
+        # The last thread to arrive returns the previous round's loan, then all go
+        barrier = threading.Barrier(self.threads, action=self.release_book)
+        workers = [
+            threading.Thread(target=self.worker, args=(patron, barrier, results))
+            for patron in self.patrons
+        ]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        self.release_book()
+        return self.report(results, elapsed)
+
+    def report(self, results, elapsed):
+        outcomes = Counter(outcome for _, outcome, _, _ in results)
+        winners = Counter(number for number, outcome, _, _ in results if outcome == "201")
+        latencies = sorted(latency for _, _, latency, _ in results)
+        waits = sorted(wait for _, _, _, wait in results)
+        return {
+            "vendor": connection.vendor,
+            "threads": self.threads,
+            "rounds": self.rounds,
+            "requests": len(results),
+            "elapsed_s": round(elapsed, 3),
+            "rps": round(len(results) / elapsed, 1) if elapsed else 0.0,
+            "outcomes": dict(sorted(outcomes.items())),
+            # Should be `rounds` and 0: one loan per round, never two
+            "rounds_won": len(winners),
+            "double_borrows": sum(1 for count in winners.values() if count > 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+            "lock_wait_mean_ms": round(statistics.fmean(waits) * 1000, 2) if waits else 0.0,
+            "lock_wait_p95_ms": round(percentile(waits, 0.95) * 1000, 2),
+            "lock_wait_max_ms": round(waits[-1] * 1000, 2) if waits else 0.0,
+        }
@@ -0,0 +1,37 @@
+import copy
+import pytest
+from django.core.cache import caches
+from core.authentication import user_cache
+from core.metrics import registry
+from core.revocation import revocation_store
+
+
+@pytest.fixture(scope="session")
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix):
+    """
+    A second alias, "replica", mirroring the test database. Routing to it is
+    off unless a test sets `LIBRARY_READ_REPLICAS` (see test_replicas.py).
+    """
+    from django.conf import settings
+
+    replica = copy.deepcopy(settings.DATABASES["default"])
+    replica["TEST"] = {**replica.get("TEST", {}), "MIRROR": "default"}
+    settings.DATABASES.setdefault("replica", replica)
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(settings, tmp_path):
+    """Give each test its own version stamps and empty caches."""
+    settings.LIBRARY_STATE_DIR = tmp_path / "state"
+    for cache in caches.all():
+        cache.clear()
+    # Test rollbacks can reuse user ids, which a real database never does
+    user_cache.clear()
+    revocation_store.clear()
+    registry.clear()
+    yield
+    for cache in caches.all():
+        cache.clear()
+    user_cache.clear()
+    revocation_store.clear()
+    registry.clear()
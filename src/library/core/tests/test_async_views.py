@@ -0,0 +1,172 @@
+import pytest
+from asgiref.sync import async_to_sync
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.async_views import AsyncBookView, AsyncMeView, AsyncMyActiveLoansView
+from core.models import Book, Loan
+from core.views import MeView
+
+
+def token_for(user):
+    return str(RefreshToken.for_user(user).access_token)
+
+
+def sync_get(path, user=None, **headers):
+    if user is not None:
+        headers["Authorization"] = f"Bearer {token_for(user)}"
+    return APIClient(headers=headers).get(path)
+
+
+def async_request(method, path, user=None, data=None, **headers):
+    """Run one request through the ASGI handler (and so `urls_async`)."""
+    if user is not None:
+        headers["Authorization"] = f"Bearer {token_for(user)}"
+    kwargs = {"headers": headers}
+    if data is not None:
+        kwargs.update(data=data, content_type="application/json")
+    # async_to_sync keeps the ORM on this thread's connection and test transaction
+    return async_to_sync(getattr(AsyncClient(), method))(path, **kwargs)
+
+
+def async_get(path, user=None, **headers):
+    return async_request("get", path, user, **headers)
+
+
+@pytest.fixture
+def books():
+    return [
+        Book.objects.create(title=f"Book {i:02}", author="Author", isbn=f"{i:013}")
+        for i in range(1, 26)
+    ]
+
+
+@pytest.fixture
+def reader(books):
+    user = User.objects.create_user("reader", email="r@example.com", password="pass")
+    Loan.objects.create(user=user, book=books[0], due_date=timezone.now() + timedelta(days=7))
+    return user
+
+
+@pytest.fixture
+def staff():
+    return User.objects.create_user("staff", password="pass", is_staff=True)
+
+
+@pytest.mark.django_db
+class TestAsyncRouting:
+    @pytest.mark.parametrize(
+        "path,view_class",
+        [
+            ("/api/me/", AsyncMeView),
+            ("/api/books/", AsyncBookView),
+            ("/api/books/{id}/", AsyncBookView),
+            ("/api/loans/my-active/", AsyncMyActiveLoansView),
+        ],
+    )
+    def test_asgi_requests_use_async_views(self, books, reader, path, view_class):
+        response = async_get(path.format(id=books[0].id), reader)
+        assert response.status_code == 200
+        assert response.resolver_match.func.view_class is view_class
+
+    def test_wsgi_requests_keep_sync_views(self, reader):
+        response = sync_get("/api/me/", reader)
+        assert response.status_code == 200
+        assert response.resolver_match.func.view_class is MeView
+
+    def test_book_actions_still_route_to_the_viewset(self, books):
+        response = async_get("/api/books/export/")
+        assert response.status_code == 200
+        assert response["Content-Type"].startswith("application/x-ndjson")
+
+    def test_writes_fall_back_to_sync_views(self, staff):
+        payload = {"title": "New", "author": "Someone", "isbn": "9780000000001"}
+        response = async_request("post", "/api/books/", staff, data=payload)
+        assert response.status_code == 201
+        assert Book.objects.filter(isbn="9780000000001").exists()
+
+
+@pytest.mark.django_db
+class TestAsyncParity:
+    @pytest.mark.parametrize(
+        "path",
+        [
+            "/api/me/",
+            "/api/books/",
+            "/api/books/?ordering=-title&count=exact",
+            "/api/books/?available=true",
+            "/api/books/?search=book",
+            "/api/books/{id}/",
+            "/api/books/999999/",
+            "/api/loans/my-active/",
+        ],
+    )
+    def test_same_status_and_body(self, books, reader, path):
+        path = path.format(id=books[0].id)
+        expected = sync_get(path, reader)
+        # Drop the cached copy the sync request left behind
+        cache.clear()
+        actual = async_get(path, reader)
+        assert actual.status_code == expected.status_code
+        assert actual["Content-Type"] == expected["Content-Type"]
+        assert actual.json() == expected.json()
+
+    def test_cursor_pages_match(self, books):
+        sync_page = sync_get("/api/books/").json()
+        async_page = async_get("/api/books/").json()
+        assert async_page == sync_page
+        next_path = async_page["next"].replace("http://testserver", "")
+        assert async_get(next_path).json() == sync_get(next_path).json()
+
+    @pytest.mark.parametrize("path", ["/api/me/", "/api/loans/my-active/"])
+    def test_anonymous_is_rejected_with_auth_header(self, path):
+        expected = sync_get(path)
+        actual = async_get(path)
+        assert actual.status_code == expected.status_code == 401
+        assert actual["WWW-Authenticate"] == expected["WWW-Authenticate"]
+        assert actual.json() == expected.json()
+
+    def test_invalid_token_is_rejected_on_public_list(self, books):
+        expected = sync_get("/api/books/", Authorization="Bearer nonsense")
+        actual = async_get("/api/books/", Authorization="Bearer nonsense")
+        assert actual.status_code == expected.status_code == 401
+        assert actual.json() == expected.json()
+
+    def test_inactive_user_is_rejected(self, reader):
+        reader.is_active = False
+        reader.save()
+        assert async_get("/api/me/", reader).status_code == 401
+
+
+@pytest.mark.django_db
+class TestAsyncBookCaching:
+    def test_cache_and_conditional_get(self, books):
+        first = async_get("/api/books/")
+        assert first["X-Cache"] == "MISS"
+        assert first["ETag"].startswith('"')
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = async_get("/api/books/")
+        assert second["X-Cache"] == "HIT"
+        assert len(ctx.captured_queries) == 0
+        assert second.json() == first.json()
+
+        assert async_get("/api/books/", **{"If-None-Match": first["ETag"]}).status_code == 304
+
+    def test_sync_and_async_share_the_cache(self, books):
+        sync_get(f"/api/books/{books[0].id}/")
+        assert async_get(f"/api/books/{books[0].id}/")["X-Cache"] == "HIT"
+
+    def test_my_active_query_count(self, reader):
+        async_get("/api/me/", reader)  # warm the user cache
+        with CaptureQueriesContext(connection) as ctx:
+            response = async_get("/api/loans/my-active/", reader)
+        assert len(response.json()) == 1
+        # Loans with their user, then the books with availability
+        assert len(ctx.captured_queries) == 2
@@ -0,0 +1,103 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.authentication import user_cache, user_cache_stats
+
+
+def bearer(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}"
+    )
+    return client
+
+
+@pytest.fixture
+def reader():
+    return User.objects.create_user("reader", password="pass")
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    def test_second_request_skips_the_user_query(self, reader):
+        client = bearer(reader)
+        assert client.get("/api/me/").status_code == 200
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get("/api/me/")
+        assert response.status_code == 200
+        assert response.data["username"] == "reader"
+        assert len(ctx.captured_queries) == 0
+
+    def test_each_request_gets_its_own_copy(self, reader):
+        bearer(reader).get("/api/me/")
+        # Keyed on the token's user_id claim, which simplejwt stores as a string
+        first, _ = user_cache.get(str(reader.pk))
+        first.username = "mutated"
+        second, _ = user_cache.get(str(reader.pk))
+        assert second.username == "reader"
+
+    def test_staff_change_applies_on_next_request(self, reader):
+        client = bearer(reader)
+        assert client.get("/api/me/").data["is_staff"] is False
+        reader.is_staff = True
+        reader.save()
+        assert client.get("/api/me/").data["is_staff"] is True
+
+    def test_deactivated_user_is_rejected_immediately(self, reader):
+        client = bearer(reader)
+        assert client.get("/api/me/").status_code == 200
+        reader.is_active = False
+        reader.save()
+        assert client.get("/api/me/").status_code == 401
+
+    def test_password_change_invalidates_with_revoke_check(self, reader, monkeypatch):
+        monkeypatch.setattr(api_settings, "CHECK_REVOKE_TOKEN", True)
+        client = bearer(reader)
+        assert client.get("/api/me/").status_code == 200
+        assert client.get("/api/me/").status_code == 200  # served from cache
+        reader.set_password("a-new-password")
+        reader.save()
+        assert client.get("/api/me/").status_code == 401
+
+    def test_last_login_update_keeps_the_cache(self, reader):
+        bearer(reader).get("/api/me/")
+        reader.save(update_fields=["last_login"])
+        user_cache_stats.reset()
+        bearer(reader).get("/api/me/")
+        assert user_cache_stats.snapshot() == {"hits": 1, "misses": 0}
+
+    def test_saves_that_change_no_cached_field_keep_the_cache(self, reader):
+        bearer(reader).get("/api/me/")
+        reader.first_name = "Ada"
+        reader.save()
+        response = APIClient().post(
+            "/api/register/",
+            {
+                "username": "newcomer",
+                "email": "newcomer@example.com",
+                "password": "a-long-password-1",
+                "password2": "a-long-password-1",
+            },
+        )
+        assert response.status_code == 201
+        assert not User.objects.get(username="newcomer").is_staff
+        user_cache_stats.reset()
+        bearer(reader).get("/api/me/")
+        assert user_cache_stats.snapshot() == {"hits": 1, "misses": 0}
+
+    def test_ttl_and_size_bound_the_cache(self, reader, settings):
+        other = User.objects.create_user("other", password="pass")
+        settings.LIBRARY_AUTH_USER_CACHE_SIZE = 1
+        bearer(reader).get("/api/me/")
+        bearer(other).get("/api/me/")
+        assert len(user_cache) == 1
+        assert user_cache.get(str(reader.pk))[0] is None
+
+        settings.LIBRARY_AUTH_USER_CACHE_TTL = 0
+        user_cache.clear()
+        bearer(reader).get("/api/me/")
+        assert len(user_cache) == 0
@@ -0,0 +1,170 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Book, Loan
+
+
+def due(days=14):
+    return (timezone.now() + timedelta(days=days)).isoformat()
+
+
+@pytest.fixture
+def reader():
+    user = User.objects.create_user("reader", password="pass")
+    client = APIClient()
+    client.force_authenticate(user)
+    return user, client
+
+
+@pytest.fixture
+def books():
+    return [
+        Book.objects.create(title=f"Book {i}", author="Author", isbn=f"978{i:010d}")
+        for i in range(8)
+    ]
+
+
+def active_loan(user, book, **extra):
+    return Loan.objects.create(
+        user=user, book=book, due_date=timezone.now() + timedelta(days=7), **extra
+    )
+
+
+@pytest.mark.django_db
+class TestBatchBorrow:
+    def test_borrows_all_in_a_fixed_number_of_queries(self, reader, books):
+        user, client = reader
+        body = {"loans": [{"book": book.id, "due_date": due()} for book in books[:3]]}
+        with CaptureQueriesContext(connection) as small:
+            response = client.post("/api/loans/batch/", body, format="json")
+        assert response.status_code == 201
+        assert response.data["created"] == 3
+        assert all(r["loan"]["book"]["is_available"] is False for r in response.data["results"])
+        assert Loan.objects.filter(user=user, returned_at__isnull=True).count() == 3
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", password="pass"))
+        body = {"loans": [{"book": book.id, "due_date": due()} for book in books[3:8]]}
+        with CaptureQueriesContext(connection) as large:
+            other.post("/api/loans/batch/", body, format="json")
+        assert len(small.captured_queries) == len(large.captured_queries)
+
+    def test_reports_per_item_errors(self, reader, books):
+        user, client = reader
+        active_loan(User.objects.create_user("other", password="pass"), books[0])
+        body = {
+            "loans": [
+                {"book": books[0].id, "due_date": due()},
+                {"book": books[1].id, "due_date": due()},
+                {"book": books[1].id, "due_date": due()},
+                {"book": 9999, "due_date": due()},
+                {"book": books[2].id, "due_date": due(days=-1)},
+            ]
+        }
+        response = client.post("/api/loans/batch/", body, format="json")
+        assert response.status_code == 201
+        statuses = [(r["status"], sorted(r.get("errors", {}))) for r in response.data["results"]]
+        assert statuses == [
+            ("error", ["book"]),
+            ("created", []),
+            ("error", ["book"]),
+            ("error", ["book"]),
+            ("error", ["due_date"]),
+        ]
+
+    def test_max_loans_applies_across_the_batch(self, reader, books):
+        user, client = reader
+        for book in books[:3]:
+            active_loan(user, book)
+        body = {"loans": [{"book": book.id, "due_date": due()} for book in books[3:6]]}
+        response = client.post("/api/loans/batch/", body, format="json")
+        assert [r["status"] for r in response.data["results"]] == ["created", "created", "error"]
+        assert "5" in str(response.data["results"][2]["errors"])
+
+    def test_overdue_blocks_whole_batch(self, reader, books):
+        user, client = reader
+        Loan.objects.create(
+            user=user,
+            book=books[0],
+            borrowed_at=timezone.now() - timedelta(days=10),
+            due_date=timezone.now() - timedelta(days=1),
+        )
+        body = {"loans": [{"book": books[1].id, "due_date": due()}]}
+        response = client.post("/api/loans/batch/", body, format="json")
+        assert response.status_code == 400
+        assert "overdue" in str(response.data).lower()
+        assert not Loan.objects.filter(book=books[1]).exists()
+
+    def test_rejects_empty_batch(self, reader):
+        _, client = reader
+        response = client.post("/api/loans/batch/", {"loans": []}, format="json")
+        assert response.status_code == 400
+
+    def test_losing_a_race_to_a_single_borrow_is_a_conflict(self, reader, books, monkeypatch):
+        user, client = reader
+        other = User.objects.create_user("other", password="pass")
+        bulk_create = Loan.objects.bulk_create
+
+        def single_borrow_commits_first(loans, *args, **kwargs):
+            # The single borrow path doesn't lock the book row the batch locked
+            active_loan(other, books[1])
+            return bulk_create(loans, *args, **kwargs)
+
+        monkeypatch.setattr(Loan.objects, "bulk_create", single_borrow_commits_first)
+        body = {"loans": [{"book": book.id, "due_date": due()} for book in books[:2]]}
+        response = client.post("/api/loans/batch/", body, format="json")
+        assert response.status_code == 409
+        assert not Loan.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db
+class TestBatchReturn:
+    def test_returns_with_a_single_update(self, reader, books):
+        user, client = reader
+        loans = [active_loan(user, book) for book in books[:3]]
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.patch(
+                "/api/loans/batch-return/", {"loans": [loan.id for loan in loans]}, format="json"
+            )
+        assert response.status_code == 200
+        assert response.data["returned"] == 3
+        assert all(r["loan"]["book"]["is_available"] for r in response.data["results"])
+        updates = [q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "core_loan"')]
+        assert len(updates) == 1
+        assert not Loan.objects.filter(returned_at__isnull=True).exists()
+        assert user.circulation.active_loans == 0
+
+    def test_reports_missing_foreign_and_returned_loans(self, reader, books):
+        user, client = reader
+        mine = active_loan(user, books[0])
+        returned = active_loan(user, books[1])
+        returned.returned_at = timezone.now()
+        returned.save()
+        theirs = active_loan(User.objects.create_user("other", password="pass"), books[2])
+
+        response = client.patch(
+            "/api/loans/batch-return/",
+            {"loans": [mine.id, returned.id, theirs.id, 9999]},
+            format="json",
+        )
+        assert [r["status"] for r in response.data["results"]] == [
+            "returned",
+            "error",
+            "error",
+            "error",
+        ]
+        theirs.refresh_from_db()
+        assert theirs.returned_at is None
+
+    def test_staff_can_return_anyones_loans(self, books):
+        loan = active_loan(User.objects.create_user("other", password="pass"), books[0])
+        staff = APIClient()
+        staff.force_authenticate(
+            User.objects.create_user("staff", password="pass", is_staff=True)
+        )
+        response = staff.patch("/api/loans/batch-return/", {"loans": [loan.id]}, format="json")
+        assert response.data["returned"] == 1
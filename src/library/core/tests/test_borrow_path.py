@@ -0,0 +1,116 @@
+import statistics
+import time
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Book, Loan
+
+
+def due(days=14):
+    return (timezone.now() + timedelta(days=days)).isoformat()
+
+
+def borrow(client, book, **extra):
+    return client.post("/api/loans/", {"book": book.id, "due_date": due(), **extra})
+
+
+@pytest.fixture
+def reader():
+    user = User.objects.create_user("reader", password="pass")
+    client = APIClient()
+    client.force_authenticate(user)
+    return user, client
+
+
+def make_books(count):
+    return [
+        Book.objects.create(title=f"Book {i}", author="Author", isbn=f"978{i:010d}")
+        for i in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestSingleRoundTripBorrow:
+    def test_rule_checks_take_one_query(self, reader):
+        _, client = reader
+        (book,) = make_books(1)
+        with CaptureQueriesContext(connection) as ctx:
+            response = borrow(client, book)
+        assert response.status_code == 201
+        assert response.data["book"]["is_available"] is False
+        statements = [
+            query["sql"].split()[0].upper() for query in ctx.captured_queries
+        ]
+        # book lookup, then the locked rule query and the INSERT
+        assert statements.count("SELECT") == 2
+        assert statements.count("INSERT") == 1
+
+    def test_unavailable_book_is_a_field_error(self, reader):
+        _, client = reader
+        (book,) = make_books(1)
+        Loan.objects.create(
+            user=User.objects.create_user("other", password="pass"),
+            book=book,
+            due_date=timezone.now() + timedelta(days=7),
+        )
+        response = borrow(client, book)
+        assert response.status_code == 400
+        assert response.data["book"] == [
+            "This book is currently not available for borrowing."
+        ]
+
+    def test_past_due_date_is_a_field_error(self, reader):
+        _, client = reader
+        (book,) = make_books(1)
+        response = client.post(
+            "/api/loans/", {"book": book.id, "due_date": due(days=-1)}
+        )
+        assert response.status_code == 400
+        assert "due_date" in response.data
+
+    def test_overdue_takes_precedence_over_limit(self, reader):
+        user, client = reader
+        books = make_books(6)
+        for book in books[:5]:
+            Loan.objects.create(
+                user=user,
+                book=book,
+                borrowed_at=timezone.now() - timedelta(days=10),
+                due_date=timezone.now() - timedelta(days=1),
+            )
+        response = borrow(client, books[5])
+        assert response.status_code == 400
+        assert "overdue" in str(response.data["detail"]).lower()
+
+
+@pytest.mark.django_db
+def test_borrow_benchmark(reader, capsys):
+    """Query count and p50/p99 latency of POST /api/loans/ (run with -s to see it)."""
+    books = make_books(200)
+    clients = []
+    for user in User.objects.bulk_create(User(username=f"bench{i}") for i in range(40)):
+        client = APIClient()
+        client.force_authenticate(user)
+        clients.append(client)
+
+    timings, query_counts = [], []
+    for i, book in enumerate(books):
+        client = clients[i % len(clients)]
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = borrow(client, book)
+            timings.append(time.perf_counter() - start)
+        assert response.status_code == 201, response.data
+        query_counts.append(len(ctx.captured_queries))
+
+    timings.sort()
+    p50 = statistics.median(timings) * 1000
+    p99 = timings[int(len(timings) * 0.99) - 1] * 1000
+    with capsys.disabled():
+        print(
+            f"\nborrow: queries={max(query_counts)} p50={p50:.2f}ms p99={p99:.2f}ms"
+        )
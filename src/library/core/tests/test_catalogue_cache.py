@@ -0,0 +1,93 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.caching import catalogue_cache_stats
+from core.models import Book, Loan
+from core.stamps import catalogue_version
+
+
+@pytest.fixture
+def book():
+    return Book.objects.create(title="Dune", author="Frank Herbert", isbn="0441013597")
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    catalogue_cache_stats.reset()
+
+
+@pytest.mark.django_db
+class TestCatalogueCache:
+    def test_second_read_is_served_without_queries(self, book):
+        client = APIClient()
+        first = client.get("/api/books/")
+        assert first["X-Cache"] == "MISS"
+
+        with CaptureQueriesContext(connection) as ctx:
+            second = client.get("/api/books/")
+        assert second["X-Cache"] == "HIT"
+        assert len(ctx.captured_queries) == 0
+        assert second.json() == first.json()
+        assert catalogue_cache_stats.snapshot() == {"hits": 1, "misses": 1}
+
+    def test_key_depends_on_query_params(self, book):
+        client = APIClient()
+        client.get("/api/books/", {"ordering": "title"})
+        assert client.get("/api/books/", {"ordering": "-title"})["X-Cache"] == "MISS"
+        assert client.get("/api/books/", {"ordering": "title"})["X-Cache"] == "HIT"
+
+    def test_detail_is_cached_per_book(self, book):
+        other = Book.objects.create(title="Emma", author="Austen", isbn="9780141439587")
+        client = APIClient()
+        client.get(f"/api/books/{book.id}/")
+        response = client.get(f"/api/books/{other.id}/")
+        assert response["X-Cache"] == "MISS"
+        assert response.data["title"] == "Emma"
+
+    def test_book_update_invalidates(self, book):
+        client = APIClient()
+        client.get(f"/api/books/{book.id}/")
+        book.title = "Dune Messiah"
+        book.save()
+        response = client.get(f"/api/books/{book.id}/")
+        assert response["X-Cache"] == "MISS"
+        assert response.data["title"] == "Dune Messiah"
+
+    def test_loan_create_and_return_invalidate(self, book):
+        client = APIClient()
+        user = User.objects.create_user("reader", password="pass")
+        client.get("/api/books/")
+
+        version = catalogue_version.get()
+        loan = Loan.objects.create(
+            user=user, book=book, due_date=timezone.now() + timedelta(days=7)
+        )
+        assert catalogue_version.get() != version
+        assert client.get("/api/books/").data["results"][0]["is_available"] is False
+
+        loan.returned_at = timezone.now()
+        loan.save()
+        assert client.get("/api/books/").data["results"][0]["is_available"] is True
+
+    def test_bulk_import_invalidates(self, book):
+        staff = User.objects.create_user("staff", password="pass", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        client.get("/api/books/")
+        client.generic(
+            "POST",
+            "/api/books/bulk/",
+            "title,author,isbn\nEmma,Austen,9780141439587\n",
+            content_type="text/csv",
+        )
+        assert len(client.get("/api/books/").data["results"]) == 2
+
+    def test_errors_are_not_cached(self):
+        client = APIClient()
+        client.get("/api/books/999/")
+        assert client.get("/api/books/999/").status_code == 404
+        assert catalogue_cache_stats.snapshot() == {"hits": 0, "misses": 2}
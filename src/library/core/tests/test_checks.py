@@ -0,0 +1,17 @@
+import pytest
+from core.checks import check_shared_state_dir
+
+
+@pytest.mark.parametrize("overrides, errors", [
+    ({}, []),
+    ({"LIBRARY_READ_REPLICAS": ["replica1"]}, ["core.E001"]),
+    ({"LIBRARY_MULTI_HOST": True}, ["core.E001"]),
+    ({"LIBRARY_MULTI_HOST": True, "LIBRARY_STATE_DIR": "/srv/library-state"}, []),
+])
+def test_shared_state_dir(settings, overrides, errors):
+    settings.LIBRARY_STATE_DIR = None
+    settings.LIBRARY_READ_REPLICAS = []
+    settings.LIBRARY_MULTI_HOST = False
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    assert [error.id for error in check_shared_state_dir(None)] == errors
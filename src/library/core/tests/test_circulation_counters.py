@@ -0,0 +1,138 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Book, Loan, PatronCirculation
+
+
+def due(days=14):
+    return (timezone.now() + timedelta(days=days)).isoformat()
+
+
+def state(user):
+    row = PatronCirculation.objects.get(user=user)
+    return row.active_loans, row.earliest_due
+
+
+@pytest.fixture
+def reader():
+    user = User.objects.create_user("reader", password="pass")
+    client = APIClient()
+    client.force_authenticate(user)
+    return user, client
+
+
+@pytest.fixture
+def books():
+    return [
+        Book.objects.create(title=f"Book {i}", author="Author", isbn=f"978{i:010d}")
+        for i in range(6)
+    ]
+
+
+@pytest.mark.django_db
+class TestPatronCirculation:
+    def test_counters_follow_borrows_and_returns(self, reader, books):
+        user, client = reader
+        assert state(user) == (0, None)
+
+        first = client.post("/api/loans/", {"book": books[0].id, "due_date": due(20)})
+        client.post("/api/loans/", {"book": books[1].id, "due_date": due(10)})
+        client.post(
+            "/api/loans/batch/",
+            {"loans": [{"book": books[2].id, "due_date": due(5)}]},
+            format="json",
+        )
+        active = Loan.objects.filter(user=user, returned_at__isnull=True)
+        assert state(user) == (3, active.get(book=books[2]).due_date)
+
+        batch = list(active.filter(book__in=books[1:3]).values_list("id", flat=True))
+        client.patch("/api/loans/batch-return/", {"loans": batch}, format="json")
+        assert state(user) == (1, active.get().due_date)
+
+        client.patch(f"/api/loans/{first.data['id']}/return/")
+        assert state(user) == (0, None)
+
+    def test_borrow_rules_read_the_counter_row_not_loan_history(self, reader, books):
+        user, client = reader
+        old = timezone.now() - timedelta(days=60)
+        Loan.objects.bulk_create(
+            Loan(
+                user=user,
+                book=books[5],
+                borrowed_at=old,
+                due_date=old + timedelta(days=14),
+                returned_at=old + timedelta(days=7),
+            )
+            for _ in range(50)
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.post("/api/loans/", {"book": books[0].id, "due_date": due()})
+        assert response.status_code == 201
+        (rule_query,) = [
+            q["sql"]
+            for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT") and "core_patroncirculation" in q["sql"]
+        ]
+        assert '"core_loan"."user_id"' not in rule_query
+        assert "COUNT(" not in rule_query.upper()
+
+    def test_counter_blocks_overdue_and_limit(self, reader, books):
+        user, client = reader
+        PatronCirculation.objects.filter(user=user).update(
+            active_loans=1, earliest_due=timezone.now() - timedelta(days=1)
+        )
+        response = client.post("/api/loans/", {"book": books[0].id, "due_date": due()})
+        assert "overdue" in str(response.data["detail"]).lower()
+
+        PatronCirculation.objects.filter(user=user).update(active_loans=5, earliest_due=None)
+        response = client.post("/api/loans/", {"book": books[0].id, "due_date": due()})
+        assert "at most 5" in str(response.data["detail"])
+
+    def test_missing_row_is_rebuilt_on_first_borrow(self, books):
+        (user,) = User.objects.bulk_create([User(username="bulk")])
+        Loan.objects.bulk_create(
+            [Loan(user=user, book=books[1], due_date=timezone.now() + timedelta(days=3))]
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.post("/api/loans/", {"book": books[0].id, "due_date": due()})
+        assert response.status_code == 201
+        assert state(user)[0] == 2
+
+    def test_repair_command_fixes_drift(self, reader, books, capsys):
+        user, _ = reader
+        Loan.objects.create(
+            user=user, book=books[0], due_date=timezone.now() + timedelta(days=3)
+        )
+        PatronCirculation.objects.filter(user=user).update(active_loans=4, earliest_due=None)
+        call_command("repair_circulation")
+        assert "repaired=1" in capsys.readouterr().out
+        assert state(user)[0] == 1
+        call_command("repair_circulation")
+        assert "repaired=0" in capsys.readouterr().out
+
+    def test_refresh_locks_the_rows_before_counting(self, reader, books, monkeypatch):
+        user, _ = reader
+        Loan.objects.create(
+            user=user, book=books[0], due_date=timezone.now() + timedelta(days=3)
+        )
+        PatronCirculation.objects.filter(user=user).update(active_loans=0)
+        # SQLite has no FOR UPDATE: record it, then run the statement without it
+        monkeypatch.setattr(connection.features, "has_select_for_update", True)
+        statements = []
+
+        def record(execute, sql, params, many, context):
+            statements.append(sql)
+            return execute(sql.replace(" FOR UPDATE", ""), params, many, context)
+
+        with connection.execute_wrapper(record):
+            PatronCirculation.objects.refresh([user.pk])
+        locks = [i for i, sql in enumerate(statements) if sql.endswith("FOR UPDATE")]
+        updates = [i for i, sql in enumerate(statements) if sql.startswith("UPDATE")]
+        assert locks and updates and locks[0] < updates[0]
+        assert state(user)[0] == 1
@@ -0,0 +1,136 @@
+import pytest
+from datetime import timedelta
+from unittest import mock
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Book, Loan
+from core.serializers import BookSerializer, LoanDetailSerializer
+
+
+@pytest.fixture
+def book():
+    return Book.objects.create(title="Dune", author="Frank Herbert", isbn="0441013597")
+
+
+@pytest.fixture
+def reader():
+    user = User.objects.create_user("reader", password="pass")
+    client = APIClient()
+    client.force_authenticate(user)
+    return user, client
+
+
+def aggregates(client, url, **headers):
+    """The aggregate queries behind the validators for one request."""
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url, **headers)
+    return response, [q["sql"] for q in ctx.captured_queries if "MAX(" in q["sql"]]
+
+
+@pytest.mark.django_db
+class TestBookConditionalGet:
+    @pytest.mark.parametrize("url", ["/api/books/", "/api/books/{id}/"])
+    def test_if_none_match_short_circuits_before_serializing(self, book, url):
+        client = APIClient()
+        url = url.format(id=book.id)
+        first = client.get(url)
+        assert first.status_code == 200
+        assert first["ETag"].startswith('"')
+        assert "Last-Modified" in first
+
+        with mock.patch.object(BookSerializer, "to_representation") as to_repr:
+            second = client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        assert second.status_code == 304
+        to_repr.assert_not_called()
+
+    def test_if_modified_since(self, book):
+        client = APIClient()
+        first = client.get("/api/books/")
+        response = client.get("/api/books/", HTTP_IF_MODIFIED_SINCE=first["Last-Modified"])
+        assert response.status_code == 304
+
+    def test_etag_changes_when_book_is_borrowed(self, book, reader):
+        user, _ = reader
+        client = APIClient()
+        etag = client.get(f"/api/books/{book.id}/")["ETag"]
+        Loan.objects.create(user=user, book=book, due_date=timezone.now() + timedelta(days=7))
+
+        response = client.get(f"/api/books/{book.id}/", HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response["ETag"] != etag
+        assert response.data["is_available"] is False
+
+    def test_etag_depends_on_query(self, book):
+        client = APIClient()
+        assert client.get("/api/books/")["ETag"] != client.get("/api/books/?ordering=-title")["ETag"]
+
+    def test_missing_book_has_no_validators(self):
+        response = APIClient().get("/api/books/999/")
+        assert response.status_code == 404
+        assert not response.has_header("ETag")
+
+
+@pytest.mark.django_db
+class TestLoanConditionalGet:
+    def test_list_and_detail_return_304(self, book, reader):
+        user, client = reader
+        loan = Loan.objects.create(
+            user=user, book=book, due_date=timezone.now() + timedelta(days=7)
+        )
+        for url in ["/api/loans/", f"/api/loans/{loan.id}/"]:
+            etag = client.get(url)["ETag"]
+            with mock.patch.object(LoanDetailSerializer, "to_representation") as to_repr:
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304
+            to_repr.assert_not_called()
+
+    def test_return_changes_etag(self, book, reader):
+        user, client = reader
+        loan = Loan.objects.create(
+            user=user, book=book, due_date=timezone.now() + timedelta(days=7)
+        )
+        etag = client.get("/api/loans/")["ETag"]
+        client.patch(f"/api/loans/{loan.id}/return/")
+        assert client.get("/api/loans/", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+    def test_etag_is_scoped_to_the_user(self, book, reader):
+        _, client = reader
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", password="pass"))
+        assert client.get("/api/loans/")["ETag"] != other.get("/api/loans/")["ETag"]
+
+    def test_username_change_changes_etag(self, book, reader):
+        user, client = reader
+        Loan.objects.create(user=user, book=book, due_date=timezone.now() + timedelta(days=7))
+        etag = client.get("/api/loans/")["ETag"]
+        user.username = "renamed"
+        user.save()
+        assert client.get("/api/loans/", HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+@pytest.mark.django_db
+class TestValidatorQueries:
+    def test_lists_derive_validators_without_queries(self, book, reader):
+        user, client = reader
+        Loan.objects.create(user=user, book=book, due_date=timezone.now() + timedelta(days=7))
+        staff = APIClient()
+        staff.force_authenticate(User.objects.create_user("librarian", is_staff=True))
+        for api, url in [(client, "/api/books/"), (staff, "/api/loans/"), (client, "/api/loans/")]:
+            response, statements = aggregates(api, url)
+            assert response.status_code == 200 and not statements
+            etag = response["ETag"]
+            response, statements = aggregates(api, url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304 and not statements
+
+    def test_detail_validators_are_memoized(self, book, reader):
+        user, client = reader
+        loan = Loan.objects.create(
+            user=user, book=book, due_date=timezone.now() + timedelta(days=7)
+        )
+        for url in [f"/api/books/{book.id}/", f"/api/loans/{loan.id}/"]:
+            etag = client.get(url)["ETag"]
+            response, statements = aggregates(client, url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304 and not statements
@@ -0,0 +1,369 @@
+"""
+Query-count and latency budgets for every API route.
+
+Each scenario runs against a seeded dataset with the response cache cleared
+before every request, so it measures the database path. Results are checked
+against `budgets.json` for the active database vendor:
+
+    pytest -m benchmark -s                          # run and print the table
+    BENCH_LATENCY_TOLERANCE=1 pytest -m benchmark   # also enforce latency
+    BENCH_UPDATE_BASELINE=1 pytest -m benchmark     # rewrite budgets.json
+    DATABASE_URL=postgres://... pytest -m benchmark # same suite on PostgreSQL
+
+Query budgets are exact upper bounds and always checked. Wall-clock time
+depends on the machine and its load, so latency budgets are only enforced
+when `BENCH_LATENCY_TOLERANCE` is set (1.0 for the budgets as written,
+higher to scale them for a slower machine). Latency is budgeted on the
+median, which is stable across runs; p95 is reported alongside it but only
+the median fails the test. `BENCH_ITERATIONS` changes the sample size.
+"""
+import json
+import os
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.models import Book, Loan
+
+BUDGETS_PATH = Path(__file__).with_name("budgets.json")
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "10"))
+# None (unset): report latency but don't fail on it
+LATENCY_TOLERANCE = (
+    float(os.environ["BENCH_LATENCY_TOLERANCE"])
+    if os.getenv("BENCH_LATENCY_TOLERANCE")
+    else None
+)
+UPDATE_BASELINE = os.getenv("BENCH_UPDATE_BASELINE") == "1"
+# Headroom given to latency budgets when the baseline is regenerated
+BASELINE_HEADROOM = 3.0
+PASSWORD = "bench-pass-123"
+
+
+class Dataset:
+    """A small but realistically shaped library: history, active and overdue loans."""
+
+    def __init__(self, books=300, patrons=30, history=400):
+        now = timezone.now()
+        password = make_password(PASSWORD)
+        self.patrons = User.objects.bulk_create(
+            User(username=f"patron{i}", email=f"patron{i}@example.com", password=password)
+            for i in range(patrons)
+        )
+        self.staff = User.objects.create(
+            username="librarian", password=password, is_staff=True
+        )
+        self.books = Book.objects.bulk_create(
+            Book(
+                title=f"{['Clean', 'Deep', 'Quiet', 'Swift'][i % 4]} Book {i}",
+                author=f"Author {i % 40}",
+                isbn=f"978{i:010d}",
+                description="A seeded book about software and libraries.",
+            )
+            for i in range(books)
+        )
+        loans = [
+            Loan(
+                user=self.patrons[i % patrons],
+                book=self.books[i % books],
+                borrowed_at=now - timedelta(days=30 + i % 20),
+                due_date=now - timedelta(days=16 + i % 20),
+                returned_at=now - timedelta(days=20 + i % 20),
+            )
+            for i in range(history)
+        ]
+        # Patrons 0..9 each hold two active loans on the first 20 books
+        loans += [
+            Loan(
+                user=self.patrons[i // 2],
+                book=self.books[i],
+                borrowed_at=now - timedelta(days=3),
+                due_date=now + timedelta(days=11),
+            )
+            for i in range(20)
+        ]
+        # Patrons 10..14 each hold one overdue loan on books 20..24
+        loans += [
+            Loan(
+                user=self.patrons[10 + i],
+                book=self.books[20 + i],
+                borrowed_at=now - timedelta(days=20 + i),
+                due_date=now - timedelta(days=6 + i),
+            )
+            for i in range(5)
+        ]
+        Loan.objects.bulk_create(loans)
+        self.next_book = 25
+        self.next_user = 0
+
+    def client(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def fresh_user(self):
+        self.next_user += 1
+        return User.objects.create(username=f"fresh{self.next_user}")
+
+    def free_book(self):
+        self.next_book += 1
+        return self.books[self.next_book]
+
+    def active_loan(self, user):
+        return Loan.objects.create(
+            user=user, book=self.free_book(), due_date=timezone.now() + timedelta(days=7)
+        )
+
+
+def consume(response):
+    if response.streaming:
+        b"".join(response.streaming_content)
+    return response
+
+
+def due():
+    return (timezone.now() + timedelta(days=14)).isoformat()
+
+
+SCENARIOS = {}
+
+
+def scenario(name, iterations=None):
+    """
+    Register a scenario: a function taking the dataset and returning a
+    zero-argument callable that sends the request. Set-up done before
+    returning (creating users, loans...) is not measured.
+    """
+
+    def register(func):
+        SCENARIOS[name] = (func, iterations)
+        return func
+
+    return register
+
+
+@scenario("root")
+def root(d):
+    return lambda: APIClient().get("/")
+
+
+@scenario("books-list")
+def books_list(d):
+    return lambda: APIClient().get("/api/books/")
+
+
+@scenario("books-detail")
+def books_detail(d):
+    return lambda: APIClient().get(f"/api/books/{d.books[5].id}/")
+
+
+@scenario("books-search")
+def books_search(d):
+    return lambda: APIClient().get("/api/books/", {"search": "clean"})
+
+
+@scenario("books-available")
+def books_available(d):
+    return lambda: APIClient().get("/api/books/", {"available": "true"})
+
+
+@scenario("books-export")
+def books_export(d):
+    return lambda: consume(APIClient().get("/api/books/export/"))
+
+
+@scenario("books-bulk")
+def books_bulk(d):
+    client = d.client(d.staff)
+    body = "title,author,isbn\n" + "".join(
+        f"Import {i},Someone,979{i:010d}\n" for i in range(50)
+    )
+    return lambda: client.generic("POST", "/api/books/bulk/", body, content_type="text/csv")
+
+
+@scenario("loans-list")
+def loans_list(d):
+    client = d.client(d.staff)
+    return lambda: client.get("/api/loans/")
+
+
+@scenario("loans-detail")
+def loans_detail(d):
+    loan = Loan.objects.filter(returned_at__isnull=True).first()
+    client = d.client(loan.user)
+    return lambda: client.get(f"/api/loans/{loan.id}/")
+
+
+@scenario("loans-my-active")
+def loans_my_active(d):
+    client = d.client(d.patrons[0])
+    return lambda: client.get("/api/loans/my-active/")
+
+
+@scenario("loans-export")
+def loans_export(d):
+    client = d.client(d.staff)
+    return lambda: consume(client.get("/api/loans/export/"))
+
+
+@scenario("loans-overdue")
+def loans_overdue(d):
+    client = d.client(d.staff)
+    return lambda: client.get("/api/loans/overdue/")
+
+
+@scenario("loans-overdue-by-user")
+def loans_overdue_by_user(d):
+    client = d.client(d.staff)
+    return lambda: client.get("/api/loans/overdue/", {"group": "user"})
+
+
+@scenario("loans-overdue-csv")
+def loans_overdue_csv(d):
+    client = d.client(d.staff)
+    return lambda: consume(client.get("/api/loans/overdue/", {"fmt": "csv"}))
+
+
+@scenario("loans-borrow")
+def loans_borrow(d):
+    client, book = d.client(d.fresh_user()), d.free_book()
+    return lambda: client.post("/api/loans/", {"book": book.id, "due_date": due()})
+
+
+@scenario("loans-batch")
+def loans_batch(d):
+    client = d.client(d.fresh_user())
+    body = {"loans": [{"book": d.free_book().id, "due_date": due()} for _ in range(3)]}
+    return lambda: client.post("/api/loans/batch/", body, format="json")
+
+
+@scenario("loans-return")
+def loans_return(d):
+    loan = d.active_loan(d.fresh_user())
+    client = d.client(loan.user)
+    return lambda: client.patch(f"/api/loans/{loan.id}/return/")
+
+
+@scenario("loans-batch-return")
+def loans_batch_return(d):
+    user = d.fresh_user()
+    body = {"loans": [d.active_loan(user).id for _ in range(3)]}
+    client = d.client(user)
+    return lambda: client.patch("/api/loans/batch-return/", body, format="json")
+
+
+# Password hashing dominates the next two, so fewer samples keep the suite quick
+@scenario("token-obtain", iterations=3)
+def token_obtain(d):
+    body = {"username": "patron1", "password": PASSWORD}
+    return lambda: APIClient().post("/api/token/", body)
+
+
+@scenario("register", iterations=3)
+def register(d):
+    n = d.fresh_user().pk
+    body = {
+        "username": f"newpatron{n}",
+        "email": f"new{n}@example.com",
+        "password": "a-Long-pass-123",
+        "password2": "a-Long-pass-123",
+    }
+    return lambda: APIClient().post("/api/register/", body)
+
+
+@scenario("token-refresh")
+def token_refresh(d):
+    body = {"refresh": str(RefreshToken.for_user(d.patrons[1]))}
+    return lambda: APIClient().post("/api/token/refresh/", body)
+
+
+@scenario("me")
+def me(d):
+    access = str(RefreshToken.for_user(d.patrons[2]).access_token)
+    return lambda: APIClient().get("/api/me/", HTTP_AUTHORIZATION=f"Bearer {access}")
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_scenario(dataset, name):
+    prepare, iterations = SCENARIOS[name]
+    iterations = min(ITERATIONS, iterations or ITERATIONS)
+    timings, queries = [], []
+    # One unmeasured request warms URL resolution and serializer caches
+    prepare(dataset)()
+    for _ in range(iterations):
+        for cache in caches.all():
+            cache.clear()
+        send = prepare(dataset)
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = send()
+            timings.append((time.perf_counter() - start) * 1000)
+        assert response.status_code < 400, (name, response.status_code, response.data)
+        queries.append(len(ctx.captured_queries))
+    return {
+        "queries": max(queries),
+        "p50_ms": round(percentile(timings, 0.50), 2),
+        "p95_ms": round(percentile(timings, 0.95), 2),
+    }
+
+
+def load_budgets():
+    if BUDGETS_PATH.exists():
+        return json.loads(BUDGETS_PATH.read_text())
+    return {}
+
+
+def update_baseline(vendor, name, result):
+    budgets = load_budgets()
+    budgets.setdefault(vendor, {})[name] = {
+        "queries": result["queries"],
+        "p50_ms": round(max(5.0, result["p50_ms"] * BASELINE_HEADROOM), 1),
+    }
+    budgets[vendor] = dict(sorted(budgets[vendor].items()))
+    BUDGETS_PATH.write_text(json.dumps(budgets, indent=2) + "\n")
+
+
+@pytest.fixture
+def dataset(db):
+    return Dataset()
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_endpoint_budget(dataset, name, capsys):
+    result = run_scenario(dataset, name)
+    vendor = connection.vendor
+    with capsys.disabled():
+        print(
+            f"\n{vendor:<10} {name:<20} queries={result['queries']:<3} "
+            f"p50={result['p50_ms']:>8.2f}ms p95={result['p95_ms']:>8.2f}ms"
+        )
+
+    if UPDATE_BASELINE:
+        update_baseline(vendor, name, result)
+        return
+
+    budget = load_budgets().get(vendor, {}).get(name)
+    if budget is None:
+        pytest.skip(f"no {vendor} baseline for {name}; run with BENCH_UPDATE_BASELINE=1")
+    assert result["queries"] <= budget["queries"], (
+        f"{name}: {result['queries']} queries exceeds budget of {budget['queries']}"
+    )
+    if LATENCY_TOLERANCE is None:
+        return
+    assert result["p50_ms"] <= budget["p50_ms"] * LATENCY_TOLERANCE, (
+        f"{name}: p50 {result['p50_ms']}ms exceeds budget of "
+        f"{budget['p50_ms'] * LATENCY_TOLERANCE}ms"
+    )
@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Book, Loan
+
+
+def body(response):
+    return b"".join(response.streaming_content).decode("utf-8")
+
+
+@pytest.fixture
+def library():
+    reader = User.objects.create_user("reader", password="pass")
+    books = [
+        Book.objects.create(title=f"Book {i}", author="Author", isbn=f"978{i:010d}")
+        for i in range(5)
+    ]
+    Loan.objects.create(
+        user=reader, book=books[0], due_date=timezone.now() + timedelta(days=7)
+    )
+    return reader, books
+
+
+@pytest.mark.django_db
+class TestBookExport:
+    def test_ndjson_honours_available_filter(self, library):
+        _, books = library
+        response = APIClient().get("/api/books/export/", {"available": "true"})
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in body(response).splitlines()]
+        assert [row["id"] for row in rows] == [book.id for book in books[1:]]
+        assert all(row["is_available"] for row in rows)
+        assert rows[0]["created_at"].endswith("Z")
+
+    def test_csv_honours_search(self, library):
+        Book.objects.create(title="Dune", author="Frank Herbert", isbn="0441013597")
+        response = APIClient().get("/api/books/export/", {"fmt": "csv", "search": "dune"})
+        rows = list(csv.DictReader(io.StringIO(body(response))))
+        assert [row["title"] for row in rows] == ["Dune"]
+        assert rows[0]["is_available"] == "True"
+
+    def test_query_count_does_not_grow_with_rows(self, library):
+        with CaptureQueriesContext(connection) as ctx:
+            body(APIClient().get("/api/books/export/"))
+        assert len(ctx.captured_queries) == 1
+
+    def test_unknown_format_rejected(self, library):
+        response = APIClient().get("/api/books/export/", {"fmt": "xml"})
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestLoanExport:
+    def test_staff_only(self, library):
+        reader, _ = library
+        client = APIClient()
+        client.force_authenticate(reader)
+        assert client.get("/api/loans/export/").status_code == 403
+
+    def test_streams_ledger(self, library):
+        reader, books = library
+        staff = User.objects.create_user("staff", password="pass", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        response = client.get("/api/loans/export/", {"fmt": "csv"})
+        rows = list(csv.DictReader(io.StringIO(body(response))))
+        assert len(rows) == 1
+        assert rows[0]["username"] == "reader"
+        assert rows[0]["book_isbn"] == books[0].isbn
+        assert rows[0]["returned_at"] == ""
@@ -0,0 +1,174 @@
+import json
+import pytest
+from asgiref.sync import async_to_sync
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.fieldsets import Fieldset, parse_fieldset
+from core.models import Book, Loan
+from core.serializers import BookSerializer, LoanDetailSerializer
+
+
+@pytest.fixture
+def library():
+    now = timezone.now()
+    reader = User.objects.create_user("reader", password="pass")
+    books = [
+        Book.objects.create(title="Dune", author="Frank Herbert", isbn="0441013597"),
+        Book.objects.create(title="Emma", author="Jane Austen", isbn="9780306406157"),
+    ]
+    Loan.objects.create(user=reader, book=books[0], due_date=now + timedelta(days=7))
+    return reader, books
+
+
+def fetch(path, user=None):
+    """A fresh response and its SQL, not one replayed from the catalogue cache."""
+    for cache in caches.all():
+        cache.clear()
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(path)
+    return response, [query["sql"] for query in ctx.captured_queries]
+
+
+def row_queries(statements, table):
+    """The statements loading rows of `table`, not the validators' aggregates."""
+    return [
+        sql for sql in statements
+        if sql.startswith("SELECT") and f'FROM "{table}"' in sql and "COUNT(" not in sql
+    ]
+
+
+def main_query(statements, table):
+    return row_queries(statements, table)[0]
+
+
+class TestParseFieldset:
+    def test_no_parameters(self):
+        assert parse_fieldset({}, BookSerializer) is None
+
+    def test_fields(self):
+        fieldset = parse_fieldset({"fields": "id, title,,"}, BookSerializer)
+        assert fieldset == Fieldset({"id", "title"})
+        assert fieldset.includes("title") and not fieldset.includes("author")
+
+    def test_nested_fields_imply_expansion(self):
+        fieldset = parse_fieldset({"fields": "id,book.title"}, LoanDetailSerializer)
+        assert fieldset.expands("book")
+        assert fieldset.nested["book"] == Fieldset({"title"})
+
+    def test_expand_alone_keeps_every_field(self):
+        fieldset = parse_fieldset({"expand": "book"}, LoanDetailSerializer)
+        assert fieldset.fields is None and fieldset.expands("book")
+
+    @pytest.mark.parametrize("params, key", [
+        ({"fields": "id,price"}, "fields"),
+        ({"fields": "book.price"}, "fields"),
+        ({"fields": "user.email"}, "fields"),
+        ({"fields": ""}, "fields"),
+        ({"expand": "user"}, "expand"),
+    ])
+    def test_unknown_names(self, params, key):
+        with pytest.raises(ValidationError) as excinfo:
+            parse_fieldset(params, LoanDetailSerializer)
+        assert key in excinfo.value.detail
+
+
+@pytest.mark.django_db
+class TestBookFieldsets:
+    def test_list_is_trimmed_and_projected(self, library):
+        response, statements = fetch("/api/books/?fields=id,title")
+        assert response.status_code == 200
+        assert response.json()["results"][0] == {"id": library[1][0].id, "title": "Dune"}
+        sql = main_query(statements, "core_book")
+        assert '"core_book"."description"' not in sql
+        assert "EXISTS" not in sql and "core_loan" not in sql
+
+    def test_availability_only_when_requested(self, library):
+        response, statements = fetch("/api/books/?fields=title,is_available")
+        assert response.json()["results"] == [
+            {"title": "Dune", "is_available": False},
+            {"title": "Emma", "is_available": True},
+        ]
+        assert "core_loan" in main_query(statements, "core_book")
+
+    def test_available_filter_without_the_field(self, library):
+        response, _ = fetch("/api/books/?fields=title&available=true")
+        assert response.json()["results"] == [{"title": "Emma"}]
+
+    def test_ordering_columns_are_loaded(self, library):
+        full, _ = fetch("/api/books/?page_size=1&ordering=-created_at")
+        response, statements = fetch("/api/books/?page_size=1&ordering=-created_at&fields=id")
+        assert response.json()["next"] == full.json()["next"]
+        # The cursor reads the last row without a query per deferred column
+        assert len(row_queries(statements, "core_book")) == 1
+
+    def test_detail(self, library):
+        book = library[1][1]
+        response, _ = fetch(f"/api/books/{book.id}/?fields=isbn")
+        assert response.json() == {"isbn": book.isbn}
+
+    def test_unknown_field_is_400(self, library):
+        response, _ = fetch("/api/books/?fields=title,price")
+        assert response.status_code == 400
+        assert response.json() == {"fields": ["Unknown field(s): price."]}
+
+    def test_without_parameters_nothing_changes(self, library):
+        response, statements = fetch("/api/books/")
+        assert set(response.json()["results"][0]) == set(BookSerializer().fields)
+        assert "core_loan" in main_query(statements, "core_book")
+
+
+@pytest.mark.django_db
+class TestLoanFieldsets:
+    def test_list_skips_user_join_and_book_prefetch(self, library):
+        reader, books = library
+        response, statements = fetch("/api/loans/?fields=id,book,is_overdue", reader)
+        loan = Loan.objects.get()
+        assert response.json()["results"] == [
+            {"id": loan.id, "book": books[0].id, "is_overdue": False}
+        ]
+        sql = main_query(statements, "core_loan")
+        assert "auth_user" not in sql and '"core_loan"."borrowed_at"' in sql
+        assert not row_queries(statements, "core_book")
+
+    def test_nested_book_fields(self, library):
+        reader, books = library
+        response, statements = fetch("/api/loans/?fields=user,book.title", reader)
+        assert response.json()["results"] == [{"user": "reader", "book": {"title": "Dune"}}]
+        assert "EXISTS" not in main_query(statements, "core_book")
+
+    def test_expand_keeps_the_full_representation(self, library):
+        reader, _ = library
+        full, _ = fetch("/api/loans/", reader)
+        expanded, _ = fetch("/api/loans/?expand=book", reader)
+        assert expanded.json() == full.json()
+
+    def test_fields_without_expand_give_the_book_id(self, library):
+        reader, books = library
+        response, _ = fetch("/api/loans/?fields=book", reader)
+        assert response.json()["results"] == [{"book": books[0].id}]
+
+    def test_my_active(self, library):
+        reader, books = library
+        response, statements = fetch("/api/loans/my-active/?fields=id,due_date", reader)
+        assert [set(row) for row in response.json()] == [{"id", "due_date"}]
+        assert "auth_user" not in main_query(statements, "core_loan")
+
+    def test_async_my_active(self, library):
+        reader, _ = library
+        token = RefreshToken.for_user(reader).access_token
+        response = async_to_sync(AsyncClient().get)(
+            "/api/loans/my-active/?fields=id,book.isbn",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert [row["book"] for row in json.loads(response.content)] == [{"isbn": "0441013597"}]
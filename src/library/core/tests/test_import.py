@@ -0,0 +1,123 @@
+import json
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from core.models import Book
+
+
+@pytest.fixture
+def staff_client():
+    staff = User.objects.create_user("staff", password="pass", is_staff=True)
+    client = APIClient()
+    client.force_authenticate(staff)
+    return client
+
+
+CSV_BODY = (
+    "title,author,isbn,description\n"
+    "Clean Code,Robert C. Martin,9780132350884,Craftsmanship\n"
+    "Bad Isbn,Someone,978-013,\n"
+    ",No Title,9780201485677,\n"
+    "Dune,Frank Herbert,0441013597,\n"
+    "Dune Again,Frank Herbert,0441013597,\n"
+)
+
+
+@pytest.mark.django_db
+class TestBulkImportEndpoint:
+    def test_csv_import_reports_row_errors_without_aborting(self, staff_client):
+        response = staff_client.generic(
+            "POST", "/api/books/bulk/", CSV_BODY, content_type="text/csv"
+        )
+        assert response.status_code == 200
+        report = response.data
+        assert (report["created"], report["updated"], report["failed"]) == (2, 0, 3)
+        assert [error["row"] for error in report["errors"]] == [2, 3, 5]
+        assert "isbn" in report["errors"][0]["errors"]
+        assert "title" in report["errors"][1]["errors"]
+        assert "row 4" in report["errors"][2]["errors"]["isbn"][0]
+        assert set(Book.objects.values_list("isbn", flat=True)) == {
+            "9780132350884",
+            "0441013597",
+        }
+
+    def test_ndjson_import_upserts_on_isbn(self, staff_client):
+        Book.objects.create(title="Old", author="Old", isbn="9780132350884")
+        lines = [
+            {"title": "Clean Code", "author": "Robert C. Martin", "isbn": "9780132350884"},
+            {"title": "Refactoring", "author": "Martin Fowler", "isbn": 9780201485677},
+            "not an object",
+        ]
+        body = "\n".join(json.dumps(line) for line in lines) + "\n{broken\n"
+        response = staff_client.generic(
+            "POST", "/api/books/bulk/", body, content_type="application/x-ndjson"
+        )
+        report = response.data
+        assert (report["created"], report["updated"], report["failed"]) == (1, 1, 2)
+        assert Book.objects.get(isbn="9780132350884").title == "Clean Code"
+        assert Book.objects.count() == 2
+
+    def test_bad_bytes_and_malformed_records_are_row_errors(self, staff_client):
+        # Excel's BOM, a line that isn't UTF-8 and a stray carriage return
+        body = (
+            b"\xef\xbb\xbftitle,author,isbn,description\n"
+            b"Clean Code,Robert C. Martin,9780132350884,\n"
+            b"Caf\xe9,Someone,9780201485677,\n"
+            b"Dune,Frank\rHerbert,0441013597,\n"
+            b"Emma,Jane Austen,9780306406157,\n"
+        )
+        response = staff_client.generic(
+            "POST", "/api/books/bulk/", body, content_type="text/csv"
+        )
+        assert response.status_code == 200
+        report = response.data
+        assert (report["created"], report["updated"], report["failed"]) == (2, 0, 2)
+        assert [error["row"] for error in report["errors"]] == [2, 3]
+        assert "utf-8" in report["errors"][0]["errors"]["detail"][0]
+        assert "Malformed CSV" in report["errors"][1]["errors"]["detail"][0]
+        assert set(Book.objects.values_list("isbn", flat=True)) == {
+            "9780132350884",
+            "9780306406157",
+        }
+
+    def test_undecodable_ndjson_line_is_a_row_error(self, staff_client):
+        body = (
+            json.dumps({"title": "Dune", "author": "Herbert", "isbn": "0441013597"}).encode()
+            + b'\n{"title": "\xff"}\n'
+        )
+        response = staff_client.generic(
+            "POST", "/api/books/bulk/", body, content_type="application/x-ndjson"
+        )
+        assert (response.data["created"], response.data["failed"]) == (1, 1)
+        assert response.data["errors"][0]["row"] == 2
+
+    def test_requires_staff(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("reader", password="pass"))
+        response = client.generic(
+            "POST", "/api/books/bulk/", CSV_BODY, content_type="text/csv"
+        )
+        assert response.status_code == 403
+        assert Book.objects.count() == 0
+
+
+@pytest.mark.django_db
+def test_import_books_command(tmp_path, capsys):
+    path = tmp_path / "books.csv"
+    path.write_text(CSV_BODY)
+    call_command("import_books", str(path), "--batch-size", "1")
+    out, err = capsys.readouterr()
+    assert "created=2 updated=0 failed=3" in out
+    assert "row 2:" in err
+    assert Book.objects.count() == 2
+
+
+@pytest.mark.django_db
+def test_import_books_command_reports_undecodable_lines(tmp_path, capsys):
+    path = tmp_path / "books.csv"
+    path.write_bytes(CSV_BODY.encode() + b"Caf\xe9,Someone,9780306406157,\n")
+    call_command("import_books", str(path))
+    out, err = capsys.readouterr()
+    assert "created=2 updated=0 failed=4" in out
+    assert "row 6:" in err
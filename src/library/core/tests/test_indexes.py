@@ -0,0 +1,70 @@
+"""
+Check the hot Loan/Book queries are planned on the indexes added for them.
+"""
+import pytest
+from django.db import connection
+from django.db.models import Count
+from django.utils import timezone
+from core.circulation import overdue_loans
+from core.models import Book, Loan
+from core.seeding import Seeder
+
+
+@pytest.fixture
+def seeded(db):
+    Seeder(seed=3).run(books=2000, users=200, loans=20000)
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    # The heaviest reader, so the user filter isn't trivially selective
+    return (
+        Loan.objects.values("user")
+        .annotate(total=Count("id"))
+        .order_by("-total")
+        .values_list("user", flat=True)
+        .first()
+    )
+
+
+@pytest.mark.parametrize(
+    "build, index",
+    [
+        (
+            lambda user: Loan.objects.filter(
+                user=user, returned_at__isnull=True, due_date__lt=timezone.now()
+            ),
+            "loan_active_user_due_idx",
+        ),
+        (
+            lambda user: Loan.objects.filter(user=user, returned_at__isnull=True),
+            "loan_active_user_due_idx",
+        ),
+        (
+            lambda user: Loan.objects.filter(user=user).order_by("-borrowed_at", "-id"),
+            "loan_user_borrowed_idx",
+        ),
+        (
+            # The staff loan list: every user's loans, newest first
+            lambda user: Loan.objects.select_related("user").order_by(
+                "-borrowed_at", "-id"
+            )[:21],
+            "loan_borrowed_idx",
+        ),
+        (
+            lambda user: overdue_loans().order_by("due_date", "id")[:20],
+            "loan_active_due_idx",
+        ),
+        (lambda user: Book.objects.order_by("title", "id")[:20], "book_title_id_idx"),
+        (lambda user: Book.objects.order_by("-author", "-id")[:20], "book_author_id_idx"),
+        (
+            lambda user: Book.objects.order_by("-created_at", "-id")[:20],
+            "book_created_id_idx",
+        ),
+    ],
+    ids=[
+        "user-overdue", "active", "history", "staff-list", "overdue-scan",
+        "title", "author", "created_at",
+    ],
+)
+def test_hot_queries_use_their_index(seeded, build, index):
+    output = build(seeded).explain()
+    assert index in output, output
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from core.loadtest import LoadTest, LoadTestError, percentile
+
+RESPONSES = [
+    b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}",
+    b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n2\r\n{}\r\n0\r\n\r\n",
+    b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n",
+]
+
+
+async def serve_and_load(total, concurrency, headers=None):
+    """Run a tiny keep-alive server cycling through RESPONSES, and load it."""
+    seen = []
+    served = 0
+
+    async def handle(reader, writer):
+        nonlocal served
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            seen.append(head)
+            response = RESPONSES[served % len(RESPONSES)]
+            served += 1
+            writer.write(response)
+            await writer.drain()
+            if b"Connection: close" in response:
+                writer.close()
+                return
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        load = LoadTest(f"http://127.0.0.1:{port}/api/books/?x=1", total, concurrency, headers)
+        report = await load.arun()
+    return report, seen
+
+
+class TestLoadTest:
+    def test_counts_every_response_and_reconnects_after_close(self):
+        report, seen = asyncio.run(
+            serve_and_load(30, 4, {"Authorization": "Bearer abc"})
+        )
+        assert report["requests"] == 30
+        assert report["errors"] == 0
+        assert report["statuses"] == {200: 20, 404: 10}
+        assert seen[0].startswith(b"GET /api/books/?x=1 HTTP/1.1\r\n")
+        assert b"Authorization: Bearer abc\r\n" in seen[0]
+
+    def test_https_is_rejected(self):
+        with pytest.raises(LoadTestError):
+            LoadTest("https://example.com/", 1, 1)
+
+    def test_percentile(self):
+        values = [float(i) for i in range(1, 101)]
+        assert percentile(values, 0.5) == 51.0
+        assert percentile(values, 0.99) == 99.0
+        assert percentile([], 0.5) == 0.0
@@ -0,0 +1,199 @@
+import json
+import re
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.authentication import user_cache_stats
+from core.caching import catalogue_cache_stats
+from core.metrics import (RETIRED_FILE, RequestSample, current_sample,
+                          empty_series, metrics_dir, registry,
+                          serializer_timer)
+from core.models import Book
+
+
+def metric(text, name, **labels):
+    """Value of the sample `name{labels}` in a Prometheus text body."""
+    for line in text.splitlines():
+        match = re.fullmatch(r"(\w+)\{(.*)\} (\S+)", line)
+        if not match or match[1] != name:
+            continue
+        found = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', match[2]))
+        if found == {key: str(value) for key, value in labels.items()}:
+            return float(match[3])
+    return None
+
+
+def staff_headers():
+    staff, _ = User.objects.get_or_create(username="prometheus", is_staff=True)
+    return {"Authorization": f"Bearer {RefreshToken.for_user(staff).access_token}"}
+
+
+def scrape(**headers):
+    response = APIClient().get("/metrics", headers=headers or staff_headers())
+    assert response.status_code == 200
+    assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+    return response.content.decode()
+
+
+@pytest.fixture(autouse=True)
+def cache_stats():
+    catalogue_cache_stats.reset()
+    user_cache_stats.reset()
+
+
+@pytest.fixture
+def books():
+    return [
+        Book.objects.create(title=f"Book {i}", author="Author", isbn=f"97800000000{i:02d}")
+        for i in range(3)
+    ]
+
+
+@pytest.mark.django_db
+class TestRequestMetrics:
+    def test_records_latency_queries_and_size_per_route(self, books):
+        client = APIClient()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get("/api/books/")
+        # Read before scraping: each request resets the connection's query log
+        query_count = len(queries)
+        text = scrape()
+
+        route = {"route": "books-list", "method": "GET", "status": "200"}
+        assert metric(text, "library_http_request_duration_seconds_count", **route) == 1
+        assert metric(text, "library_http_request_duration_seconds_bucket", **route, le="+Inf") == 1
+        assert metric(text, "library_http_request_db_queries_sum", **route) == query_count
+        assert metric(text, "library_http_request_db_seconds_total", **route) > 0
+        assert metric(text, "library_http_request_serializer_seconds_total", **route) > 0
+        assert metric(text, "library_http_response_bytes_total", **route) == len(response.content)
+
+    def test_routes_are_named_after_their_url(self, books):
+        user = User.objects.create_user("reader", password="pass")
+        client = APIClient()
+        client.force_authenticate(user)
+        client.get(f"/api/books/{books[0].id}/")
+        client.get("/api/loans/my-active/")
+        client.get("/no/such/page/")
+        text = scrape()
+        assert metric(text, "library_http_request_duration_seconds_count",
+                      route="books-detail", method="GET", status="200") == 1
+        assert metric(text, "library_http_request_duration_seconds_count",
+                      route="loan-my-active", method="GET", status="200") == 1
+        assert metric(text, "library_http_request_duration_seconds_count",
+                      route="unmatched", method="GET", status="404") == 1
+
+    def test_async_views_share_the_sync_route_names(self, books):
+        response = async_to_sync(AsyncClient().get)("/api/books/")
+        assert response.status_code == 200
+        text = scrape()
+        route = {"route": "books-list", "method": "GET", "status": "200"}
+        assert metric(text, "library_http_request_duration_seconds_count", **route) == 1
+        assert metric(text, "library_http_request_db_queries_sum", **route) > 0
+
+    def test_streamed_bytes_are_counted_once_sent(self, books):
+        response = APIClient().get("/api/books/export/")
+        body = b"".join(response.streaming_content)
+        text = scrape()
+        assert metric(text, "library_http_response_bytes_total",
+                      route="books-export", method="GET", status="200") == len(body)
+
+    def test_cache_counters(self, books):
+        client = APIClient()
+        client.get("/api/books/")
+        client.get("/api/books/")
+        text = scrape()
+        assert metric(text, "library_cache_requests_total", cache="catalogue", result="hit") == 1
+        assert metric(text, "library_cache_requests_total", cache="catalogue", result="miss") == 1
+
+
+@pytest.mark.django_db
+class TestAggregation:
+    def test_sums_every_process_file(self, books):
+        APIClient().get("/api/books/")
+        other = empty_series()
+        other.update(count=2, duration_sum=0.5, queries_sum=6, response_bytes=100)
+        other["duration_buckets"][-1] = 2
+        metrics_dir().mkdir(parents=True, exist_ok=True)
+        (metrics_dir() / "99999-other.json").write_text(json.dumps({
+            "series": [["books-list", "GET", "200", other]],
+            "caches": {"catalogue": {"hits": 5, "misses": 0}},
+        }))
+        text = scrape()
+        route = {"route": "books-list", "method": "GET", "status": "200"}
+        assert metric(text, "library_http_request_duration_seconds_count", **route) == 3
+        assert metric(text, "library_http_request_duration_seconds_bucket", **route, le=10.0) == 3
+        assert metric(text, "library_cache_requests_total", cache="catalogue", result="hit") == 5
+
+    def test_exited_processes_are_folded_into_the_retired_totals(self, books):
+        APIClient().get("/api/books/")
+        metrics_dir().mkdir(parents=True, exist_ok=True)
+        dead = empty_series()
+        dead.update(count=2, duration_sum=0.5)
+        for name in ["99999-a.json", "99998-b.json"]:
+            (metrics_dir() / name).write_text(json.dumps({
+                "series": [["books-list", "GET", "200", dead]],
+                "caches": {"catalogue": {"hits": 1, "misses": 0}},
+            }))
+        route = {"route": "books-list", "method": "GET", "status": "200"}
+        for _ in range(2):
+            text = scrape()
+            assert metric(text, "library_http_request_duration_seconds_count", **route) == 5
+            assert metric(
+                text, "library_cache_requests_total", cache="catalogue", result="hit"
+            ) == 2
+        names = sorted(path.name for path in metrics_dir().glob("*.json"))
+        assert names == sorted([RETIRED_FILE, f"{registry.name}.json"])
+
+    def test_flushes_are_rate_limited(self, settings, books):
+        settings.LIBRARY_METRICS_FLUSH_SECONDS = 60
+        client = APIClient()
+        client.get("/api/books/")
+        client.get("/api/books/")
+        [path] = metrics_dir().glob("*.json")
+        series = json.loads(path.read_text())["series"]
+        assert [stats["count"] for *_, stats in series] == [1]
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    def test_token_is_required_when_configured(self, settings):
+        settings.LIBRARY_METRICS_TOKEN = "s3cret"
+        assert APIClient().get("/metrics").status_code == 401
+        bad = APIClient().get("/metrics", headers={"Authorization": "Bearer nope"})
+        assert bad.status_code == 401
+        assert "library_http_request" in scrape(Authorization="Bearer s3cret")
+        # The token replaces staff access rather than adding to it
+        assert APIClient().get("/metrics", headers=staff_headers()).status_code == 401
+
+    def test_only_staff_without_a_token(self, settings):
+        settings.LIBRARY_METRICS_TOKEN = None
+        assert APIClient().get("/metrics").status_code == 403
+        patron = User.objects.create_user("patron", password="pass")
+        token = RefreshToken.for_user(patron).access_token
+        response = APIClient().get("/metrics", headers={"Authorization": f"Bearer {token}"})
+        assert response.status_code == 403
+        assert "library_http_request" in scrape()
+
+
+class TestSerializerTimer:
+    def test_only_the_outermost_serializer_is_timed(self):
+        sample = RequestSample()
+        token = current_sample.set(sample)
+        try:
+            with serializer_timer():
+                with serializer_timer():
+                    assert sample.serializing
+            assert not sample.serializing
+        finally:
+            current_sample.reset(token)
+        assert sample.serializer_seconds > 0
+
+    def test_outside_a_request_nothing_is_recorded(self):
+        with serializer_timer():
+            pass
+        assert registry.snapshot()["series"] == []
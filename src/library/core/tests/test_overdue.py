@@ -0,0 +1,108 @@
+import csv
+import io
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Book, Loan
+from core.pagination import KeysetPagination
+
+
+@pytest.fixture
+def staff_client():
+    client = APIClient()
+    staff = User.objects.create_user("staff", password="pass", is_staff=True)
+    client.force_authenticate(staff)
+    return client
+
+
+@pytest.fixture
+def overdue_library():
+    """ann: 3 overdue (2, 10 and 40 days), bob: 1 overdue (20 days) and 1 on time."""
+    now = timezone.now()
+    ann = User.objects.create_user("ann", password="pass")
+    bob = User.objects.create_user("bob", password="pass")
+    books = [
+        Book.objects.create(title=f"Book {i}", author="Author", isbn=f"978{i:010d}")
+        for i in range(7)
+    ]
+
+    def loan(user, book, days_late, returned=False):
+        due = now - timedelta(days=days_late, hours=1)
+        return Loan.objects.create(
+            user=user,
+            book=book,
+            borrowed_at=due - timedelta(days=14),
+            due_date=due,
+            returned_at=now if returned else None,
+        )
+
+    loans = {
+        "ann_2": loan(ann, books[0], 2),
+        "ann_10": loan(ann, books[1], 10),
+        "ann_40": loan(ann, books[2], 40),
+        "bob_20": loan(bob, books[3], 20),
+    }
+    loan(bob, books[4], -5)  # not yet due
+    loan(ann, books[5], 30, returned=True)  # returned late, no longer overdue
+    return {"ann": ann, "bob": bob, **loans}
+
+
+@pytest.mark.django_db
+class TestOverdueEndpoint:
+    def test_staff_only(self, overdue_library):
+        client = APIClient()
+        client.force_authenticate(overdue_library["ann"])
+        assert client.get("/api/loans/overdue/").status_code == 403
+
+    def test_lists_most_overdue_first(self, staff_client, overdue_library):
+        response = staff_client.get("/api/loans/overdue/")
+        assert response.status_code == 200
+        first_page = response.data["results"]
+        assert [row["id"] for row in first_page] == [
+            overdue_library[key].id for key in ("ann_40", "bob_20", "ann_10", "ann_2")
+        ]
+        assert [row["days_overdue"] for row in first_page] == [40, 20, 10, 2]
+        assert first_page[1]["username"] == "bob"
+
+    def test_pages_with_keyset_cursor(self, staff_client, overdue_library, monkeypatch):
+        monkeypatch.setattr(KeysetPagination, "page_size", 3)
+        first = staff_client.get("/api/loans/overdue/").data
+        second = staff_client.get(first["next"]).data
+        ids = [row["id"] for row in first["results"] + second["results"]]
+        assert ids == [
+            overdue_library[key].id for key in ("ann_40", "bob_20", "ann_10", "ann_2")
+        ]
+        assert second["next"] is None
+
+    def test_group_by_user(self, staff_client, overdue_library):
+        response = staff_client.get("/api/loans/overdue/", {"group": "user"})
+        rows = response.data["results"]
+        assert [(row["username"], row["overdue_loans"]) for row in rows] == [
+            ("ann", 3),
+            ("bob", 1),
+        ]
+        assert rows[0]["oldest_due_date"] == overdue_library["ann_40"].due_date
+
+    def test_group_by_days(self, staff_client, overdue_library):
+        response = staff_client.get("/api/loans/overdue/", {"group": "days"})
+        assert response.data["results"] == [
+            {"days_overdue": "0-6", "loans": 1},
+            {"days_overdue": "7-13", "loans": 1},
+            {"days_overdue": "14-29", "loans": 1},
+            {"days_overdue": "30+", "loans": 1},
+        ]
+
+    def test_unknown_group_is_rejected(self, staff_client, overdue_library):
+        response = staff_client.get("/api/loans/overdue/", {"group": "book"})
+        assert response.status_code == 400
+
+    def test_csv_streams_every_overdue_loan(self, staff_client, overdue_library):
+        response = staff_client.get("/api/loans/overdue/", {"fmt": "csv"})
+        assert response.streaming
+        assert response["Content-Disposition"] == 'attachment; filename="overdue.csv"'
+        body = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        assert [row["username"] for row in rows] == ["ann", "bob", "ann", "ann"]
+        assert [row["days_overdue"] for row in rows] == ["40", "20", "10", "2"]
@@ -0,0 +1,108 @@
+import pytest
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+from django.contrib.auth.models import User
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Book, Loan
+
+
+def walk(client, url, params=None):
+    """Follow `next` links from the first page, returning all ids in order."""
+    response = client.get(url, params or {})
+    assert response.status_code == 200
+    ids = [row["id"] for row in response.data["results"]]
+    pages = [response.data]
+    while response.data["next"]:
+        response = client.get(response.data["next"])
+        assert response.status_code == 200
+        ids.extend(row["id"] for row in response.data["results"])
+        pages.append(response.data)
+    return ids, pages
+
+
+@pytest.fixture
+def many_books():
+    # Duplicate authors and titles force the id tiebreaker to matter
+    return [
+        Book.objects.create(
+            title=f"Title {i % 7}", author=f"Author {i % 3}", isbn=f"978{i:010d}"
+        )
+        for i in range(45)
+    ]
+
+
+@pytest.mark.django_db
+class TestBookCursorPagination:
+    @pytest.mark.parametrize(
+        "ordering",
+        ["title", "-title", "author", "-author", "created_at", "-created_at"],
+    )
+    def test_walks_every_ordering_without_gaps_or_duplicates(self, many_books, ordering):
+        ids, pages = walk(APIClient(), "/api/books/", {"ordering": ordering})
+
+        field = ordering.lstrip("-")
+        expected = sorted(
+            many_books,
+            key=lambda book: (getattr(book, field), book.id),
+            reverse=ordering.startswith("-"),
+        )
+        assert ids == [book.id for book in expected]
+        assert [len(page["results"]) for page in pages] == [20, 20, 5]
+
+    def test_previous_link_returns_the_prior_page(self, many_books):
+        client = APIClient()
+        first = client.get("/api/books/", {"ordering": "author"}).data
+        assert first["previous"] is None
+        second = client.get(first["next"]).data
+        back = client.get(second["previous"]).data
+        assert [row["id"] for row in back["results"]] == [
+            row["id"] for row in first["results"]
+        ]
+        assert back["next"] == first["next"]
+
+    def test_no_count_by_default(self, many_books):
+        response = APIClient().get("/api/books/")
+        assert "count" not in response.data
+
+    def test_exact_and_approximate_counts_are_opt_in(self, many_books):
+        client = APIClient()
+        exact = client.get("/api/books/", {"count": "exact"}).data
+        assert (exact["count"], exact["count_type"]) == (45, "exact")
+
+        # SQLite has no planner estimate and falls back to an exact count
+        approx = client.get("/api/books/", {"count": "approximate"}).data
+        assert approx["count"] == 45
+
+    def test_cursor_keeps_other_query_params(self, many_books):
+        first = APIClient().get("/api/books/", {"ordering": "-created_at"}).data
+        query = parse_qs(urlparse(first["next"]).query)
+        assert query["ordering"] == ["-created_at"]
+        assert "cursor" in query
+
+    def test_invalid_cursor_is_404(self):
+        response = APIClient().get("/api/books/", {"cursor": "not-a-cursor"})
+        assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_loans_paginate_by_borrowed_at_desc():
+    staff = User.objects.create_user("staff", password="pass", is_staff=True)
+    client = APIClient()
+    client.force_authenticate(staff)
+    now = timezone.now()
+    loans = []
+    for i in range(25):
+        book = Book.objects.create(title=f"B{i}", author="A", isbn=f"978{i:010d}")
+        loans.append(
+            Loan.objects.create(
+                user=staff,
+                book=book,
+                borrowed_at=now - timedelta(hours=i // 2),  # pairs share a timestamp
+                due_date=now + timedelta(days=14),
+            )
+        )
+
+    ids, _ = walk(client, "/api/loans/")
+    expected = sorted(loans, key=lambda loan: (loan.borrowed_at, loan.id), reverse=True)
+    assert ids == [loan.id for loan in expected]
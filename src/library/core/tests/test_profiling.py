@@ -0,0 +1,104 @@
+import json
+import pstats
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import AsyncClient
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.models import Book
+from core.permissions import is_staff_user
+from core.profiling import RequestProfile
+
+
+def bearer(user):
+    return {"Authorization": f"Bearer {RefreshToken.for_user(user).access_token}"}
+
+
+@pytest.fixture
+def staff():
+    return User.objects.create_user("librarian", password="pass", is_staff=True)
+
+
+@pytest.fixture
+def patron():
+    return User.objects.create_user("patron", password="pass")
+
+
+@pytest.fixture(autouse=True)
+def profile_dir(settings, tmp_path):
+    settings.LIBRARY_PROFILE_DIR = tmp_path / "profiles"
+    return settings.LIBRARY_PROFILE_DIR
+
+
+@pytest.fixture
+def book():
+    return Book.objects.create(title="Dune", author="Frank Herbert", isbn="0441013597")
+
+
+@pytest.mark.django_db
+class TestProfiler:
+    def test_inline_report(self, staff, book):
+        response = APIClient().get("/api/books/?profile=json", headers=bearer(staff))
+        assert response.status_code == 200
+        report = response.json()
+        assert report["id"] == response["X-Profile-Id"]
+        assert report["status"] == 200
+        assert report["path"] == "/api/books/?profile=json"
+        assert report["sql"]["count"] == len(report["sql"]["statements"]) > 0
+        assert any("core_book" in statement["sql"] for statement in report["sql"]["statements"])
+        assert report["functions"]
+        assert {"function", "calls", "own_ms", "cumulative_ms", "callers"} <= set(report["functions"][0])
+
+    def test_report_written_to_disk(self, staff, book, profile_dir):
+        response = APIClient().get("/api/books/", headers={**bearer(staff), "X-Profile": "1"})
+        assert response.status_code == 200
+        assert response.json()["results"][0]["title"] == "Dune"
+        profile_id = response["X-Profile-Id"]
+        report = json.loads((profile_dir / f"{profile_id}.json").read_text())
+        assert report["sql"]["count"] > 0
+        assert pstats.Stats(str(profile_dir / f"{profile_id}.prof")).total_calls > 0
+
+    def test_session_staff_can_profile(self, staff):
+        client = APIClient()
+        client.force_login(staff)
+        response = client.get("/api/books/?profile=json")
+        assert "functions" in response.json()
+
+    @pytest.mark.parametrize("headers", [{}, {"X-Profile": "0"}])
+    def test_unflagged_requests_are_not_profiled(self, staff, headers):
+        response = APIClient().get("/api/books/", headers={**bearer(staff), **headers})
+        assert "X-Profile-Id" not in response
+
+    def test_flag_is_ignored_for_non_staff(self, patron, profile_dir):
+        for headers in ({}, bearer(patron), {"Authorization": "Bearer not-a-token"}):
+            response = APIClient().get("/api/books/?profile=json", headers=headers)
+            assert "X-Profile-Id" not in response
+            assert "functions" not in response.json()
+        assert not profile_dir.exists()
+
+    def test_one_profile_at_a_time(self, staff):
+        RequestProfile.lock.acquire()
+        try:
+            response = APIClient().get("/api/books/?profile=json", headers=bearer(staff))
+        finally:
+            RequestProfile.lock.release()
+        assert response["X-Profile-Id"] == "busy"
+        assert "results" in response.json()
+
+    def test_async_views(self, staff, book):
+        response = async_to_sync(AsyncClient().get)(
+            f"/api/books/{book.id}/?profile=json", headers=bearer(staff)
+        )
+        report = json.loads(response.content)
+        assert report["status"] == 200
+        assert report["sql"]["count"] > 0
+
+
+@pytest.mark.django_db
+class TestIsStaffUser:
+    def test_is_staff_user(self, staff, patron):
+        assert is_staff_user(staff)
+        assert not is_staff_user(patron)
+        assert not is_staff_user(AnonymousUser())
+        assert not is_staff_user(None)
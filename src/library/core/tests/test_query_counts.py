@@ -0,0 +1,93 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Book, Loan
+
+
+def make_books(count, start=0):
+    return [
+        Book.objects.create(
+            title=f"Book {i}", author=f"Author {i}", isbn=f"978{i:010d}"
+        )
+        for i in range(start, start + count)
+    ]
+
+
+def make_loans(user, books, returned=False):
+    for book in books:
+        loan = Loan.objects.create(
+            user=user, book=book, due_date=timezone.now() + timedelta(days=14)
+        )
+        if returned:
+            loan.returned_at = timezone.now()
+            loan.save()
+
+
+def count_queries(client, url):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(ctx.captured_queries)
+
+
+@pytest.mark.django_db
+class TestListQueryCounts:
+    @pytest.fixture
+    def staff_client(self):
+        staff = User.objects.create_user("staff", password="pass", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        return staff, client
+
+    def test_book_list_is_constant_in_page_size(self):
+        client = APIClient()
+        books = make_books(3)
+        make_loans(User.objects.create_user("reader", password="pass"), books[:1])
+        small = count_queries(client, "/api/books/")
+
+        make_books(15, start=3)
+        large = count_queries(client, "/api/books/")
+        assert small == large
+
+    def test_available_filter_is_constant_in_page_size(self):
+        client = APIClient()
+        make_books(2)
+        small = count_queries(client, "/api/books/?available=true")
+
+        make_books(15, start=2)
+        large = count_queries(client, "/api/books/?available=true")
+        assert small == large
+
+    def test_book_availability_comes_from_annotation(self):
+        user = User.objects.create_user("reader", password="pass")
+        borrowed, free = make_books(2)
+        make_loans(user, [borrowed])
+
+        response = APIClient().get("/api/books/")
+        flags = {row["id"]: row["is_available"] for row in response.data["results"]}
+        assert flags == {borrowed.id: False, free.id: True}
+
+    def test_loan_list_is_constant_in_page_size(self, staff_client):
+        staff, client = staff_client
+        user = User.objects.create_user("reader", password="pass")
+        make_loans(user, make_books(2), returned=True)
+        small = count_queries(client, "/api/loans/")
+
+        make_loans(user, make_books(15, start=2))
+        large = count_queries(client, "/api/loans/")
+        assert small == large
+
+    def test_my_active_is_constant_in_loan_count(self):
+        user = User.objects.create_user("reader", password="pass")
+        client = APIClient()
+        client.force_authenticate(user)
+        make_loans(user, make_books(1))
+        small = count_queries(client, "/api/loans/my-active/")
+
+        make_loans(user, make_books(4, start=1))
+        large = count_queries(client, "/api/loans/my-active/")
+        assert small == large
@@ -0,0 +1,207 @@
+import os
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from datetime import timedelta
+from pathlib import Path
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import AsyncClient, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core.models import Book, Loan
+from core import routers
+from core.routers import (PrimaryReplicaRouter, is_pinned, pin_to_primary, pin_window,
+                          read_alias, replica_may_lag, routing_scope)
+from core.stamps import catalogue_version
+
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+
+# The mirror only sees committed rows, so these tests commit
+replica_db = pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+
+
+@pytest.fixture(autouse=True)
+def replicas(settings):
+    settings.LIBRARY_READ_REPLICAS = ["replica"]
+    settings.LIBRARY_REPLICA_PIN_SECONDS = 5
+
+
+@pytest.fixture
+def book():
+    return Book.objects.create(title="Dune", author="Frank Herbert", isbn="0441013597")
+
+
+@pytest.fixture
+def reader():
+    user = User.objects.create_user("reader", password="pass")
+    client = APIClient()
+    client.force_authenticate(user)
+    return user, client
+
+
+class QueriesByAlias:
+    """Capture queries on the primary and the replica at once."""
+
+    def __enter__(self):
+        self.primary = CaptureQueriesContext(connections[DEFAULT_DB_ALIAS])
+        self.replica = CaptureQueriesContext(connections["replica"])
+        self.primary.__enter__()
+        self.replica.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.replica.__exit__(*exc_info)
+        self.primary.__exit__(*exc_info)
+
+
+def make_stamp_old():
+    """Pretend the last catalogue change is older than the pin window."""
+    path = catalogue_version.path
+    if not path.exists():
+        catalogue_version.bump()
+    old = path.stat().st_mtime - 60
+    os.utime(path, (old, old))
+
+
+@replica_db
+class TestRouting:
+    def test_safe_requests_read_from_the_replica(self, book):
+        make_stamp_old()
+        with QueriesByAlias() as queries:
+            response = APIClient().get("/api/books/")
+        assert response.status_code == 200
+        assert response.data["results"][0]["title"] == "Dune"
+        assert len(queries.replica.captured_queries) > 0
+        assert len(queries.primary.captured_queries) == 0
+
+    def test_writes_use_the_primary(self, book, reader):
+        user, client = reader
+        with QueriesByAlias() as queries:
+            response = client.post(
+                "/api/loans/",
+                {"book": book.id, "due_date": timezone.now() + timedelta(days=7)},
+                format="json",
+            )
+        assert response.status_code == 201
+        assert len(queries.replica.captured_queries) == 0
+
+    def test_borrower_is_pinned_to_the_primary(self, book, reader):
+        user, client = reader
+        client.post(
+            "/api/loans/",
+            {"book": book.id, "due_date": timezone.now() + timedelta(days=7)},
+            format="json",
+        )
+        assert is_pinned(user)
+        with QueriesByAlias() as queries:
+            response = client.get("/api/loans/my-active/")
+        assert len(response.data) == 1
+        assert len(queries.replica.captured_queries) == 0
+
+        other = APIClient()
+        other.force_authenticate(User.objects.create_user("other", password="pass"))
+        with QueriesByAlias() as queries:
+            other.get("/api/loans/my-active/")
+        assert len(queries.replica.captured_queries) == 1
+        assert len(queries.primary.captured_queries) == 0
+
+    def test_pin_holds_across_worker_processes(self, book, reader):
+        # Each worker process has its own local-memory cache
+        user, client = reader
+        worker_a = {"default": {"BACKEND": LOCMEM, "LOCATION": "worker-a"}}
+        worker_b = {"default": {"BACKEND": LOCMEM, "LOCATION": "worker-b"}}
+        with override_settings(CACHES=worker_a):
+            client.post(
+                "/api/loans/",
+                {"book": book.id, "due_date": timezone.now() + timedelta(days=7)},
+                format="json",
+            )
+        with override_settings(CACHES=worker_b):
+            assert is_pinned(user)
+            with QueriesByAlias() as queries:
+                response = client.get("/api/loans/my-active/")
+        assert len(response.data) == 1
+        assert len(queries.replica.captured_queries) == 0
+
+    def test_pin_expires(self, book, reader, settings):
+        settings.LIBRARY_REPLICA_PIN_SECONDS = 0.01
+        user, client = reader
+        client.post(
+            "/api/loans/",
+            {"book": book.id, "due_date": timezone.now() + timedelta(days=7)},
+            format="json",
+        )
+        time.sleep(0.05)
+        assert not is_pinned(user)
+
+    def test_expired_pins_are_deleted(self, monkeypatch, settings, reader):
+        user, _ = reader
+        window = pin_window()
+        pin_to_primary(user)
+
+        # Two pin periods later, the first pin's window is out of reach
+        monkeypatch.setattr(routers, "pin_window", lambda: window + 2)
+        later = User.objects.create_user("later", password="pass")
+        pin_to_primary(later)
+        assert not is_pinned(user)
+        assert is_pinned(later)
+        pins = Path(settings.LIBRARY_STATE_DIR) / routers.PINS_DIR
+        assert [path.name for path in pins.iterdir()] == [str(window + 2)]
+
+    def test_export_streams_from_the_replica(self, book):
+        with QueriesByAlias() as queries:
+            response = APIClient().get("/api/books/export/")
+            body = b"".join(response.streaming_content)
+        assert b"Dune" in body
+        assert len(queries.replica.captured_queries) == 1
+
+    def test_async_views_read_from_the_replica(self, book):
+        make_stamp_old()
+        with QueriesByAlias() as queries:
+            response = async_to_sync(AsyncClient().get)(f"/api/books/{book.id}/")
+        assert response.status_code == 200
+        assert len(queries.replica.captured_queries) > 0
+        assert len(queries.primary.captured_queries) == 0
+
+
+@replica_db
+class TestCatalogueCacheWithReplicas:
+    def test_fresh_changes_are_not_cached_from_a_replica(self, book):
+        # `book` was just saved, so the replica may not have it yet
+        client = APIClient()
+        assert client.get("/api/books/")["X-Cache"] == "MISS"
+        assert client.get("/api/books/")["X-Cache"] == "MISS"
+
+        make_stamp_old()
+        assert client.get("/api/books/")["X-Cache"] == "MISS"
+        assert client.get("/api/books/")["X-Cache"] == "HIT"
+
+
+class TestRouter:
+    router = PrimaryReplicaRouter()
+
+    def test_outside_a_request_everything_uses_the_primary(self):
+        assert self.router.db_for_read(Book) == "default"
+        assert self.router.db_for_write(Book) == "default"
+
+    @replica_db
+    def test_atomic_blocks_read_from_the_primary(self):
+        with routing_scope():
+            read_alias.set("replica")
+            assert self.router.db_for_read(Book) == "replica"
+            with transaction.atomic():
+                assert self.router.db_for_read(Loan) == "default"
+        assert self.router.db_for_read(Book) == "default"
+
+    def test_replicas_are_never_migrated(self):
+        assert self.router.allow_migrate("replica", "core") is False
+        assert self.router.allow_migrate("default", "core") is None
+
+    def test_primary_reads_never_skip_the_cache(self):
+        catalogue_version.bump()
+        with routing_scope():
+            assert not replica_may_lag()
+            read_alias.set("replica")
+            assert replica_may_lag()
@@ -0,0 +1,218 @@
+import datetime
+import decimal
+import time
+import uuid
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ErrorDetail
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from core import renderers
+from core.models import Book, Loan
+from core.renderers import FastJSONRenderer
+from core.representation import CompiledRepresentationMixin
+from core.serializers import BookSerializer, LoanDetailSerializer
+
+BENCH_ROWS = 1000
+
+
+@pytest.fixture
+def drf_path(monkeypatch):
+    """Switch the compiled plans and orjson off: plain DRF serializing and rendering."""
+    def use_drf():
+        monkeypatch.setattr(
+            CompiledRepresentationMixin, "representation_plan", lambda self: None
+        )
+        monkeypatch.setattr(renderers, "orjson", None)
+    return use_drf
+
+
+@pytest.fixture
+def library():
+    now = timezone.now()
+    reader = User.objects.create_user("reader", password="pass")
+    staff = User.objects.create_user("staff", password="pass", is_staff=True)
+    books = [
+        Book.objects.create(title="Dune", author="Frank Herbert", isbn="0441013597"),
+        Book.objects.create(
+            title="Ünïcödé   \"quoted\" <tag>",
+            author="Åsa Ærø",
+            isbn="9780306406157",
+            description="Line one\nLine two   end",
+        ),
+        Book.objects.create(title="Empty", author="Nobody", isbn="0306406152", description=""),
+    ]
+    Loan.objects.create(user=reader, book=books[0], due_date=now + timedelta(days=7))
+    Loan.objects.create(
+        user=reader, book=books[1], borrowed_at=now - timedelta(days=20),
+        due_date=now - timedelta(days=3),
+    )
+    returned = Loan.objects.create(
+        user=reader, book=books[2], borrowed_at=now - timedelta(days=40),
+        due_date=now - timedelta(days=30),
+    )
+    returned.returned_at = now - timedelta(days=31)
+    returned.save()
+    return reader, staff, books
+
+
+def render(serializer):
+    return JSONRenderer().render(serializer.data)
+
+
+@pytest.mark.django_db
+class TestSerializerParity:
+    def test_books(self, library, drf_path):
+        books = Book.objects.with_availability().order_by("id")
+        fast = render(BookSerializer(books, many=True))
+        single = render(BookSerializer(books[1]))
+        drf_path()
+        assert fast == render(BookSerializer(books, many=True))
+        assert single == render(BookSerializer(books[1]))
+
+    def test_books_without_annotation(self, library, drf_path):
+        # is_available falls back to a query per book on both paths
+        books = list(Book.objects.order_by("id"))
+        fast = render(BookSerializer(books, many=True))
+        drf_path()
+        assert fast == render(BookSerializer(books, many=True))
+
+    def test_loans(self, library, drf_path):
+        loans = Loan.objects.for_detail().order_by("id")
+        fast = render(LoanDetailSerializer(loans, many=True))
+        drf_path()
+        assert fast == render(LoanDetailSerializer(loans, many=True))
+
+    def test_plans_are_compiled(self):
+        assert BookSerializer().representation_plan() is not None
+        assert LoanDetailSerializer().representation_plan() is not None
+
+
+def fetch(path, user=None):
+    """A fresh response, not one replayed from the catalogue cache."""
+    for cache in caches.all():
+        cache.clear()
+    client = APIClient()
+    if user is not None:
+        client.force_authenticate(user)
+    return client.get(path)
+
+
+@pytest.mark.django_db
+class TestEndpointParity:
+    @pytest.mark.parametrize("path", [
+        "/api/books/",
+        "/api/books/?ordering=-created_at",
+        "/api/books/999999/",
+        "/api/loans/",
+        "/api/loans/my-active/",
+    ])
+    def test_responses_are_byte_identical(self, library, drf_path, path):
+        reader, staff, books = library
+        fast = fetch(path, reader)
+        drf_path()
+        slow = fetch(path, reader)
+        assert fast.status_code == slow.status_code
+        assert fast.content == slow.content
+
+    def test_book_detail(self, library, drf_path):
+        reader, staff, books = library
+        path = f"/api/books/{books[1].id}/"
+        fast = fetch(path).content
+        drf_path()
+        assert fast == fetch(path).content
+
+
+class TestRendererParity:
+    DATA = {
+        "text": "plain ascii",
+        "unicode": "Ünïcödé ☃     \"q\" \\ \n\t",
+        "detail": ErrorDetail("This field is required.", code="required"),
+        "lazy": gettext_lazy("Not found."),
+        "when": datetime.datetime(2024, 5, 1, 12, 30, tzinfo=datetime.timezone.utc),
+        "local": datetime.datetime(2024, 5, 1, 12, 30, 15, 123456),
+        "day": datetime.date(2024, 5, 1),
+        "price": decimal.Decimal("12.50"),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "numbers": [0, -1, 2**53, 1.5, 0.1, True, False, None],
+        "nested": {"list": [{"a": 1}, []], "empty": {}},
+        1: "int key",
+    }
+
+    def test_byte_identical_to_drf(self):
+        assert FastJSONRenderer().render(self.DATA) == JSONRenderer().render(self.DATA)
+
+    def test_falls_back_for_values_orjson_refuses(self):
+        data = {"big": 2**70}
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    def test_indented_output_uses_drf(self):
+        media_type = "application/json; indent=4"
+        assert FastJSONRenderer().render(self.DATA, media_type) == JSONRenderer().render(
+            self.DATA, media_type
+        )
+
+    def test_none_renders_empty(self):
+        assert FastJSONRenderer().render(None) == b""
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_serialization_benchmark(drf_path, capsys):
+    """Serializer + renderer time per 1,000 rows, compiled vs DRF (run with -s)."""
+    users = User.objects.bulk_create(User(username=f"bench{i}") for i in range(50))
+    books = Book.objects.bulk_create(
+        Book(title=f"Book {i}", author=f"Author {i % 97}", isbn=f"978{i:010d}",
+             description="A description " * 5)
+        for i in range(BENCH_ROWS)
+    )
+    now = timezone.now()
+    Loan.objects.bulk_create(
+        Loan(user=users[i % len(users)], book=book, due_date=now + timedelta(days=7))
+        for i, book in enumerate(books)
+    )
+    book_rows = list(Book.objects.with_availability().order_by("id"))
+    # Page-sized chunks: SQLite rejects a 1,000-book prefetch expression
+    loan_ids = list(Loan.objects.order_by("id").values_list("id", flat=True))
+    loan_rows = [
+        loan
+        for start in range(0, len(loan_ids), 100)
+        for loan in Loan.objects.for_detail().filter(id__in=loan_ids[start:start + 100]).order_by("id")
+    ]
+
+    def measure(serializer_class, rows, renderer):
+        best = {"serialize": float("inf"), "render": float("inf")}
+        for _ in range(5):
+            started = time.perf_counter()
+            data = serializer_class(rows, many=True).data
+            serialized = time.perf_counter()
+            body = renderer.render(data)
+            rendered = time.perf_counter()
+            best["serialize"] = min(best["serialize"], serialized - started)
+            best["render"] = min(best["render"], rendered - serialized)
+        return best, body
+
+    fast = {
+        "books": measure(BookSerializer, book_rows, FastJSONRenderer()),
+        "loans": measure(LoanDetailSerializer, loan_rows, FastJSONRenderer()),
+    }
+    drf_path()
+    slow = {
+        "books": measure(BookSerializer, book_rows, JSONRenderer()),
+        "loans": measure(LoanDetailSerializer, loan_rows, JSONRenderer()),
+    }
+
+    with capsys.disabled():
+        print(f"\nper {BENCH_ROWS} rows       serialize (drf -> compiled)   render (drf -> orjson)")
+        for name in fast:
+            (f, fast_body), (s, slow_body) = fast[name], slow[name]
+            assert fast_body == slow_body
+            print(
+                f"{name:<18} {s['serialize'] * 1000:7.2f}ms -> {f['serialize'] * 1000:6.2f}ms"
+                f"          {s['render'] * 1000:6.2f}ms -> {f['render'] * 1000:5.2f}ms"
+            )
+        assert f["serialize"] < s["serialize"]
@@ -0,0 +1,121 @@
+import os
+import time
+import uuid
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from core.models import RevokedToken
+from core.revocation import RevocationStore, revocation_store
+
+# Seeding a million rows takes ~20s, so the benchmark only runs when asked:
+#   BENCH_REVOKED=1000000 pytest -m benchmark -k revoked -s
+BENCH_REVOKED = int(os.getenv("BENCH_REVOKED", "0"))
+
+
+def refresh(token):
+    return APIClient().post("/api/token/refresh/", {"refresh": str(token)})
+
+
+@pytest.fixture
+def reader():
+    return User.objects.create_user("reader", password="pass")
+
+
+@pytest.mark.django_db
+class TestRefreshRevocation:
+    def test_rotated_token_cannot_be_reused(self, reader):
+        token = RefreshToken.for_user(reader)
+        first = refresh(token)
+        assert first.status_code == 200
+        assert refresh(first.data["refresh"]).status_code == 200
+        replay = refresh(token)
+        assert replay.status_code == 401
+        assert RevokedToken.objects.filter(jti=token["jti"]).exists()
+
+    def test_other_processes_pick_up_revocations(self, reader):
+        token = RefreshToken.for_user(reader)
+        other_process = RevocationStore()
+        assert not other_process.is_revoked(token["jti"])
+        assert refresh(token).status_code == 200
+        assert other_process.is_revoked(token["jti"])
+        assert len(other_process) == 1
+
+    def test_fingerprint_hits_are_confirmed_in_the_database(self, reader):
+        store = RevocationStore()
+        now = timezone.now()
+        store.sync(now)
+        # A fingerprint in memory with no row behind it (a collision)
+        store._add("not-revoked", now + timedelta(days=1))
+        with CaptureQueriesContext(connection) as ctx:
+            assert not store.is_revoked("not-revoked", now)
+        assert len(ctx.captured_queries) == 1
+
+    def test_misses_are_answered_from_memory(self, reader):
+        refresh(RefreshToken.for_user(reader))
+        revocation_store.sync()
+        with CaptureQueriesContext(connection) as ctx:
+            assert not revocation_store.is_revoked(uuid.uuid4().hex)
+        assert ctx.captured_queries == []
+
+    def test_expired_entries_are_ignored_and_purged(self, reader, capsys):
+        past = timezone.now() - timedelta(hours=2)
+        RevokedToken.objects.create(jti="old", expires_at=past)
+        RevokedToken.objects.create(
+            jti="live", expires_at=timezone.now() + timedelta(days=1)
+        )
+        store = RevocationStore()
+        assert not store.is_revoked("old")
+        assert store.is_revoked("live")
+        call_command("purge_revoked_tokens")
+        assert "purged=1" in capsys.readouterr().out
+        assert list(RevokedToken.objects.values_list("jti", flat=True)) == ["live"]
+
+
+@pytest.mark.benchmark
+@pytest.mark.skipif(not BENCH_REVOKED, reason="set BENCH_REVOKED=<rows> to run")
+@pytest.mark.django_db
+def test_refresh_throughput_with_a_million_revoked_tokens(reader, capsys):
+    now = timezone.now()
+    expires_at = connection.ops.adapt_datetimefield_value(now + timedelta(days=7))
+    revoked_at = connection.ops.adapt_datetimefield_value(now)
+    started = time.perf_counter()
+    # Raw executemany: building a million model instances would dominate the run
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {RevokedToken._meta.db_table} (jti, expires_at, revoked_at) "
+            "VALUES (%s, %s, %s)",
+            ((uuid.uuid4().hex, expires_at, revoked_at) for _ in range(BENCH_REVOKED)),
+        )
+    seeded = time.perf_counter() - started
+
+    started = time.perf_counter()
+    revocation_store.sync()
+    loaded = time.perf_counter() - started
+    assert len(revocation_store) == BENCH_REVOKED
+
+    jtis = [uuid.uuid4().hex for _ in range(100_000)]
+    started = time.perf_counter()
+    assert not any(revocation_store._maybe_revoked(jti, timezone.now()) for jti in jtis)
+    check_us = (time.perf_counter() - started) / len(jtis) * 1e6
+
+    token = RefreshToken.for_user(reader)
+    rounds = 200
+    started = time.perf_counter()
+    for _ in range(rounds):
+        response = refresh(token)
+        assert response.status_code == 200
+        token = response.data["refresh"]
+    per_second = rounds / (time.perf_counter() - started)
+
+    with capsys.disabled():
+        print(
+            f"\nrevoked={BENCH_REVOKED} seed={seeded:.1f}s load={loaded:.1f}s "
+            f"membership={check_us:.2f}us refresh={per_second:.0f}/s"
+        )
+    assert check_us < 50
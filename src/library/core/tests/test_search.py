@@ -0,0 +1,90 @@
+import importlib
+import pytest
+from django.test import override_settings
+from rest_framework.test import APIClient
+from core import search
+from core.models import Book
+
+
+def search_ids(query):
+    response = APIClient().get("/api/books/", {"search": query})
+    assert response.status_code == 200
+    return [row["id"] for row in response.data["results"]]
+
+
+@pytest.fixture
+def catalogue():
+    return {
+        "clean_code": Book.objects.create(
+            title="Clean Code",
+            author="Robert C. Martin",
+            isbn="9780132350884",
+            description="A handbook of agile software craftsmanship",
+        ),
+        "dune": Book.objects.create(
+            title="Dune",
+            author="Frank Herbert",
+            isbn="9780441013593",
+            description="Desert planet politics",
+        ),
+        "refactoring": Book.objects.create(
+            title="Refactoring",
+            author="Martin Fowler",
+            isbn="9780201485677",
+            description="Improving the design of existing code",
+        ),
+    }
+
+
+@pytest.mark.django_db
+class TestBookSearch:
+    def test_matches_title_and_author(self, catalogue):
+        assert set(search_ids("martin")) == {
+            catalogue["clean_code"].id,
+            catalogue["refactoring"].id,
+        }
+
+    def test_matches_description(self, catalogue):
+        assert search_ids("craftsmanship") == [catalogue["clean_code"].id]
+
+    def test_matches_isbn(self, catalogue):
+        assert search_ids("9780441013593") == [catalogue["dune"].id]
+
+    def test_prefix_matching(self, catalogue):
+        assert search_ids("refact") == [catalogue["refactoring"].id]
+        assert search_ids("herb") == [catalogue["dune"].id]
+
+    def test_all_terms_must_match(self, catalogue):
+        assert search_ids("martin fowler") == [catalogue["refactoring"].id]
+
+    def test_index_follows_saves_and_deletes(self, catalogue):
+        dune = catalogue["dune"]
+        dune.title = "Children of Dune"
+        dune.save()
+        assert search_ids("children") == [dune.id]
+
+        dune.delete()
+        assert search_ids("children") == []
+
+    def test_explicit_ordering_still_applies(self, catalogue):
+        ids = search_ids("martin")
+        response = APIClient().get("/api/books/", {"search": "martin", "ordering": "-title"})
+        ordered = [row["title"] for row in response.data["results"]]
+        assert ordered == ["Refactoring", "Clean Code"]
+        assert len(ids) == 2
+
+    def test_punctuation_only_query_matches_nothing(self, catalogue):
+        assert search_ids("!!!") == []
+
+    @override_settings(LIBRARY_SEARCH_BACKEND="core.search.IContainsSearchBackend")
+    def test_icontains_fallback_backend(self, catalogue):
+        assert search_ids("craftsman") == [catalogue["clean_code"].id]
+
+
+def test_migration_index_matches_the_query_expression():
+    # The migration keeps its own copy; the query must repeat it verbatim
+    migration = importlib.import_module("core.migrations.0003_book_search_index")
+    [statement] = migration.POSTGRES_FORWARD
+    index = f"{search.POSTGRES_INDEX_NAME} ON core_book USING GIN (({search.POSTGRES_DOCUMENT}))"
+    assert index in statement
+    assert f"CREATE VIRTUAL TABLE {search.SQLITE_FTS_TABLE} " in migration.SQLITE_FORWARD[0]
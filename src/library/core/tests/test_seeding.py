@@ -0,0 +1,53 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import Count
+from django.utils import timezone
+from core.circulation import MAX_ACTIVE_LOANS
+from core.models import Book, Loan
+from core.seeding import Seeder, isbn10, isbn13, make_isbn
+
+
+def test_isbn_check_digits():
+    assert isbn13("978013235088") == "9780132350884"
+    assert isbn10("044101359") == "0441013597"
+    assert isbn10("000000006") is None  # check digit would be 'X'
+    assert len({make_isbn(n) for n in range(5000)}) == 5000
+
+
+@pytest.mark.django_db
+class TestSeedLibrary:
+    def test_command_seeds_valid_data_within_loan_invariants(self, capsys):
+        call_command("seed_library", books=200, users=40, loans=3000, batch_size=500)
+        assert "books=200 users=40 loans=3000" in capsys.readouterr().out
+
+        for book in Book.objects.all()[:50]:
+            book.full_clean()
+        active = Loan.objects.filter(returned_at__isnull=True)
+        assert active.exists()
+        assert active.filter(due_date__lt=timezone.now()).exists()
+        assert Loan.objects.filter(returned_at__isnull=False).exists()
+        per_user = active.values("user").annotate(n=Count("id")).order_by("-n")
+        assert per_user[0]["n"] <= MAX_ACTIVE_LOANS
+        # Zipf popularity: the most borrowed book is far above the mean (15)
+        per_book = Loan.objects.values("book").annotate(n=Count("id")).order_by("-n")
+        assert per_book[0]["n"] > 150
+
+    def test_same_seed_same_library(self):
+        now = timezone.now()
+
+        def snapshot():
+            Seeder(seed=7, now=now).run(books=50, users=10, loans=300)
+            return (
+                list(Book.objects.order_by("id").values_list("title", "isbn")),
+                list(
+                    Loan.objects.order_by("id").values_list(
+                        "book__isbn", "user__username", "borrowed_at", "returned_at"
+                    )
+                ),
+            )
+
+        first = snapshot()
+        Seeder(now=now).clear()
+        assert not Book.objects.exists() and not User.objects.exists()
+        assert snapshot() == first
@@ -0,0 +1,76 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.utils import timezone
+from core.models import Book, Loan
+from core.stress import PATRON_PREFIX, BorrowStress, is_lock_statement
+
+
+@pytest.fixture
+def shared_database():
+    """Threads racing on one database file or server, not SQLite's shared-cache memory."""
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip("in-memory SQLite fails on table locks instead of waiting for them")
+
+
+@pytest.mark.parametrize("sql, expected", [
+    ("BEGIN IMMEDIATE", True),
+    ('SELECT "core_patroncirculation"."id" FROM "core_patroncirculation" FOR UPDATE', True),
+    ('INSERT INTO "core_loan" ("book_id") VALUES (%s)', True),
+    ('INSERT INTO "core_book" ("title") VALUES (%s)', False),
+    ('SELECT "core_loan"."id" FROM "core_loan"', False),
+])
+def test_is_lock_statement(sql, expected):
+    assert is_lock_statement(sql) is expected
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBorrowStress:
+    def test_rounds_and_teardown(self):
+        # Catalogue rows that merely look like the run's must survive teardown
+        book = Book.objects.create(title="Real", author="Author", isbn="9780000000002")
+        patron = User.objects.create_user(f"{PATRON_PREFIX}0")
+        Loan.objects.create(user=patron, book=book, due_date=timezone.now() + timedelta(days=7))
+
+        stress = BorrowStress(threads=1, rounds=3)
+        report = stress.run()
+        assert report["outcomes"] == {"201": 3}
+        assert (report["rounds_won"], report["double_borrows"]) == (3, 0)
+        assert Loan.objects.filter(book=stress.book, returned_at__isnull=False).count() == 3
+        assert Loan.objects.active().get().book == book
+        stress.teardown()
+        assert list(Book.objects.all()) == [book]
+        assert list(User.objects.filter(username__startswith=PATRON_PREFIX)) == [patron]
+        assert Loan.objects.get().user == patron
+
+    def test_teardown_after_a_failed_setup(self):
+        stress = BorrowStress(threads=2, rounds=1)
+        User.objects.create_user(f"{PATRON_PREFIX}{stress.run_id.hex[:8]}-1")
+        with pytest.raises(IntegrityError):
+            stress.run()
+        stress.teardown()
+        assert not Book.objects.exists()
+        assert User.objects.count() == 1
+
+    @pytest.mark.benchmark
+    def test_one_winner_per_round(self, shared_database, capsys):
+        stress = BorrowStress(threads=4, rounds=5)
+        try:
+            report = stress.run()
+        finally:
+            stress.teardown()
+        assert report["outcomes"] == {"201": 5, "400": 15}
+        assert (report["rounds_won"], report["double_borrows"]) == (5, 0)
+        with capsys.disabled():
+            print(f"\nstress_borrow: {report}")
+
+    def test_command(self, shared_database, capsys):
+        call_command("stress_borrow", threads=2, rounds=2)
+        assert "2/2 rounds won, 0 double borrows" in capsys.readouterr().out
+        assert not Book.objects.exists()
+
+    def test_command_needs_two_threads(self):
+        with pytest.raises(CommandError):
+            call_command("stress_borrow", threads=1)
@@ -0,0 +1,138 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from core import views
+from core.exceptions import exception_handler
+from core.models import Book, Loan
+
+
+def due(days=14):
+    return timezone.now() + timedelta(days=days)
+
+
+@pytest.fixture
+def reader():
+    return User.objects.create_user("reader", password="pass")
+
+
+@pytest.fixture
+def book():
+    return Book.objects.create(title="Dune", author="Frank Herbert", isbn="0441013597")
+
+
+def save_error(instance, validation):
+    """The `ValidationError` saving `instance` raises (rolled back, so vendor-safe)."""
+    with pytest.raises(ValidationError) as excinfo, transaction.atomic():
+        instance.save(validation=validation)
+    return excinfo.value.message_dict
+
+
+@pytest.mark.django_db
+class TestFastValidation:
+    def test_duplicate_isbn_gives_the_full_mode_error(self, book):
+        duplicate = Book(title="Dune", author="Herbert", isbn=book.isbn)
+        full = save_error(duplicate, "full")
+        assert full == {"isbn": ["Book with this Isbn already exists."]}
+        assert save_error(duplicate, "fast") == full
+
+    def test_second_active_loan_gives_the_full_mode_error(self, reader, book):
+        Loan.objects.create(user=reader, book=book, due_date=due())
+        other = User.objects.create_user("other", password="pass")
+        second = Loan(user=other, book=book, due_date=due())
+        full = save_error(second, "full")
+        assert full == {"__all__": ["Constraint “unique_active_loan_per_book” is violated."]}
+        assert save_error(second, "fast") == full
+
+    def test_in_memory_checks_still_run_without_queries(self, reader, book):
+        with CaptureQueriesContext(connection) as ctx:
+            assert save_error(Book(title="", author="A", isbn="123"), "fast").keys() == {
+                "title", "isbn"
+            }
+            loan = Loan(user=reader, book=book, due_date=timezone.now() - timedelta(days=1))
+            assert "__all__" in save_error(loan, "fast")
+        assert not [query for query in ctx.captured_queries if query["sql"].startswith("SELECT")]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_missing_foreign_key_gives_the_full_mode_error(reader):
+    # Foreign keys are deferred: outside a transaction the INSERT itself fails
+    loan = Loan(user=reader, book_id=999999, due_date=due())
+    with pytest.raises(ValidationError) as full:
+        loan.save()
+    with pytest.raises(ValidationError) as fast:
+        loan.save(validation="fast")
+    assert fast.value.message_dict == full.value.message_dict == {
+        "book": ["Book instance with id 999999 is not a valid choice."]
+    }
+
+
+class TestExceptionHandler:
+    def test_django_validation_errors_are_400s(self):
+        error = ValidationError({"isbn": ["Taken."], "__all__": ["Broken."]})
+        response = exception_handler(error, {})
+        assert response.status_code == 400
+        assert response.data == {"isbn": ["Taken."], "detail": ["Broken."]}
+
+
+@pytest.mark.django_db
+def test_borrow_race_lost_at_insert_is_a_field_error(reader, book, monkeypatch):
+    Loan.objects.create(
+        user=User.objects.create_user("other", password="pass"), book=book, due_date=due()
+    )
+    # The rule query ran before the other loan was committed
+    monkeypatch.setattr(
+        views,
+        "lock_borrow_state",
+        lambda *args: {"book_taken": False, "user_active": 0, "user_overdue": False},
+    )
+    client = APIClient()
+    client.force_authenticate(reader)
+    response = client.post("/api/loans/", {"book": book.id, "due_date": due().isoformat()})
+    assert response.status_code == 400
+    assert response.json() == {"book": ["This book is currently not available for borrowing."]}
+
+
+@pytest.mark.benchmark
+@pytest.mark.django_db
+def test_queries_saved_per_save(reader, capsys):
+    """Queries per save, full vs fast validation (run with -s)."""
+    def count(save):
+        with CaptureQueriesContext(connection) as ctx:
+            save()
+        return len(ctx.captured_queries)
+
+    def book_insert(validation, index):
+        book = Book(title="Emma", author="Austen", isbn=f"978{index:010d}")
+        return count(lambda: book.save(validation=validation)), book
+
+    def loan_insert(validation, book):
+        loan = Loan(user=reader, book=book, due_date=due())
+        return count(lambda: loan.save(validation=validation)), loan
+
+    rows = {}
+    for index, validation in enumerate(("full", "fast")):
+        inserted, book = book_insert(validation, index)
+        book.title = "Emma (annotated)"
+        updated = count(lambda: book.save(validation=validation))
+        borrowed, loan = loan_insert(validation, book)
+        loan.returned_at = timezone.now()
+        returned = count(lambda: loan.save(validation=validation))
+        rows[validation] = {
+            "book insert": inserted,
+            "book update": updated,
+            "loan insert": borrowed,
+            "loan return": returned,
+        }
+
+    with capsys.disabled():
+        print(f"\n{'queries per save':<18} full  fast  saved")
+        for name, full in rows["full"].items():
+            fast = rows["fast"][name]
+            print(f"{name:<18} {full:4}  {fast:4}  {full - fast:5}")
+    for name, full in rows["full"].items():
+        assert rows["fast"][name] < full
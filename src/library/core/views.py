@@ -1,34 +1,111 @@
+import hmac
+
 from core.models import Book, Loan
-from django.db import transaction
-from django.db.models import Exists, OuterRef, Q
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError as DRFValidationError
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from .circulation import (BATCH_CONFLICT, BOOK_UNAVAILABLE,
+                          MAX_ACTIVE_LOANS, BatchBorrowBlocked, borrow_many,
+                          days_overdue, lock_borrow_state, overdue_by_days,
+                          overdue_by_user, overdue_loans, overdue_rows,
+                          return_many)
+from .caching import (CatalogueCacheMixin, cached_validators,
+                      versioned_validators)
+from .conditional import ConditionalGetMixin, loan_state, make_validators
+from .exporters import (BOOK_EXPORT_COLUMNS, EXPORT_FORMATS,
+                        LOAN_EXPORT_COLUMNS, streaming_export)
+from .fieldsets import (FieldsetMixin, needs_availability, project_books,
+                        project_loans)
+from .importers import import_books, iter_text_lines
+from .integrity import violates
+from .metrics import CONTENT_TYPE, collect, render
+from .pagination import KeysetPagination
+from .pooling import pool_report
 from .permissions import IsAdminOrReadOnly, IsBorrowerOrAdminForLoan
-from .serializers import (BookSerializer, LoanCreateSerializer,
+from .profiling import is_staff_request
+from .routers import ReplicaReadMixin
+from .search import get_search_backend
+from .serializers import (BookSerializer, LoanBatchCreateSerializer,
+                          LoanBatchReturnSerializer, LoanCreateSerializer,
                           LoanDetailSerializer, RegisterSerializer)
+from .stamps import users_version
+
+
+BOOK_STATE = {"count": Count("id"), "last_updated": Max("updated_at")}
+
+
+def get_export_format(request):
+    # `format` is reserved by DRF's renderer negotiation, hence `fmt`
+    file_format = request.query_params.get("fmt", "ndjson")
+    if file_format not in EXPORT_FORMATS:
+        raise DRFValidationError(
+            {"fmt": f"Choose one of: {', '.join(sorted(EXPORT_FORMATS))}."}
+        )
+    return file_format
+
+
+def batch_payload(results, success_status):
+    succeeded = sum(1 for result in results if result["status"] == success_status)
+    return {
+        success_status: succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+    }
+
+
+def me_payload(user):
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "is_staff": user.is_staff,
+        "is_superuser": user.is_superuser,
+        "date_joined": user.date_joined.isoformat(),
+    }
 
 
 class MeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        user = request.user
-        data = {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "is_staff": user.is_staff,
-            "is_superuser": user.is_superuser,
-            "date_joined": user.date_joined.isoformat(),
-        }
-        return Response(data)
+        return Response(me_payload(request.user))
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape target: every worker's totals (see `core.metrics`).
+    Scrapes need `Bearer <LIBRARY_METRICS_TOKEN>`, or staff credentials
+    when no token is configured.
+    """
+    token = getattr(settings, "LIBRARY_METRICS_TOKEN", None)
+    if token:
+        if not hmac.compare_digest(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        ):
+            return HttpResponse(status=401)
+    elif not is_staff_request(request):
+        return HttpResponse(status=403)
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
+
+
+class DatabasePoolView(APIView):
+    """Connection pool usage per database alias, for staff."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({"databases": pool_report()})
 
 
 """
@@ -94,50 +171,150 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class BookViewSet(viewsets.ModelViewSet):
+class BookViewSet(
+    ReplicaReadMixin,
+    ConditionalGetMixin,
+    CatalogueCacheMixin,
+    FieldsetMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAdminOrReadOnly]
+    pagination_class = KeysetPagination
+    ordering_choices = [
+        "title",
+        "-title",
+        "author",
+        "-author",
+        "created_at",
+        "-created_at",
+    ]
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-
-        # Filter by availability using subquery (efficient)
+        fieldset = self.get_fieldset()
         available_only = (
             self.request.query_params.get("available", "false").lower() == "true"
         )
+        queryset = super().get_queryset()
+
+        # Availability comes from one annotated subquery instead of a query per row,
+        # skipped when a sparse fieldset leaves `is_available` out
+        if available_only or needs_availability(fieldset):
+            queryset = queryset.with_availability()
+
+        # Filter by availability using the same annotation
         if available_only:
-            # Subquery: exclude books that have an active loan
-            has_active_loan = Loan.objects.filter(
-                book=OuterRef("pk"), returned_at__isnull=True
-            )
-            queryset = queryset.filter(~Exists(has_active_loan))
+            queryset = queryset.filter(annotated_is_available=True)
 
-        # Optional: basic search by title or author
+        # Full-text search over title, author, description and isbn
         search = self.request.query_params.get("search")
         if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) | Q(author__icontains=search)
-            )
+            queryset = get_search_backend().search(queryset, search)
 
-        # Ordering (default + query param)
-        ordering = self.request.query_params.get("ordering", "title")
-        if ordering in [
-            "title",
-            "-title",
-            "author",
-            "-author",
-            "created_at",
-            "-created_at",
-        ]:
-            queryset = queryset.order_by(ordering)
+        ordering = self.get_ordering()
+        return project_books(queryset.order_by(*ordering), fieldset, ordering)
 
-        return queryset
+    def get_validators(self, request, pk=None):
+        if pk is None:
+            return versioned_validators(request)
+        # A detail's validators only change when the catalogue version does
+        return cached_validators(
+            request, self.action, pk, lambda: self.compute_validators(request, pk)
+        )
 
+    def compute_validators(self, request, pk):
+        querysets = self.get_validator_querysets(pk)
+        if querysets is None:
+            return None
+        book, loans = querysets
+        book_state = book.order_by().aggregate(**BOOK_STATE)
+        if not book_state["count"]:
+            return None
+        return make_validators(request, book_state, loan_state(loans))
+
+    def get_validator_querysets(self, pk):
+        """The book and its loans, whose state shapes the detail, or None."""
+        if str(pk).isdigit():
+            return Book.objects.filter(pk=pk), Loan.objects.filter(book_id=pk)
+        return None
+
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        """Upsert books from a CSV (text/csv) or NDJSON request body."""
+        file_format = "csv" if request.content_type.startswith("text/csv") else "ndjson"
+        if request.stream is None:
+            raise DRFValidationError({"detail": "Request body is empty."})
+        report = import_books(iter_text_lines(request.stream), file_format)
+        return Response(report)
+
+    @action(detail=False, methods=["get"], url_path="export")
+    def export(self, request):
+        """Stream every book matching `available`/`search` as NDJSON or CSV."""
+        return streaming_export(
+            self.get_queryset(),
+            BOOK_EXPORT_COLUMNS,
+            get_export_format(request),
+            "books",
+        )
 
-class LoanViewSet(viewsets.ModelViewSet):
+    def get_ordering(self):
+        """
+        Ordering (query param, else relevance for searches, else title),
+        always ending in `id` so the cursor has a unique tiebreaker.
+        """
+        ordering = self.request.query_params.get("ordering")
+        if ordering in self.ordering_choices:
+            direction = "-" if ordering.startswith("-") else ""
+            return [ordering, f"{direction}id"]
+        if self.request.query_params.get("search") and get_search_backend().ranked:
+            return ["-search_rank", "title", "id"]
+        return ["title", "id"]
+
+
+class LoanViewSet(
+    ReplicaReadMixin, ConditionalGetMixin, FieldsetMixin, viewsets.ModelViewSet
+):
     queryset = Loan.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    fieldset_actions = ("list", "retrieve", "my_active")
+
+    def get_ordering(self):
+        if self.action == "overdue":
+            if self.request.query_params.get("group") == "user":
+                return ["-overdue_loans", "user"]
+            return ["due_date", "id"]
+        return ["-borrowed_at", "-id"]
+
+    def get_validators(self, request, pk=None):
+        user = request.user
+        scope = f"user:{user.pk}:{'staff' if user.is_staff else 'patron'}"
+        # Borrower usernames are rendered too, and user edits bump `users_version`
+        users = users_version.get()
+        if pk is None:
+            return versioned_validators(request, users, scope=scope)
+        if not str(pk).isdigit():
+            return None
+        return cached_validators(
+            request,
+            f"{self.action}:{scope}:{users}",
+            pk,
+            lambda: self.compute_validators(request, pk, scope),
+        )
+
+    def compute_validators(self, request, pk, scope):
+        loan = self.get_queryset().filter(pk=pk)
+        own_state = loan.order_by().aggregate(
+            count=Count("id"),
+            last_returned=Max("returned_at"),
+            last_book_update=Max("book__updated_at"),
+        )
+        if not own_state["count"]:
+            return None
+        # Nested `book.is_available` also depends on other users' loans of the book
+        book_loans = Loan.objects.filter(book__in=loan.values("book_id"))
+        return make_validators(request, own_state, loan_state(book_loans), scope=scope)
 
     def get_serializer_class(self):
         if self.action == "create":
@@ -145,9 +322,10 @@ class LoanViewSet(viewsets.ModelViewSet):
         return LoanDetailSerializer  # renamed to LoanDetailSerializer for clarity
 
     def get_queryset(self):
+        queryset = project_loans(Loan.objects.all(), self.get_fieldset(), self.get_ordering())
         if self.request.user.is_staff:
-            return Loan.objects.all()
-        return Loan.objects.filter(user=self.request.user)
+            return queryset
+        return queryset.filter(user=self.request.user)
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -168,36 +346,47 @@ class LoanViewSet(viewsets.ModelViewSet):
         user = self.request.user
         book = serializer.validated_data['book']
         due_date = serializer.validated_data['due_date']
+        now = timezone.now()
+
+        # One round trip: lock the patron's circulation row (serializing this
+        # user's borrows, so the loan count and overdue check hold until we
+        # commit) and check the book's active loan. The book isn't locked; a
+        # concurrent borrow of it is caught by `unique_active_loan_per_book`
+        state = lock_borrow_state(user, book, now)
+
+        if state["book_taken"]:
+            raise DRFValidationError({
+                "book": ["This book is currently not available for borrowing."]
+            })
 
         # Rule A: Block borrow if overdue loans exist
-        overdue = Loan.objects.filter(
-            user=user,
-            returned_at__isnull=True,
-            due_date__lt=timezone.now()
-        ).exists()
-        if overdue:
+        if state["user_overdue"]:
             raise DRFValidationError({
                 "detail": "You have overdue loans. Return them first or contact staff."
             })
 
         # Rule B: Max active loans
-        max_loans = 5
-        active_count = Loan.objects.filter(user=user, returned_at__isnull=True).count()
-        if active_count >= max_loans:
+        if state["user_active"] >= MAX_ACTIVE_LOANS:
             raise DRFValidationError({
-                "detail": f"You can borrow at most {max_loans} books at a time. Return some first."
+                "detail": f"You can borrow at most {MAX_ACTIVE_LOANS} books at a time. Return some first."
             })
 
-        # Existing rules
-        if due_date <= timezone.now():
+        if due_date <= now:
             raise DRFValidationError({"due_date": "Due date must be in the future."})
 
-        if Loan.objects.filter(book=book, returned_at__isnull=True).exists():
-            raise DRFValidationError({"book": "This book is already borrowed."})
-
-        # Save loan
-        serializer.save(user=user)
-
+        # Save loan; the rules above already covered the DB-backed checks
+        loan = Loan(user=user, book=book, due_date=due_date)
+        try:
+            loan.save(validation="fast")
+        except DjangoValidationError as exc:
+            # Lost a race for the same book (see `lock_borrow_state`)
+            if not violates(exc, Loan, "unique_active_loan_per_book"):
+                raise
+            raise DRFValidationError({"book": [BOOK_UNAVAILABLE]})
+        # The INSERT succeeded, so `unique_active_loan_per_book` guarantees this
+        # is the book's only active loan: no need to re-query availability
+        book.annotated_is_available = False
+        serializer.instance = loan
 
     @action(
         detail=True,
@@ -218,12 +407,110 @@ class LoanViewSet(viewsets.ModelViewSet):
                 {"detail": "You can only return your own books (or be staff)."},
             )
         loan.returned_at = timezone.now()
-        loan.save()
+        # Returning can't break a constraint, so skip the three validation queries
+        loan.save(validation="fast")
 
         return Response(LoanDetailSerializer(loan).data)
 
+    @action(detail=False, methods=["post"], url_path="batch")
+    def batch(self, request):
+        """Borrow several books in one transaction with per-item results."""
+        serializer = LoanBatchCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                results = borrow_many(request.user, serializer.validated_data["loans"])
+        except BatchBorrowBlocked as exc:
+            raise DRFValidationError({"detail": exc.detail})
+        except IntegrityError:
+            # A single borrow (which doesn't lock the book row) inserted first;
+            # the whole batch rolled back, so the client can simply resend it
+            return Response({"detail": BATCH_CONFLICT}, status=status.HTTP_409_CONFLICT)
+
+        created = [result.pop("loan") for result in results if result["status"] == "created"]
+        loan_data = iter(LoanDetailSerializer(created, many=True).data)
+        for result in results:
+            if result["status"] == "created":
+                result["loan"] = next(loan_data)
+        return Response(
+            batch_payload(results, "created"),
+            status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=False, methods=["patch"], url_path="batch-return")
+    def batch_return(self, request):
+        """Return several loans in one transaction with per-item results."""
+        serializer = LoanBatchReturnSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            results = return_many(self.get_queryset(), serializer.validated_data["loans"])
+
+        returned = [result.pop("instance") for result in results if result["status"] == "returned"]
+        loan_data = iter(LoanDetailSerializer(returned, many=True).data)
+        for result in results:
+            if result["status"] == "returned":
+                result["loan"] = next(loan_data)
+        return Response(
+            batch_payload(results, "returned"),
+            status=status.HTTP_200_OK if returned else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAdminUser],
+        url_path="export",
+    )
+    def export(self, request):
+        """Stream the full loan ledger (staff only) as NDJSON or CSV."""
+        return streaming_export(
+            Loan.objects.order_by("id"),
+            LOAN_EXPORT_COLUMNS,
+            get_export_format(request),
+            "loans",
+        )
+
+    @action(
+        detail=False,
+        methods=["get"],
+        permission_classes=[IsAdminUser],
+        url_path="overdue",
+    )
+    def overdue(self, request):
+        """
+        Overdue loans for staff, most overdue first.
+
+        `?group=user` pages per-user totals, `?group=days` counts loans per
+        days-overdue bucket, and `?fmt=csv|ndjson` streams the full list.
+        """
+        now = timezone.now()
+        loans = overdue_loans(now)
+        group = request.query_params.get("group")
+
+        if group == "days":
+            return Response({"as_of": now, "results": overdue_by_days(loans, now)})
+        if group == "user":
+            page = self.paginate_queryset(overdue_by_user(loans))
+            return self.get_paginated_response(page)
+        if group is not None:
+            raise DRFValidationError({"group": "Choose one of: days, user."})
+
+        if "fmt" in request.query_params:
+            return streaming_export(
+                loans.order_by(*self.get_ordering()),
+                LOAN_EXPORT_COLUMNS,
+                get_export_format(request),
+                "overdue",
+                derived={"days_overdue": lambda row: days_overdue(row["due_date"], now)},
+            )
+
+        page = self.paginate_queryset(overdue_rows(loans))
+        for row in page:
+            row["days_overdue"] = days_overdue(row["due_date"], now)
+        return self.get_paginated_response(page)
+
     @action(detail=False, methods=["get"], url_path="my-active")
     def my_active(self, request):
-        loans = Loan.objects.filter(user=request.user, returned_at__isnull=True)
-        serializer = LoanDetailSerializer(loans, many=True)
+        loans = project_loans(Loan.objects.all(), self.get_fieldset())
+        serializer = self.get_serializer(loans.active().filter(user=request.user), many=True)
         return Response(serializer.data)
@@ -10,9 +10,9 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 import os
-import dj_database_url
 from datetime import timedelta
 from .base import *
+from .database import database_config
 
 from pathlib import Path
 
@@ -55,17 +55,18 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",  # default: require login for everything
     ),
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
-    "EXCEPTION_HANDLER": "rest_framework.views.exception_handler",
+    "EXCEPTION_HANDLER": "core.exceptions.exception_handler",
     "NON_FIELD_ERRORS_KEY": "detail",
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        # DRF's JSONRenderer output, encoded with orjson when available
+        'core.renderers.FastJSONRenderer',
         # Comment out or remove BrowsableAPIRenderer in production/dev
         # 'rest_framework.renderers.BrowsableAPIRenderer',
     ),
@@ -83,19 +84,59 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,  # old refresh becomes invalid
     "AUTH_HEADER_TYPES": ("Bearer",),  # Authorization: Bearer <token>
     "AUTH_TOKEN_CLASSES": ("rest_framework_simplejwt.tokens.AccessToken",),
+    # Revocation store in core.revocation instead of the token_blacklist app
+    "TOKEN_REFRESH_SERIALIZER": "core.serializers.RevocationTokenRefreshSerializer",
     # Optional: more secure signing (default is HS256)
     "SIGNING_KEY": SECRET_KEY,  # use Django secret for now
 }
 
+# ────────────────────────────────────────────────
+# LIBRARY SETTINGS
+# ────────────────────────────────────────────────
+
+# Directory for cross-process version stamps (defaults to <tmp>/library-state).
+# Every worker process must see the same directory: with more than one web
+# host, set LIBRARY_MULTI_HOST and share it between them (system check
+# core.E001, which read replicas also trigger)
+LIBRARY_STATE_DIR = os.getenv("LIBRARY_STATE_DIR") or None
+LIBRARY_MULTI_HOST = os.getenv("LIBRARY_MULTI_HOST", "False") == "True"
+
+# Catalogue response cache (keys are versioned, so this only bounds memory use)
+LIBRARY_CATALOGUE_CACHE = "default"
+LIBRARY_CATALOGUE_CACHE_TIMEOUT = int(os.getenv("LIBRARY_CATALOGUE_CACHE_TIMEOUT", "300"))
+
+# Per-process cache of JWT-authenticated users; 0 disables it. Saves and
+# deletes invalidate it at once, but QuerySet.update() (e.g. a bulk
+# is_active=False) only applies when entries expire after the TTL
+LIBRARY_AUTH_USER_CACHE_SIZE = int(os.getenv("LIBRARY_AUTH_USER_CACHE_SIZE", "10000"))
+LIBRARY_AUTH_USER_CACHE_TTL = int(os.getenv("LIBRARY_AUTH_USER_CACHE_TTL", "60"))
+
+# Urlconf for requests arriving over ASGI (async read endpoints); None disables
+LIBRARY_ASYNC_URLCONF = os.getenv("LIBRARY_ASYNC_URLCONF", "library.urls_async") or None
+
+# Per-route metrics at /metrics; each worker writes its totals under
+# LIBRARY_STATE_DIR this often. With a token, scrapes need "Bearer <token>";
+# without one, only staff can scrape
+LIBRARY_METRICS_FLUSH_SECONDS = float(os.getenv("LIBRARY_METRICS_FLUSH_SECONDS", "5"))
+LIBRARY_METRICS_TOKEN = os.getenv("LIBRARY_METRICS_TOKEN") or None
+
+# Where staff request profiles are written (defaults to <state dir>/profiles)
+LIBRARY_PROFILE_DIR = os.getenv("LIBRARY_PROFILE_DIR") or None
+
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware
+    "core.metrics.MetricsMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Staff-only, on X-Profile / ?profile= (see core.profiling)
+    "core.profiling.ProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.middleware.AsyncRoutesMiddleware",
 ]
 
 
@@ -125,12 +166,40 @@ WSGI_APPLICATION = "library.wsgi.application"
 
 # Use DATABASE_URL env var if set, fallback to SQLite for local dev
 
+# DATABASE_POOL=True switches PostgreSQL to psycopg's pool, sized by
+# DATABASE_POOL_MIN_SIZE/MAX_SIZE/TIMEOUT/MAX_LIFETIME/MAX_IDLE (see database.py)
+
 DATABASES = {
-    "default": dj_database_url.config(
-        default=os.getenv("DATABASE_URL"),
-        conn_max_age=600,
-        conn_health_checks=True,
-    )
+    "default": database_config(os.getenv("DATABASE_URL")),
+}
+
+# Read replicas (comma-separated URLs) become aliases replica1, replica2, ...
+# Tests mirror them onto the default database instead of creating them.
+for index, url in enumerate(
+    filter(None, (url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(","))),
+    start=1,
+):
+    DATABASES[f"replica{index}"] = {**database_config(url), "TEST": {"MIRROR": "default"}}
+
+DATABASE_ROUTERS = ["core.routers.PrimaryReplicaRouter"]
+
+# Safe API requests read from one of these aliases (see core.routers); a user
+# who writes is pinned to the primary for LIBRARY_REPLICA_PIN_SECONDS
+LIBRARY_READ_REPLICAS = [alias for alias in DATABASES if alias.startswith("replica")]
+LIBRARY_REPLICA_PIN_SECONDS = int(os.getenv("LIBRARY_REPLICA_PIN_SECONDS", "5"))
+
+# Log each pooled alias's usage at most this often per process; 0 disables it
+LIBRARY_DB_POOL_LOG_INTERVAL = int(os.getenv("LIBRARY_DB_POOL_LOG_INTERVAL", "60"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core.pooling": {"handlers": ["console"], "level": "INFO"},
+    },
 }
 
 # Password validation
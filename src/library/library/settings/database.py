@@ -0,0 +1,66 @@
+"""
+`DATABASES` entries from URLs plus `DATABASE_POOL*` environment variables.
+
+With `DATABASE_POOL=True`, PostgreSQL aliases use psycopg's connection pool
+(Django's `OPTIONS["pool"]`): each worker process shares at most
+`DATABASE_POOL_MAX_SIZE` connections between its threads, instead of
+keeping one persistent connection per thread. Pooling requires
+`CONN_MAX_AGE = 0`; connections go back to the pool after each request.
+
+SQLite transactions start with `BEGIN IMMEDIATE`: a transaction that reads
+and then writes (every borrow) takes the write lock up front and waits up to
+`SQLITE_BUSY_TIMEOUT` seconds for it. With the default deferred `BEGIN`, two
+such transactions deadlock on the upgrade and one fails at once with
+"database is locked".
+"""
+import os
+
+import dj_database_url
+
+PERSISTENT_CONN_MAX_AGE = 600
+SQLITE_BUSY_TIMEOUT = 20
+
+POOL_VARIABLES = {
+    # psycopg_pool.ConnectionPool argument: (environment variable, type, default)
+    "min_size": ("DATABASE_POOL_MIN_SIZE", int, 2),
+    "max_size": ("DATABASE_POOL_MAX_SIZE", int, 10),
+    "timeout": ("DATABASE_POOL_TIMEOUT", float, 10.0),
+    "max_lifetime": ("DATABASE_POOL_MAX_LIFETIME", float, 3600.0),
+    "max_idle": ("DATABASE_POOL_MAX_IDLE", float, 600.0),
+}
+
+
+def pool_options(environ=os.environ):
+    """`ConnectionPool` keyword arguments, or None when pooling is off."""
+    if environ.get("DATABASE_POOL", "False") != "True":
+        return None
+    options = {
+        name: cast(environ.get(variable, default))
+        for name, (variable, cast, default) in POOL_VARIABLES.items()
+    }
+    if not 0 <= options["min_size"] <= options["max_size"] or options["max_size"] < 1:
+        raise ValueError(
+            "DATABASE_POOL_MIN_SIZE must be between 0 and DATABASE_POOL_MAX_SIZE (>= 1)"
+        )
+    return options
+
+
+def database_config(url, environ=os.environ):
+    """
+    One `DATABASES` entry for `url`: pooled if enabled and on PostgreSQL,
+    immediate transactions on SQLite.
+    """
+    if not url:
+        return {}
+    config = dj_database_url.parse(
+        url, conn_max_age=PERSISTENT_CONN_MAX_AGE, conn_health_checks=True
+    )
+    pool = pool_options(environ)
+    if pool is not None and config["ENGINE"] == "django.db.backends.postgresql":
+        config["CONN_MAX_AGE"] = 0
+        config.setdefault("OPTIONS", {})["pool"] = pool
+    if config["ENGINE"] == "django.db.backends.sqlite3":
+        options = config.setdefault("OPTIONS", {})
+        options.setdefault("transaction_mode", "IMMEDIATE")
+        options.setdefault("timeout", SQLITE_BUSY_TIMEOUT)
+    return config
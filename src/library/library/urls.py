@@ -20,8 +20,8 @@ from django.urls import path, include
 from django.contrib import admin
 from django.http import JsonResponse
 from core.views import (
-    BookViewSet, LoanViewSet, MeView, RegisterView,
-    TestLoanPermissionView, TestPermissionView
+    BookViewSet, DatabasePoolView, LoanViewSet, MeView, RegisterView,
+    TestLoanPermissionView, TestPermissionView, metrics_view
 )
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
@@ -38,12 +38,14 @@ def root_view(request):
 urlpatterns = [
     path("", root_view),  # <-- this handles /
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("api/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("api/me/", MeView.as_view(), name="user_me"),
     path("api/test-permissions/", TestPermissionView.as_view(), name="test-permissions"),
     path("api/test-loan-permissions/", TestLoanPermissionView.as_view(), name="test-loan-permissions"),
     path("api/register/", RegisterView.as_view(), name="register"),
+    path("api/diagnostics/db-pool/", DatabasePoolView.as_view(), name="db-pool"),
     path("api/", include(router.urls)),
 ]
 
@@ -0,0 +1,38 @@
+"""
+URL configuration for ASGI requests (see `core.middleware.AsyncRoutesMiddleware`).
+
+Same URLs as `library.urls`; the hot read endpoints resolve to async views
+first, which hand any method they do not serve back to the sync view.
+"""
+from django.urls import path, re_path
+
+from core.async_views import (AsyncBookView, AsyncMeView,
+                              AsyncMyActiveLoansView)
+from core.views import MeView
+from library.urls import router
+from library.urls import urlpatterns as sync_urlpatterns
+
+# The router's views by URL name, e.g. "books-list" -> BookViewSet list/create.
+# The async routes keep those names, so metrics group both under one route.
+sync_views = {pattern.name: pattern.callback for pattern in router.urls}
+
+urlpatterns = [
+    path("api/me/", AsyncMeView.as_view(fallback=MeView.as_view()), name="user_me"),
+    path(
+        "api/books/",
+        AsyncBookView.as_view(fallback=sync_views["books-list"]),
+        name="books-list",
+    ),
+    # Digits only, so `books/export/` and `books/bulk/` still reach their actions
+    re_path(
+        r"^api/books/(?P<pk>\d+)/$",
+        AsyncBookView.as_view(fallback=sync_views["books-detail"]),
+        name="books-detail",
+    ),
+    path(
+        "api/loans/my-active/",
+        AsyncMyActiveLoansView.as_view(fallback=sync_views["loan-my-active"]),
+        name="loan-my-active",
+    ),
+    *sync_urlpatterns,
+]